@@ -0,0 +1,28 @@
+"""Add page_data content hash columns
+
+Revision ID: da51d62b7fcc
+Revises: 209d7088ea81
+Create Date: 2026-10-18 10:12:03.412733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'da51d62b7fcc'
+down_revision: Union[str, None] = '209d7088ea81'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('page_data', sa.Column('content_hash', sa.String(), nullable=True))
+    op.add_column('page_data', sa.Column('embedded_content_hash', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('page_data', 'embedded_content_hash')
+    op.drop_column('page_data', 'content_hash')
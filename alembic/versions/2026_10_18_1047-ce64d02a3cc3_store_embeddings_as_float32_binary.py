@@ -0,0 +1,67 @@
+"""Store embeddings as float32 binary
+
+Revision ID: ce64d02a3cc3
+Revises: da51d62b7fcc
+Create Date: 2026-10-18 10:47:03.412733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import json
+import numpy as np
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ce64d02a3cc3'
+down_revision: Union[str, None] = 'da51d62b7fcc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ['page_data', 'qa_interactions']
+BATCH_SIZE = 500
+
+
+def json_to_float32(value):
+    try:
+        embed = json.loads(value) if value else []
+    except json.JSONDecodeError:
+        return None
+    return np.asarray(embed, dtype='<f4').tobytes() if embed else None
+
+
+def float32_to_json(value):
+    return json.dumps(np.frombuffer(value, dtype='<f4').tolist())
+
+
+def backfill(table, source, target, target_type, convert):
+    """Convert the embeddings of a table from the source to the target column, in batches of rows."""
+    connection = op.get_bind()
+    select = sa.text(f'SELECT id, {source} FROM {table} WHERE id > :last_id AND {source} IS NOT NULL '
+                     f'ORDER BY id LIMIT :limit')
+    update = sa.text(f'UPDATE {table} SET {target} = :value WHERE id = :id').bindparams(
+        sa.bindparam('value', type_=target_type))
+
+    last_id = 0
+    while rows := connection.execute(select, {'last_id': last_id, 'limit': BATCH_SIZE}).fetchall():
+        values = [{'id': row[0], 'value': convert(row[1])} for row in rows]
+        connection.execute(update, values)
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.add_column(table, sa.Column('embed_float32', sa.LargeBinary(), nullable=True))
+        backfill(table, 'embed', 'embed_float32', sa.LargeBinary(), json_to_float32)
+        op.drop_column(table, 'embed')
+        op.alter_column(table, 'embed_float32', new_column_name='embed')
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.add_column(table, sa.Column('embed_json', sa.Text(), nullable=True))
+        backfill(table, 'embed', 'embed_json', sa.Text(), float32_to_json)
+        op.drop_column(table, 'embed')
+        op.alter_column(table, 'embed_json', new_column_name='embed')
@@ -0,0 +1,41 @@
+"""Add page_chunks table
+
+Revision ID: 8b181cd4daf0
+Revises: ce64d02a3cc3
+Create Date: 2026-10-18 11:21:03.412733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b181cd4daf0'
+down_revision: Union[str, None] = 'ce64d02a3cc3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('page_chunks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('chunk_id', sa.String(), nullable=False),
+    sa.Column('page_id', sa.String(), nullable=False),
+    sa.Column('chunk_index', sa.Integer(), nullable=False),
+    sa.Column('start_offset', sa.Integer(), nullable=False),
+    sa.Column('end_offset', sa.Integer(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=True),
+    sa.Column('last_embedded', sa.DateTime(), nullable=True),
+    sa.Column('embed', sa.LargeBinary(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_page_chunks_chunk_id', 'page_chunks', ['chunk_id'], unique=True)
+    op.create_index('ix_page_chunks_page_id', 'page_chunks', ['page_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_page_chunks_page_id', 'page_chunks')
+    op.drop_index('ix_page_chunks_chunk_id', 'page_chunks')
+    op.drop_table('page_chunks')
@@ -0,0 +1,26 @@
+"""Add page_chunks token_count column
+
+Revision ID: b254ba1be3cc
+Revises: 8b181cd4daf0
+Create Date: 2026-10-18 11:58:03.412733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b254ba1be3cc'
+down_revision: Union[str, None] = '8b181cd4daf0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('page_chunks', sa.Column('token_count', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('page_chunks', 'token_count')
@@ -0,0 +1,39 @@
+"""Add embedding_cache table
+
+Revision ID: f942a6514404
+Revises: b254ba1be3cc
+Create Date: 2026-10-18 12:36:03.412733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f942a6514404'
+down_revision: Union[str, None] = 'b254ba1be3cc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('embedding_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cache_key', sa.String(), nullable=False),
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('dimensions', sa.Integer(), nullable=True),
+    sa.Column('embed', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('last_used', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_embedding_cache_cache_key', 'embedding_cache', ['cache_key'], unique=True)
+    op.create_index('ix_embedding_cache_last_used', 'embedding_cache', ['last_used'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_embedding_cache_last_used', 'embedding_cache')
+    op.drop_index('ix_embedding_cache_cache_key', 'embedding_cache')
+    op.drop_table('embedding_cache')
@@ -0,0 +1,34 @@
+"""Add rate_limit_buckets table
+
+Revision ID: b8ca237e4519
+Revises: e8d3f27e7d01
+Create Date: 2026-10-18 13:45:03.412733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8ca237e4519'
+down_revision: Union[str, None] = 'e8d3f27e7d01'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('rate_limit_buckets',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_rate_limit_buckets_name', 'rate_limit_buckets', ['name'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_rate_limit_buckets_name', 'rate_limit_buckets')
+    op.drop_table('rate_limit_buckets')
@@ -0,0 +1,34 @@
+"""Add unique index of unfinished embedding jobs
+
+Revision ID: 7c6931102533
+Revises: b8ca237e4519
+Create Date: 2026-10-18 14:20:03.412733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c6931102533'
+down_revision: Union[str, None] = 'b8ca237e4519'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Only the oldest unfinished job of a target is kept, the target being embedded once by it
+    op.execute("""
+        UPDATE embedding_jobs SET status = 'done', finished_at = now()
+        WHERE status IN ('pending', 'running') AND id NOT IN (
+            SELECT min(id) FROM embedding_jobs WHERE status IN ('pending', 'running') GROUP BY kind, target_id
+        )
+    """)
+    op.create_index('ix_embedding_jobs_kind_target_id_unfinished', 'embedding_jobs', ['kind', 'target_id'],
+                    unique=True, postgresql_where=sa.text("status IN ('pending', 'running')"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_embedding_jobs_kind_target_id_unfinished', 'embedding_jobs')
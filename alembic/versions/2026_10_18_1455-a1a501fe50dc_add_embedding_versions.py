@@ -0,0 +1,66 @@
+"""Add embedding versions and vector_collections table
+
+Revision ID: a1a501fe50dc
+Revises: 7c6931102533
+Create Date: 2026-10-18 14:55:03.412733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1a501fe50dc'
+down_revision: Union[str, None] = '7c6931102533'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Embedding model of the embeddings stored before their version was recorded
+LEGACY_EMBEDDING_MODEL = 'text-embedding-3-large'
+LEGACY_EMBEDDING_DIMENSIONS = 3072
+# Alias and table of each collection existing before versioned collections
+LEGACY_COLLECTIONS = {'pages': 'page_data', 'page_chunks': 'page_chunks', 'interactions': 'qa_interactions'}
+
+
+def upgrade() -> None:
+    for table in LEGACY_COLLECTIONS.values():
+        op.add_column(table, sa.Column('embedding_version', sa.String(), nullable=True))
+        op.execute(f"""
+            UPDATE {table} SET embedding_version = '{LEGACY_EMBEDDING_MODEL}:' || (length(embed) / 4)
+            WHERE embed IS NOT NULL
+        """)
+
+    op.create_table('vector_collections',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('alias', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('embedding_version', sa.String(), nullable=False),
+    sa.Column('embedding_model', sa.String(), nullable=False),
+    sa.Column('embedding_dimensions', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('switched_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_vector_collections_alias', 'vector_collections', ['alias'], unique=False)
+
+    # The existing collections are live, with the version of most of the embeddings of their table
+    for alias, table in LEGACY_COLLECTIONS.items():
+        op.execute(f"""
+            INSERT INTO vector_collections (alias, name, status, embedding_version, embedding_model,
+                                            embedding_dimensions, created_at, switched_at)
+            SELECT '{alias}', '{alias}', 'live', embedding_version, '{LEGACY_EMBEDDING_MODEL}',
+                   NULLIF(length(embed) / 4, {LEGACY_EMBEDDING_DIMENSIONS}), now(), now()
+            FROM {table} WHERE embed IS NOT NULL
+            GROUP BY embedding_version, length(embed) / 4 ORDER BY count(*) DESC LIMIT 1
+        """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_vector_collections_alias', 'vector_collections')
+    op.drop_table('vector_collections')
+    for table in LEGACY_COLLECTIONS.values():
+        op.drop_column(table, 'embedding_version')
@@ -0,0 +1,32 @@
+"""Add last_synced_to_vector columns
+
+Revision ID: cae3049b385f
+Revises: a1a501fe50dc
+Create Date: 2026-10-18 15:30:03.412733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cae3049b385f'
+down_revision: Union[str, None] = 'a1a501fe50dc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ('page_data', 'page_chunks', 'qa_interactions')
+
+
+def upgrade() -> None:
+    # Left empty, so that the first sync imports all the embeddings once
+    for table in TABLES:
+        op.add_column(table, sa.Column('last_synced_to_vector', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_column(table, 'last_synced_to_vector')
@@ -0,0 +1,41 @@
+"""Add pgvector embedding columns
+
+Revision ID: fdfd46375fa0
+Revises: cae3049b385f
+Create Date: 2026-10-18 16:00:03.412733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fdfd46375fa0'
+down_revision: Union[str, None] = 'cae3049b385f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ('page_data', 'page_chunks', 'qa_interactions')
+
+
+def upgrade() -> None:
+    # The columns are only used by the optional pgvector store, so the databases without the extension are
+    # migrated without them. Once the extension is installed, migrate down then up again to add them.
+    bind = op.get_bind()
+    if not bind.execute(sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'vector'")).scalar():
+        print("The pgvector extension is not available, the embed_vector columns are not added.")
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS vector')
+    # Without dimensions, as the embeddings of the versions of the collections have different dimensions.
+    # The HNSW index of each collection is created with it, see vector/stores.py
+    for table in TABLES:
+        op.execute(f'ALTER TABLE {table} ADD COLUMN embed_vector vector')
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.execute(f'ALTER TABLE {table} DROP COLUMN IF EXISTS embed_vector')
@@ -0,0 +1,41 @@
+"""Add channel_space_routes table and page_data space_key index
+
+Revision ID: 5f463ee644c1
+Revises: fdfd46375fa0
+Create Date: 2026-10-18 16:30:03.412733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f463ee644c1'
+down_revision: Union[str, None] = 'fdfd46375fa0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('channel_space_routes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('channel_id', sa.String(), nullable=False),
+    sa.Column('space_key', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_channel_space_routes_channel_id_space_key', 'channel_space_routes',
+                    ['channel_id', 'space_key'], unique=True)
+    # The searches of the pgvector store are filtered by the space of the pages
+    op.create_index('ix_page_data_space_key', 'page_data', ['space_key'], unique=False)
+    # The embeddings of the pages are imported again by the next import, with the metadata filtered by
+    for table in ('page_data', 'page_chunks'):
+        op.execute(f"UPDATE {table} SET last_synced_to_vector = NULL")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_page_data_space_key', 'page_data')
+    op.drop_index('ix_channel_space_routes_channel_id_space_key', 'channel_space_routes')
+    op.drop_table('channel_space_routes')
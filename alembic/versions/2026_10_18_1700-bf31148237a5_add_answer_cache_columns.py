@@ -0,0 +1,34 @@
+"""Add answer cache columns to qa_interactions
+
+Revision ID: bf31148237a5
+Revises: 5f463ee644c1
+Create Date: 2026-10-18 17:00:03.412733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bf31148237a5'
+down_revision: Union[str, None] = '5f463ee644c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('qa_interactions', sa.Column('source_pages', sa.Text(), nullable=True))
+    op.add_column('qa_interactions', sa.Column('answer_message_ts', sa.String(), nullable=True))
+    op.add_column('qa_interactions', sa.Column('negative_reactions', sa.Integer(), nullable=False,
+                                               server_default='0'))
+    op.add_column('qa_interactions', sa.Column('cached_from_interaction_id', sa.Integer(), nullable=True))
+    # The reactions to an answer are matched to its interaction by the timestamp of the answer message
+    op.create_index('ix_qa_interactions_answer_message_ts', 'qa_interactions', ['answer_message_ts'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_qa_interactions_answer_message_ts', 'qa_interactions')
+    for column in ('cached_from_interaction_id', 'negative_reactions', 'answer_message_ts', 'source_pages'):
+        op.drop_column('qa_interactions', column)
@@ -0,0 +1,28 @@
+"""Add context selection columns to qa_interactions
+
+Revision ID: 4d2e5c927d57
+Revises: bf31148237a5
+Create Date: 2026-10-18 17:30:03.412733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d2e5c927d57'
+down_revision: Union[str, None] = 'bf31148237a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('qa_interactions', sa.Column('context_distances', sa.Text(), nullable=True))
+    op.add_column('qa_interactions', sa.Column('context_chunk_count', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('qa_interactions', 'context_chunk_count')
+    op.drop_column('qa_interactions', 'context_distances')
@@ -1,5 +1,5 @@
 # ./api/endpoint.py
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 import uvicorn
 from openai import OpenAI
 import threading
@@ -7,8 +7,11 @@ from credentials import oai_api_key
 from slack.event_consumer import process_question, process_feedback
 from pydantic import BaseModel
 from configuration import api_host, api_port
-import vector.pages
-import vector.interactions
+import metrics
+from database.embedding_job_manager import EmbeddingJobManager
+from models.embedding_job import EmbeddingJob
+from open_ai.embedding.embedding_cache import get_hit_rate
+from interactions import answer_cache
 
 processor = FastAPI()
 
@@ -62,32 +65,65 @@ def create_feedback(feedback_event: FeedbackEvent):
 @processor.post("/api/v1/embeds")
 def create_embeds(EmbedRequest: EmbedRequest):
     """
-    Endpoint to initiate the embedding generation and storage process in the background.
+    Endpoint to queue an embedding job for a page, run by the embedding workers.
     :param EmbedRequest:
     :return:
     """
     page_id = EmbedRequest.page_id
-    thread = threading.Thread(target=vector.pages.generate_one_embedding_to_database, args=(page_id,))
-    thread.start()
-    return {"message": "Embedding generation initiated, processing in background", "page_id": page_id}
+    job_id, = EmbeddingJobManager().enqueue(EmbeddingJob.PAGE, [page_id])
+    return {"message": "Embedding generation queued", "page_id": page_id, "job_id": job_id}
 
 
 @processor.post("/api/v1/interaction_embeds")
 def create_interaction_embeds(InteractionEmbedRequest: InteractionEmbedRequest):
     """
-    Endpoint to initiate the embedding generation and storage process in the background.
+    Endpoint to queue an embedding job for an interaction, run by the embedding workers.
     :param InteractionEmbedRequest:
     :return:
     """
     interaction_id = InteractionEmbedRequest.interaction_id
-    print(f"Received interaction embed request for ID: {interaction_id}")  # Debugging line
-    thread = threading.Thread(target=vector.interactions.generate_one_embedding_to_database, args=(interaction_id,))
-    thread.start()
+    job_id, = EmbeddingJobManager().enqueue(EmbeddingJob.INTERACTION, [interaction_id])
 
     # Make sure to return a response that matches what your client expects
     return {
-        "message": "Interaction embedding generation initiated, processing in background",
-        "interaction_id": interaction_id
+        "message": "Interaction embedding generation queued",
+        "interaction_id": interaction_id,
+        "job_id": job_id
+    }
+
+
+@processor.get("/api/v1/embedding_jobs/{job_id}")
+def get_embedding_job(job_id: int):
+    """
+    Endpoint returning the status of an embedding job.
+    :param job_id:
+    :return:
+    """
+    job = EmbeddingJobManager().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Embedding job {job_id} not found")
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "target_id": job.target_id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "last_error": job.last_error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+
+
+@processor.get("/api/v1/metrics")
+def get_metrics():
+    """
+    Endpoint returning the metrics of the API process, such as the embedding cache hits and misses.
+    :return:
+    """
+    return {
+        "counters": metrics.snapshot(),
+        "embedding_cache_hit_rate": get_hit_rate(),
+        "answer_cache": answer_cache.get_stats(),
     }
 
 
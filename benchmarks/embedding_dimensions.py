@@ -0,0 +1,124 @@
+# ./benchmarks/embedding_dimensions.py
+"""
+Benchmark of retrieval with embeddings shortened to fewer dimensions, on the embeddings stored in the database.
+
+The page chunk embeddings are the corpus. The interaction embeddings are the queries, completed with a sample of
+chunk embeddings when there are too few interactions, a chunk then being excluded from its own results.
+The embeddings are shortened as by vector.reindex, and for each number of dimensions the benchmark reports
+the recall@k against the top k at the stored dimensions, the size of the corpus, and the latency of an exact search.
+With --chroma, the latency of a query to a Chroma collection is also measured, on temporary collections
+deleted afterwards.
+
+Requires the database of the DB_* environment variables, with embeddings stored at their native dimensions.
+
+Usage:
+    poetry run python -m benchmarks.embedding_dimensions --dimensions 256 512 1024 3072 --k 10
+"""
+import argparse
+import statistics
+import time
+import uuid
+
+import numpy as np
+
+from database.database import get_db_session
+from database.interaction_manager import QAInteractionManager
+from database.page_chunk_manager import PageChunkManager
+from open_ai.embedding.dimensions import truncate_embeddings
+
+
+def load_embeddings(query_count, seed=0):
+    """
+    Load the corpus and the queries.
+    :return: The corpus as a 2D array, the queries as a 2D array,
+        and the corpus row of each query sampled from the corpus, or -1.
+    """
+    corpus = np.vstack([record.embed for record in PageChunkManager().get_chunk_embeds()])
+    with get_db_session() as session:
+        interactions = [interaction.embed for interaction in QAInteractionManager().get_interactions_with_embeds(session)
+                        if interaction.embed.shape[0] == corpus.shape[1]]
+
+    queries = interactions[:query_count]
+    query_rows = [-1] * len(queries)
+    if len(queries) < query_count:
+        sample = np.random.default_rng(seed).choice(len(corpus), min(query_count - len(queries), len(corpus)),
+                                                    replace=False)
+        queries += [corpus[row] for row in sample]
+        query_rows += sample.tolist()
+    return corpus, np.vstack(queries), np.array(query_rows)
+
+
+def search(corpus, queries, query_rows, k):
+    """Exact cosine search of the top k corpus rows of each query, excluding the row of a query sampled from it."""
+    similarities = queries @ corpus.T
+    sampled = query_rows >= 0
+    similarities[np.nonzero(sampled)[0], query_rows[sampled]] = -np.inf
+    top = np.argpartition(-similarities, k, axis=1)[:, :k]
+    return [set(row) for row in top]
+
+
+def measure_search_latency(corpus, queries, query_rows, k):
+    """Median latency in milliseconds of searching the corpus for one query."""
+    latencies = []
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        search(corpus, queries[i:i + 1], query_rows[i:i + 1], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+
+def measure_chroma_latency(corpus, queries, k, batch_size=1000):
+    """Median latency in milliseconds of a query to a temporary Chroma collection holding the corpus."""
+    from vector.chroma import get_client
+
+    client = get_client()
+    collection_name = f"benchmark_{corpus.shape[1]}_{uuid.uuid4().hex[:8]}"
+    collection = client.create_collection(collection_name, metadata={"hnsw:space": "cosine"})
+    try:
+        for start in range(0, len(corpus), batch_size):
+            batch = corpus[start:start + batch_size]
+            collection.add(ids=[str(start + i) for i in range(len(batch))], embeddings=batch.tolist())
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+            latencies.append((time.perf_counter() - start) * 1000)
+        return statistics.median(latencies)
+    finally:
+        client.delete_collection(collection_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dimensions', type=int, nargs='+', default=[256, 512, 1024, 3072],
+                        help='numbers of dimensions to compare')
+    parser.add_argument('--k', type=int, default=10, help='number of results per query')
+    parser.add_argument('--queries', type=int, default=200, help='number of queries')
+    parser.add_argument('--chroma', action='store_true', help='also measure the query latency of Chroma')
+    args = parser.parse_args()
+
+    corpus, queries, query_rows = load_embeddings(args.queries)
+    stored_dimensions = corpus.shape[1]
+    print(f"{len(corpus)} chunks and {len(queries)} queries, stored with {stored_dimensions} dimensions")
+    expected = search(corpus, queries, query_rows, args.k)
+
+    header = f"{'dimensions':>10} {'recall@' + str(args.k):>10} {'corpus MB':>10} {'search ms':>10}"
+    print(header + (f" {'chroma ms':>10}" if args.chroma else ''))
+    for dimensions in sorted(args.dimensions):
+        if dimensions > stored_dimensions:
+            print(f"{dimensions:>10} skipped, the embeddings are stored with {stored_dimensions} dimensions")
+            continue
+
+        truncated_corpus = truncate_embeddings(corpus, dimensions)
+        truncated_queries = truncate_embeddings(queries, dimensions)
+        results = search(truncated_corpus, truncated_queries, query_rows, args.k)
+        recall = np.mean([len(result & expected_result) / args.k for result, expected_result in zip(results, expected)])
+        latency = measure_search_latency(truncated_corpus, truncated_queries, query_rows, args.k)
+        line = f"{dimensions:>10} {recall:>10.3f} {truncated_corpus.nbytes / 1024 ** 2:>10.1f} {latency:>10.2f}"
+        if args.chroma:
+            line += f" {measure_chroma_latency(truncated_corpus, truncated_queries, args.k):>10.2f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# ./benchmarks/embedding_pipeline.py
+"""
+Benchmark of the page indexing and retrieval pipeline: storing pages, embedding them, importing them into the
+vector database and retrieving the chunks relevant to questions.
+
+Meant to run without network access with the local embedding provider:
+    EMBEDDING_PROVIDER=hashing
+The tokenizers of tiktoken are downloaded on first use, so on a machine without network access
+TIKTOKEN_CACHE_DIR must point to a directory where they were cached beforehand.
+
+Requires the database of the DB_* environment variables, migrated to the latest revision,
+and the Chroma server of the CHROMA_* environment variables.
+The benchmark pages are stored in a dedicated space and deleted afterwards, from both databases.
+
+Usage:
+    EMBEDDING_PROVIDER=hashing poetry run python -m benchmarks.embedding_pipeline --pages 2000 --questions 200
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+from benchmarks.page_store import delete_pages, generate_pages, measure
+from configuration import embedding_provider, vector_collection_page_chunks, vector_collection_pages
+from database.database import get_db_session
+from database.page_manager import PageManager
+from models.page_chunk import PageChunk
+import vector.pages
+from vector.collections import get_live_collection
+from vector.stores import get_store
+
+WORDS = ("deploy billing invoice reminder customer talent contract payment review onboarding interview "
+         "engineer designer manager timesheet vacation policy expense security access account").split()
+
+
+def generate_varied_pages(count, run_id, seed=0):
+    """Generate synthetic pages, each about a few topic words so that questions have relevant pages."""
+    rng = random.Random(seed)
+    pages = generate_pages(count, run_id, content_size=0)
+    for page in pages:
+        topic = rng.sample(WORDS, 3)
+        page['title'] = f"{' '.join(topic)} guide {run_id}"
+        page['content'] = '\n\n'.join(' '.join(rng.choice(topic + WORDS) for _ in range(120)) for _ in range(8))
+    return pages
+
+
+def delete_vectors(page_ids):
+    store = get_store()
+    store.delete(get_live_collection(vector_collection_pages).name, ids=page_ids)
+    store.delete(get_live_collection(vector_collection_page_chunks).name, where={"page_id": {"$in": page_ids}})
+
+
+def delete_chunks(page_ids):
+    with get_db_session() as session:
+        session.query(PageChunk).filter(PageChunk.page_id.in_(page_ids)).delete(synchronize_session=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=2000, help='number of pages to index')
+    parser.add_argument('--questions', type=int, default=200, help='number of questions to retrieve chunks for')
+    parser.add_argument('--count', type=int, default=8, help='number of chunks retrieved per question')
+    args = parser.parse_args()
+
+    if embedding_provider != 'hashing':
+        print(f"Warning: embedding with the '{embedding_provider}' provider, set EMBEDDING_PROVIDER=hashing "
+              f"to run without network access")
+
+    run_id = uuid.uuid4().hex[:8]
+    space_key = f'BENCH{run_id}'
+    pages = generate_varied_pages(args.pages, run_id)
+    page_ids = [page['pageId'] for page in pages]
+    questions = [f"How do I handle {' '.join(random.Random(i).sample(WORDS, 2))}?" for i in range(args.questions)]
+
+    print(f"Indexing {args.pages} pages of space {space_key}, then retrieving chunks for {args.questions} questions")
+    try:
+        measure('store pages', args.pages, lambda: PageManager().store_pages_data(space_key, pages))
+        measure('embed pages', args.pages, lambda: vector.pages.generate_embeddings_to_database(page_ids))
+        measure('import into the vector database', args.pages,
+                lambda: vector.pages.import_from_database(space_key=space_key))
+
+        latencies = []
+        for question in questions:
+            start = time.perf_counter()
+            vector.pages.retrieve_relevant_chunk_ids(question, count=args.count)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        print(f"{'retrieve chunks':<40} median {statistics.median(latencies):.1f} ms, "
+              f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.1f} ms")
+    finally:
+        delete_vectors(page_ids)
+        delete_chunks(page_ids)
+        delete_pages(space_key)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# ./benchmarks/page_store.py
+"""
+Benchmark of storing Confluence pages into the database, comparing the former row by row ORM
+upsert with the bulk INSERT ... ON CONFLICT path of PageManager.store_pages_data.
+
+Requires the database of the DB_* environment variables, migrated to the latest revision.
+The benchmark pages are stored in a dedicated space and deleted afterwards.
+
+Usage:
+    poetry run python -m benchmarks.page_store --pages 10000
+"""
+import argparse
+import time
+import uuid
+
+from database.database import get_db_session
+from database.page_manager import PageManager
+from models.page_data import PageData
+
+
+def generate_pages(count, run_id, revision=0, content_size=4000):
+    """Generate synthetic page data shaped like the output of the Confluence retriever."""
+    filler = "lorem ipsum dolor sit amet " * (content_size // 27)
+    return [
+        {
+            'pageId': f'bench-{run_id}-{i}',
+            'title': f'Benchmark page {i}',
+            'author': 'Benchmark',
+            'createdDate': '2024-01-01T00:00:00.000Z',
+            'lastUpdated': f'2024-01-{revision + 2:02d}T00:00:00.000Z',
+            'content': f'revision {revision} {filler}',
+            'comments': '',
+        }
+        for i in range(count)
+    ]
+
+
+def store_row_by_row(page_manager, space_key, pages, batch_size):
+    """The former store path: one SELECT then an ORM insert or update per page, in batches."""
+    for start in range(0, len(pages), batch_size):
+        with get_db_session() as session:
+            for page in pages[start:start + batch_size]:
+                old_page = session.query(PageData).filter_by(page_id=page['pageId']).first()
+                if old_page:
+                    old_page.title = page['title']
+                    old_page.lastUpdated = page_manager.parse_datetime(page['lastUpdated'])
+                    old_page.content = page['content']
+                    old_page.comments = page['comments']
+                    old_page.content_hash = page_manager.compute_content_hash(old_page)
+                else:
+                    new_page = PageData(page_id=page['pageId'],
+                                        space_key=space_key,
+                                        title=page['title'],
+                                        author=page['author'],
+                                        createdDate=page_manager.parse_datetime(page['createdDate']),
+                                        lastUpdated=page_manager.parse_datetime(page['lastUpdated']),
+                                        content=page['content'],
+                                        comments=page['comments'])
+                    new_page.content_hash = page_manager.compute_content_hash(new_page)
+                    session.add(new_page)
+
+
+def delete_pages(space_key):
+    with get_db_session() as session:
+        session.query(PageData).filter(PageData.space_key == space_key).delete()
+
+
+def measure(label, count, function):
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed:8.2f} s {count / elapsed:10.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=10000, help='number of pages to store')
+    parser.add_argument('--batch-size', type=int, default=100, help='number of pages per transaction')
+    args = parser.parse_args()
+
+    page_manager = PageManager()
+    run_id = uuid.uuid4().hex[:8]
+    space_key = f'BENCH{run_id}'
+    original = generate_pages(args.pages, run_id)
+    modified = generate_pages(args.pages, run_id, revision=1)
+
+    print(f"Storing {args.pages} pages in batches of {args.batch_size}")
+    try:
+        measure('row by row: insert', args.pages,
+                lambda: store_row_by_row(page_manager, space_key, original, args.batch_size))
+        measure('row by row: update', args.pages,
+                lambda: store_row_by_row(page_manager, space_key, modified, args.batch_size))
+        delete_pages(space_key)
+
+        measure('bulk upsert: insert', args.pages,
+                lambda: page_manager.store_pages_data(space_key, original, args.batch_size))
+        measure('bulk upsert: update', args.pages,
+                lambda: page_manager.store_pages_data(space_key, modified, args.batch_size))
+        measure('bulk upsert: unchanged', args.pages,
+                lambda: page_manager.store_pages_data(space_key, modified, args.batch_size))
+    finally:
+        delete_pages(space_key)
+
+
+if __name__ == "__main__":
+    main()
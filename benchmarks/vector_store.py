@@ -0,0 +1,85 @@
+# ./benchmarks/vector_store.py
+"""
+Benchmark of the query latency of the vector stores, the local memory-mapped index against the Chroma server,
+on collections of random embeddings of growing sizes.
+
+For each size, the embeddings are upserted into a temporary collection of each store, deleted afterwards,
+then the same queries are sent through the VectorStore interface used by the retrievers.
+The local collections are written to a temporary directory, in memory when it is a tmpfs.
+
+Requires the Chroma server of the CHROMA_* environment variables for the chroma store.
+A million embeddings of 256 dimensions take 1 GB, for each store.
+
+Usage:
+    poetry run python -m benchmarks.vector_store --sizes 10000 100000 1000000 --dimensions 256
+    poetry run python -m benchmarks.vector_store --sizes 10000 --stores local
+"""
+import argparse
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+from vector.stores import LocalVectorStore, get_store
+
+
+def generate_embeddings(count, dimensions, seed):
+    """Random embeddings gathered around a few hundred topics, like the chunks of pages."""
+    rng = np.random.default_rng(seed)
+    topics = np.random.default_rng(0).standard_normal((256, dimensions)).astype(np.float32)
+    return topics[rng.integers(len(topics), size=count)] + rng.standard_normal((count, dimensions)) \
+        .astype(np.float32)
+
+
+def fill_collection(store, name, size, dimensions, batch_size=5000):
+    batch_size = min(batch_size, store.max_batch_size)
+    for start in range(0, size, batch_size):
+        count = min(batch_size, size - start)
+        store.upsert(name, [str(i) for i in range(start, start + count)],
+                     generate_embeddings(count, dimensions, seed=start + 1).tolist(),
+                     [{"page_id": str(i // 4)} for i in range(start, start + count)])
+
+
+def measure_queries(store, name, queries, k):
+    """Latencies in milliseconds of the queries, after a warm-up query."""
+    store.query(name, queries[0], k)
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        store.query(name, query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help='numbers of embeddings of the collections')
+    parser.add_argument('--dimensions', type=int, default=256, help='dimensions of the embeddings')
+    parser.add_argument('--stores', nargs='+', default=['local', 'chroma'], help='vector stores to compare')
+    parser.add_argument('--queries', type=int, default=200, help='number of queries')
+    parser.add_argument('--k', type=int, default=10, help='number of results per query')
+    args = parser.parse_args()
+
+    queries = generate_embeddings(args.queries, args.dimensions, seed=0).tolist()
+    print(f"{'store':>8} {'size':>9} {'upsert s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    with tempfile.TemporaryDirectory() as path:
+        stores = [LocalVectorStore(path) if name == 'local' else get_store(name) for name in args.stores]
+        for size in args.sizes:
+            for store in stores:
+                name = f"benchmark_{size}_{uuid.uuid4().hex[:8]}"
+                store.create_collection(name)
+                try:
+                    start = time.perf_counter()
+                    fill_collection(store, name, size, args.dimensions)
+                    upsert_seconds = time.perf_counter() - start
+                    latencies = measure_queries(store, name, queries, args.k)
+                    print(f"{store.name:>8} {size:>9} {upsert_seconds:>9.1f} {np.percentile(latencies, 50):>8.2f} "
+                          f"{np.percentile(latencies, 99):>8.2f}")
+                finally:
+                    store.delete_collection(name)
+
+
+if __name__ == "__main__":
+    main()
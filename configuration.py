@@ -28,7 +28,24 @@ chroma_host = os.environ.get("CHROMA_HOST")
 chroma_port = int(os.environ.get("CHROMA_PORT"))
 chroma_database = os.environ.get("CHROMA_DATABASE")
 vector_collection_pages = "pages"
+vector_collection_page_chunks = "page_chunks"
 vector_collection_interactions = "interactions"
+# the collection names above are aliases of the live collections, recorded in the vector_collections table,
+# which are switched to the collections built for a new embedding version by: python -m vector.reindex
+# seconds the live collection of an alias is cached for by each process, before a switch is seen
+vector_collection_alias_ttl_seconds = 10
+# number of embeddings read from the database and sent to the vector database together when importing them,
+# lowered to the maximum batch size of the vector database server
+vector_sync_batch_size = 500
+# vector database storing the collections and answering the similarity queries, "chroma" for the Chroma server
+# above, "local" for an exact search within each process over the embeddings memory-mapped from files under
+# vector_store_path, which avoids a request per query while the embeddings fit in memory, or "pgvector" to search
+# the embeddings where they are stored, in PostgreSQL with the pgvector extension, without importing them,
+# see vector/stores.py
+vector_store = os.environ.get("VECTOR_STORE", "chroma")
+vector_store_path = os.environ.get("VECTOR_STORE_PATH", os.path.join(get_project_root(), "content", "vector_store"))
+# a local collection is compacted in the background once this share of its rows are deleted or replaced
+vector_store_compaction_ratio = 0.25
 
 # API configuration
 api_host = os.environ.get("NUR_API_HOST")
@@ -65,15 +82,104 @@ embedding_model_id_latest_large = "text-embedding-3-large"
 embedding_model_id_latest_small = "text-embedding-3-small"
 embedding_model_id_ada = "text-embedding-ada-002"
 embedding_model_id = embedding_model_id_latest_large
+# provider of the embeddings, "openai", or "hashing" for local deterministic embeddings without network access,
+# meant for tests and load benchmarks, see open_ai/embedding/providers.py
+embedding_provider = os.environ.get("EMBEDDING_PROVIDER", "openai")
+# dimensions of the embeddings, None for the native dimensions of the model (3072 for text-embedding-3-large)
+# shorter embeddings cut storage, import payloads and query cost, at a small loss of recall,
+# see benchmarks/embedding_dimensions.py. After changing it, shorten the stored embeddings and rebuild the
+# vector collections with: python -m vector.reindex
+embedding_dimensions = None
+# per-request limits of the embedding API, texts are packed into as few requests as these allow
+embedding_max_inputs_per_request = 2048
+embedding_max_tokens_per_request = 300000
+embedding_max_input_tokens = 8191
+# embeddings are cached by model, dimensions and normalized text, in process and in the database
+# the least recently used embeddings are evicted beyond these sizes in bytes
+embedding_cache_memory_max_bytes = 64 * 1024 * 1024
+embedding_cache_database_max_bytes = 2 * 1024 * 1024 * 1024
+# number of pages or interactions loaded, embedded and stored together when generating embeddings
+embedding_batch_size = 200
+# OpenAI rate limits of the organization per model, shared by all the processes through token buckets in the database
+# the limits are set a little below the ones of the organization, as token counts are estimated before each request
+openai_rate_limits = {
+    gpt_4t: {'requests_per_minute': 450, 'tokens_per_minute': 270000},
+    embedding_model_id_latest_large: {'requests_per_minute': 4500, 'tokens_per_minute': 900000},
+    embedding_model_id_latest_small: {'requests_per_minute': 4500, 'tokens_per_minute': 900000},
+    embedding_model_id_ada: {'requests_per_minute': 4500, 'tokens_per_minute': 900000},
+}
+default_openai_rate_limit = {'requests_per_minute': 450, 'tokens_per_minute': 180000}
+# share of each bucket background work such as embedding jobs leaves to interactive questions
+openai_background_reserve = 0.25
+# share of the requests per minute of a model sent by each process without tokens, such as the polls of assistant
+# runs, limited within the process rather than by the buckets shared by the processes, so that they don't lock them
+# the limits above should leave this share to each process answering questions
+openai_local_requests_share = 0.05
+# tokens counted for the reply of an assistant run, in addition to the tokens of the message
+assistant_run_estimated_completion_tokens = 1000
+# embedding jobs are queued in the database and claimed by the embedding workers, see vector/embedding_worker.py
+# number of worker processes started by a worker node, several nodes can run against the same database
+embedding_worker_count = 2
+# number of jobs claimed, and embedded together, by a worker at a time
+embedding_job_claim_size = 200
+# seconds an idle worker waits before polling the queue again
+embedding_worker_poll_interval_seconds = 2
+# a failed job is retried with exponential backoff, and is dead-lettered after its last attempt
+embedding_job_max_attempts = 5
+embedding_job_backoff_base_seconds = 10
+embedding_job_backoff_max_seconds = 600
+# running jobs locked for longer than this are considered abandoned by a stopped worker and claimed again
+embedding_job_stale_timeout_seconds = 900
 
 # page retrieval for answering questions
-# document count is recommended from 3 to 15 where 3 is minimum cost and 15 is maximum comprehensive answer
-question_context_pages_count = 2
+# the context is assembled from the most relevant page chunks, grouped by page
+# chunk count is recommended from 4 to 20 where 4 is minimum cost and 20 is maximum comprehensive answer
+# question_context_chunks_count chunks are retrieved, and the context keeps as many of them as the question needs,
+# see vector/selection.py: at least question_context_chunks_min_count, then the ones within
+# question_context_max_distance of the question, cut at the largest gap between the distances of consecutive
+# chunks if it is at least question_context_min_distance_gap
+question_context_chunks_count = 16
+question_context_chunks_min_count = 4
+# cosine distances, from 0 for the same direction to 2 for the opposite one
+question_context_max_distance = 0.7
+question_context_min_distance_gap = 0.05
+# token budget of the context sent to the assistant with each question, per assistant model
+# the chunks are packed by relevance until the budget is spent, which bounds the prompt size and its cost
+context_token_budgets = {
+    gpt_4t: 12000,
+}
+default_context_token_budget = 8000
+# pages are split into chunks of at most page_chunk_size characters, overlapping by page_chunk_overlap characters
+page_chunk_size = 2000
+page_chunk_overlap = 200
+# questions asked again are answered right away with a previous answer to a similar enough question, as long as
+# its source pages did not change and it drew no negative feedback, see interactions/answer_cache.py
+answer_cache_enabled = True
+# minimum cosine similarity of the embeddings of the questions, phrasings of the same question score above it
+answer_cache_similarity_threshold = 0.9
+# number of the interactions most similar to a question checked for an answer to reuse
+answer_cache_candidate_count = 5
+# answers older than this are not reused, as pages added since may answer the question better
+answer_cache_max_age_days = 30
 # interaction retrieval for identifying knowledge gaps interaction_retrieval_count is recommended from 3 to 10 where
 # 3 is minimum cost and 10 is maximum comprehensive list of questions
 knowledge_gap_interaction_retrieval_count = 5
 
 
+# Confluence incremental import
+# CQL `lastmodified` dates are evaluated in the timezone of the Confluence user profile, so the last import date
+# is moved back by this overlap to never miss the pages modified around the previous import
+confluence_sync_overlap_hours = 24
+# concurrency of Confluence page requests, it grows while Confluence keeps up and halves when it throttles
+confluence_initial_concurrency = 10
+confluence_min_concurrency = 1
+confluence_max_concurrency = 50
+# attempts for each Confluence request before the page is reported as failed
+confluence_max_attempts = 6
+# number of retrieved pages committed to the database per transaction while importing a space
+page_import_batch_size = 100
+
+
 # System Knowledge space name on Confluence
 system_knowledge_space_private = "Nur Documentation"
 system_confluence_knowledge_space = system_knowledge_space_private
@@ -82,6 +188,10 @@ system_confluence_knowledge_space = system_knowledge_space_private
 # Knowledge collection Slack channel ids
 knowledge_gap_discussions_channel_id = os.environ.get("SLACK_CHANNEL_ID_KNOWLEDGE_GAP_DISCUSSIONS")
 
+# questions asked in a Slack channel routed to spaces are answered from the pages of these spaces only,
+# see slack/channel_routes.py, and the routes are cached by each process for this many seconds
+channel_space_routes_ttl_seconds = 60
+
 # Authorized Slack environments
 slack_allow_enterprise_id = os.environ.get("SLACK_ALLOW_ENTERPRISE_ID")
 slack_allow_team_id = os.environ.get("SLACK_ALLOW_TEAM_ID")
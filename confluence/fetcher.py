@@ -0,0 +1,278 @@
+import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import logging
+import queue
+import random
+import threading
+
+import httpx
+
+
+# Statuses worth retrying, and among them the ones signaling that the server is throttling us
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+THROTTLING_STATUS_CODES = {429, 503}
+
+
+def parse_retry_after(value):
+    """
+    Parse the value of a Retry-After header.
+
+    Args:
+    value (str): The header value, either a number of seconds or an HTTP date.
+
+    Returns:
+    float: The number of seconds to wait, or None if the value is missing or invalid.
+    """
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limits the number of concurrent requests with an AIMD policy:
+    the limit grows by one after a full window of successful requests, and is halved when the server throttles.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, initial_limit, min_limit, max_limit):
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.in_flight = 0
+        self.successes = 0
+        # Incremented on each decrease, so a burst of throttled requests only halves the limit once
+        self.epoch = 0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self):
+        """Wait for a free slot and take it. Returns the epoch to report the outcome of the request with."""
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+            return self.epoch
+
+    async def release(self):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def on_success(self):
+        self.successes += 1
+        if self.successes >= self.limit:
+            self.successes = 0
+            self.limit = min(self.limit + 1, self.max_limit)
+
+    def on_throttle(self, epoch):
+        if epoch != self.epoch:
+            return
+        self.epoch += 1
+        self.successes = 0
+        self.limit = max(self.limit // 2, self.min_limit)
+        logging.warning(f"Confluence is throttling requests, concurrency reduced to {self.limit}.")
+
+
+class ConfluencePageFetcher:
+    """
+    Fetches Confluence pages concurrently over a shared connection pool, adapting the concurrency to the
+    throughput the server allows, honoring Retry-After and retrying failed requests with jittered backoff.
+    The pages that still fail after all attempts are collected in failed_page_ids.
+    """
+
+    def __init__(self, base_url, username, api_token, expand, has_incomplete_comments=lambda page: False,
+                 initial_concurrency=10, min_concurrency=1, max_concurrency=50, max_attempts=6,
+                 backoff_base=0.5, backoff_max=30.0, timeout=60.0):
+        """
+        Initialize the fetcher.
+
+        Args:
+        base_url (str): The base URL of the Confluence REST API, for example https://example.atlassian.net/wiki.
+        username (str): The username for authentication.
+        api_token (str): The API token for authentication.
+        expand (str): The expansions requested with each page.
+        has_incomplete_comments (callable): Tells if the comments expanded with a page are incomplete,
+            in which case all the comments of the page are retrieved with pagination.
+        initial_concurrency (int): The number of concurrent requests to start with.
+        min_concurrency (int): The lowest number of concurrent requests when throttled.
+        max_concurrency (int): The highest number of concurrent requests, also the size of the connection pool.
+        max_attempts (int): The number of attempts for each request before the page is reported as failed.
+        backoff_base (float): The base delay in seconds of the exponential backoff between attempts.
+        backoff_max (float): The maximum delay in seconds between attempts.
+        timeout (float): The timeout in seconds of each request.
+        """
+        self.base_url = base_url.rstrip('/') + '/'
+        self.auth = (username, api_token)
+        self.expand = expand
+        self.has_incomplete_comments = has_incomplete_comments
+        self.initial_concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.failed_page_ids = []
+
+    def fetch_pages(self, page_ids):
+        """
+        Fetch pages and yield them as they arrive.
+        The event loop runs in a background thread and hands pages over through a bounded queue,
+        so fetching pauses while the consumer is busy instead of buffering the whole space.
+
+        Args:
+        page_ids (iterable): The IDs of the pages to fetch.
+
+        Yields:
+        dict: The page as returned by the Confluence REST API, in completion order.
+        """
+        results = queue.Queue(maxsize=self.max_concurrency)
+        stop = threading.Event()
+        done = object()
+
+        def run():
+            try:
+                asyncio.run(self._fetch_all(list(page_ids), results, stop))
+            except BaseException as e:
+                self._put(results, e, stop)
+            self._put(results, done, stop)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        try:
+            while (item := results.get()) is not done:
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            thread.join()
+
+    @staticmethod
+    def _put(results, item, stop):
+        """Put an item in the results queue, giving up if the consumer stopped."""
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    async def _fetch_all(self, page_ids, results, stop):
+        self.limiter = AdaptiveConcurrencyLimiter(self.initial_concurrency, self.min_concurrency,
+                                                  self.max_concurrency)
+        self.resume_at = 0.0
+        pending = asyncio.Queue()
+        for page_id in page_ids:
+            pending.put_nowait(page_id)
+
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, auth=self.auth, limits=limits, timeout=self.timeout,
+                                     headers={'Accept': 'application/json'}) as client:
+            async def worker():
+                while not stop.is_set():
+                    try:
+                        page_id = pending.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    page = await self.fetch_page(client, page_id)
+                    if page is not None:
+                        await asyncio.to_thread(self._put, results, page, stop)
+
+            await asyncio.gather(*[worker() for _ in range(self.max_concurrency)])
+
+        if self.failed_page_ids:
+            logging.error(f"{len(self.failed_page_ids)} pages could not be retrieved: {self.failed_page_ids}")
+
+    async def fetch_page(self, client, page_id):
+        """
+        Fetch a page with its expansions, paginating its comments if they could not all be expanded.
+
+        Returns:
+        dict: The page, or None if it could not be retrieved. The page ID is then added to failed_page_ids.
+        """
+        try:
+            page = await self.get_json(client, f'rest/api/content/{page_id}', {'expand': self.expand})
+            if self.has_incomplete_comments(page):
+                comments = await self.fetch_comments(client, page_id)
+                page.setdefault('children', {})['comment'] = {'results': comments}
+        except Exception as e:
+            logging.error(f"Error retrieving page with ID {page_id}: {e}")
+            self.failed_page_ids.append(page_id)
+            return None
+
+        logging.info(f"Page with ID {page_id} retrieved.")
+        return page
+
+    async def fetch_comments(self, client, page_id):
+        """Fetch all the comments of a page, replies included, with pagination."""
+        comments = []
+        start = 0
+        limit = 25
+        while True:
+            response = await self.get_json(client, f'rest/api/content/{page_id}/child/comment',
+                                           {'expand': 'body.storage', 'depth': 'all', 'start': start, 'limit': limit})
+            chunk = response.get('results', [])
+            comments.extend(chunk)
+            start += len(chunk)
+            if not chunk or not response.get('_links', {}).get('next'):
+                return comments
+
+    async def get_json(self, client, path, params):
+        """
+        Send a GET request within the concurrency limit, retrying throttled, failed and timed out requests.
+
+        Returns:
+        dict: The decoded JSON response.
+
+        Raises:
+        httpx.HTTPError: When the request failed with a non retryable status, or after the last attempt.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            await self._wait_until_resumed()
+            epoch = await self.limiter.acquire()
+            try:
+                response = await client.get(path, params=params)
+            except httpx.TransportError as e:
+                error, retry_after = e, None
+            else:
+                if response.status_code < 400:
+                    self.limiter.on_success()
+                    return response.json()
+                error = httpx.HTTPStatusError(f"HTTP {response.status_code} for {path}",
+                                              request=response.request, response=response)
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    raise error
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if response.status_code in THROTTLING_STATUS_CODES:
+                    self.limiter.on_throttle(epoch)
+                if retry_after is not None:
+                    # Every request waits for the server to accept requests again, not only this one
+                    self.resume_at = max(self.resume_at, asyncio.get_running_loop().time() + retry_after)
+            finally:
+                await self.limiter.release()
+
+            if attempt == self.max_attempts:
+                raise error
+            delay = self._backoff_delay(attempt, retry_after)
+            logging.warning(f"Attempt {attempt} of {self.max_attempts} for {path} failed ({error}), "
+                            f"retrying in {delay:.1f}s.")
+            await asyncio.sleep(delay)
+
+    def _backoff_delay(self, attempt, retry_after):
+        """Full jitter exponential backoff, or the Retry-After delay with a small jitter to spread the retries."""
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _wait_until_resumed(self):
+        delay = self.resume_at - asyncio.get_running_loop().time()
+        if delay > 0:
+            await asyncio.sleep(delay)
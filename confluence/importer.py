@@ -1,8 +1,9 @@
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import logging
 
+from configuration import confluence_sync_overlap_hours
 from database.page_manager import PageManager
-from database.space_manager import upsert_space_info
+from database.space_manager import get_last_import_date, upsert_space_info
 import vector.pages
 
 from .client import ConfluenceClient
@@ -27,15 +28,38 @@ def tui_choose_space():
     return spaces[choice]['key'], spaces[choice]['name']
 
 
-def import_space(space_key, space_name):
-    PageManager().store_pages_data(space_key, retrieve_space(space_key))
+def import_space(space_key, space_name, full_refresh=False):
+    """
+    Import a Confluence space into the database and the vector database.
+    Unless a full refresh is requested, only the pages modified since the last import of the space are retrieved.
+
+    Args:
+    space_key (str): The key of the Confluence space.
+    space_name (str): The name of the Confluence space.
+    full_refresh (bool): Retrieve every page of the space regardless of the last import date.
+    """
+    # Taken before the retrieval so that pages modified during the import are picked up by the next one
+    import_date = datetime.now()
+    # Pages whose content did not change are not embedded again, so only the ones embedded from now on are indexed
+    embedding_date = datetime.now(timezone.utc)
+
+    last_import_date = None if full_refresh else get_last_import_date(space_key)
+    update_date = last_import_date - timedelta(hours=confluence_sync_overlap_hours) if last_import_date else None
+
+    failed_page_ids = []
+    PageManager().store_pages_data(space_key, retrieve_space(space_key, update_date, failed_page_ids))
 
     vector.pages.generate_missing_embeddings_to_database()
 
-    upsert_space_info(
-        space_key=space_key,
-        space_name=space_name,
-        last_import_date=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-    )
+    if failed_page_ids:
+        # Keep the previous last import date, so the next import retries the pages that failed
+        logging.error(f"{len(failed_page_ids)} pages of space {space_key} could not be retrieved, "
+                      f"they will be retried by the next import: {failed_page_ids}")
+    else:
+        upsert_space_info(
+            space_key=space_key,
+            space_name=space_name,
+            last_import_date=import_date.strftime('%Y-%m-%d %H:%M:%S'),
+        )
 
-    vector.pages.import_from_database(space_key)
+    vector.pages.import_from_database(space_key, embedded_since=embedding_date)
@@ -1,11 +1,18 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from bs4 import BeautifulSoup
 from atlassian import Confluence
 import logging
 
+from configuration import (
+    confluence_initial_concurrency,
+    confluence_max_attempts,
+    confluence_max_concurrency,
+    confluence_min_concurrency,
+)
 from credentials import confluence_credentials
 
+from .fetcher import ConfluencePageFetcher
+
 
 # Initialize Confluence API
 confluence = Confluence(
@@ -14,6 +21,13 @@ confluence = Confluence(
     password=confluence_credentials['api_token']
 )
 
+# The comments and their replies are expanded with the page body, so a page is retrieved in a single request.
+# Replies to replies are expanded by ID only, to detect threads deeper than the expansion.
+PAGE_EXPAND = ('body.storage,history,version,'
+               'children.comment.body.storage,'
+               'children.comment.children.comment.body.storage,'
+               'children.comment.children.comment.children.comment')
+
 
 def get_space_page_ids(space_key):
     """
@@ -43,28 +57,39 @@ def get_space_page_ids(space_key):
     return page_ids
 
 
-def check_date_filter(update_date, page_ids):
+def get_space_page_ids_updated_since(space_key, update_date):
     """
-    Filter pages based on their last updated date.
+    Retrieves the IDs of the pages in a given space modified on or after a given date,
+    using a paginated CQL search instead of inspecting the history of every page.
 
     Args:
-    update_date (datetime): The threshold date for filtering. Pages updated after this date will be included.
-    page_ids (list): A list of page IDs to be filtered.
+    space_key (str): The key of the Confluence space.
+    update_date (datetime): The threshold date. Pages modified on or after this date will be included.
 
     Returns:
-    list: A list of page IDs that were last updated on or after the specified update_date.
+    list: A list of the IDs of the pages modified since the update_date.
     """
-    updated_pages = []
-    for page_id in page_ids:
+    cql = (f'space = "{space_key}" and type = page '
+           f'and lastmodified >= "{update_date.strftime("%Y-%m-%d %H:%M")}"')
+    page_ids = []
+    start = 0
+    limit = 50
+    while True:
         try:
-            page_history = confluence.history(page_id)  # directly use page_id
+            response = confluence.cql(cql, start=start, limit=limit)
         except Exception as e:
-            logging.error(f"Error retrieving history for page ID {page_id}: {e}")
-            continue
-        last_updated = datetime.strptime(page_history['lastUpdated']['when'], '%Y-%m-%dT%H:%M:%S.%fZ')
-        if last_updated >= update_date:
-            updated_pages.append(page_id)  # append the page_id to the list
-    return updated_pages
+            # A partial result would silently lose updates, so the caller must not advance its watermark
+            logging.error(f"Error searching updated pages (space_key={space_key} start={start} limit={limit}): {e}")
+            raise
+
+        chunk = response.get('results', [])
+        page_ids.extend([result['content']['id'] for result in chunk])
+        start += len(chunk)
+        # The server may cap the page size below the requested limit, so rely on the next link instead
+        if not chunk or not response.get('_links', {}).get('next'):
+            break
+
+    return page_ids
 
 
 def strip_html_tags(content):
@@ -81,108 +106,149 @@ def strip_html_tags(content):
     return soup.get_text()
 
 
-def get_page_comments_content(page_id):
+def is_truncated(collection):
     """
-    Retrieve and format the content of all comments on a Confluence page.
+    Check if a collection expanded inline in a Confluence response holds only part of its results.
 
     Args:
-    page_id (str): The ID of the Confluence page.
+    collection (dict): The expanded collection, with its results, size, limit and links.
 
     Returns:
-    str: A string containing the content of all comments on the page.
+    bool: True if more results are available than the ones expanded.
     """
-    result = []
-    start = 0
-    limit = 25
-    while True:
-        try:
-            chunk = confluence.get_page_comments(page_id, depth='all', start=start, limit=limit, expand='body.storage')['results']
-        except Exception as e:
-            logging.error(f"Error fetching page comments (page_id={page_id}) start={start} limit={limit}): {e}")
-            break
+    if collection.get('_links', {}).get('next'):
+        return True
+    return 'limit' in collection and collection.get('size', 0) >= collection['limit']
 
-        for comment in chunk:
-            content = comment['body']['storage']['value']
-            content = strip_html_tags(content)
-            result.append(content)
 
-        start += limit
-        if len(chunk) < limit:
-            break
+def has_incomplete_comments(page):
+    """
+    Check if the comments expanded inline with a page are incomplete and must be retrieved with pagination.
 
-    return '\n'.join(result)
+    Args:
+    page (dict): The page retrieved with the comment expansions of PAGE_EXPAND.
+
+    Returns:
+    bool: True if a comment collection is missing or truncated, or if a reply has replies of its own.
+    """
+    comments = page.get('children', {}).get('comment')
+    if comments is None or is_truncated(comments):
+        return True
 
+    for comment in comments.get('results', []):
+        replies = comment.get('children', {}).get('comment', {})
+        if is_truncated(replies):
+            return True
+        for reply in replies.get('results', []):
+            # Replies to replies are only expanded by ID, to detect the rare deeper threads
+            nested_replies = reply.get('children', {}).get('comment', {})
+            if nested_replies.get('results') or is_truncated(nested_replies):
+                return True
 
-def retrieve_page(page_id, space_key):
+    return False
+
+
+def get_inline_comments_content(page):
     """
-    Retrieves page data
-    :param page_id:
-    :param space_key:
-    :return: page_data
+    Format the content of the comments expanded inline with a page, the comments and their replies.
+
+    Args:
+    page (dict): The page retrieved with the comment expansions of PAGE_EXPAND.
+
+    Returns:
+    str: A string containing the content of all comments on the page,
+    or None if the expanded comments are incomplete and must be retrieved with pagination.
     """
-    current_time = datetime.now()
-    try:
-        page = confluence.get_page_by_id(page_id, expand='body.storage,history,version')
-    except Exception as e:
-        logging.error(f"Error retrieving page with ID {page_id}: {e}")
+    if has_incomplete_comments(page):
         return None
 
-    if not page:
-        logging.error(f"Error processing page with ID {page_id}: Page not found.")
-        return None
+    result = []
+    for comment in page['children']['comment'].get('results', []):
+        result.append(strip_html_tags(comment['body']['storage']['value']))
+        for reply in comment.get('children', {}).get('comment', {}).get('results', []):
+            result.append(strip_html_tags(reply['body']['storage']['value']))
+
+    return '\n'.join(result)
 
-    logging.info(f"Processing page with ID {page_id}...")
-    page_title = strip_html_tags(page['title'])
-    page_author = page['history']['createdBy']['displayName']
-    created_date = page['history']['createdDate']
-    last_updated = page['version']['when']
-    page_content = strip_html_tags(page.get('body', {}).get('storage', {}).get('value', ''))
-    page_comments_content = get_page_comments_content(page_id)
 
-    page_data = {
+def parse_page(page, space_key, page_comments_content):
+    """
+    Extract the page data from a page returned by the Confluence REST API.
+
+    Args:
+    page (dict): The page retrieved with the expansions of PAGE_EXPAND.
+    space_key (str): The key of the Confluence space.
+    page_comments_content (str): The content of the comments on the page.
+
+    Returns:
+    dict: The page data.
+    """
+    return {
         'spaceKey': space_key,
-        'pageId': page_id,
-        'title': page_title,
-        'author': page_author,
-        'createdDate': created_date,
-        'lastUpdated': last_updated,
-        'content': page_content,
+        'pageId': page['id'],
+        'title': strip_html_tags(page['title']),
+        'author': page['history']['createdBy']['displayName'],
+        'createdDate': page['history']['createdDate'],
+        'lastUpdated': page['version']['when'],
+        'content': strip_html_tags(page.get('body', {}).get('storage', {}).get('value', '')),
         'comments': page_comments_content,
-        'datePulledFromConfluence': current_time
+        'datePulledFromConfluence': datetime.now()
     }
 
-    logging.info(f"Page with ID {page_id} retrieved.")
-    return page_data
 
+def retrieve_pages(space_key, page_ids, failed_page_ids=None):
+    """
+    Retrieves pages concurrently and yields them as soon as they are retrieved.
+    The concurrency adapts to the throughput Confluence allows, throttled and failed requests are retried,
+    and only a bounded number of pages is held in memory however large the space is.
+
+    Args:
+    space_key (str): The key of the Confluence space.
+    page_ids (iterable): The IDs of the pages to retrieve.
+    failed_page_ids (list, optional): Collects the IDs of the pages that could not be retrieved after all retries.
+
+    Yields:
+    dict: The data of each retrieved page, in completion order.
+    """
+    fetcher = ConfluencePageFetcher(base_url=confluence.url,
+                                    username=confluence_credentials['username'],
+                                    api_token=confluence_credentials['api_token'],
+                                    expand=PAGE_EXPAND,
+                                    has_incomplete_comments=has_incomplete_comments,
+                                    initial_concurrency=confluence_initial_concurrency,
+                                    min_concurrency=confluence_min_concurrency,
+                                    max_concurrency=confluence_max_concurrency,
+                                    max_attempts=confluence_max_attempts)
+
+    for page in fetcher.fetch_pages(page_ids):
+        # Comments paginated by the fetcher are flat, so they are formatted like inline ones
+        yield parse_page(page, space_key, get_inline_comments_content(page))
 
-def retrieve_pages(space_key, page_ids):
-    pages = []
-    def worker(page_id):
-        logging.info(f"Processing page with ID {page_id}...")
-        page_data = retrieve_page(page_id, space_key)
-        if page_data:
-            pages.append(page_data)
+    if failed_page_ids is not None:
+        failed_page_ids.extend(fetcher.failed_page_ids)
 
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = [executor.submit(worker, page_id) for page_id in page_ids]
-        for future in as_completed(futures):
-            page_data = future.result()
-            if page_data:
-                pages.append(page_data)
 
-    return pages
+def retrieve_space(space_key, update_date=None, failed_page_ids=None):
+    """
+    Retrieves the pages of a space, yielding them as they are retrieved.
 
+    Args:
+    space_key (str): The key of the Confluence space.
+    update_date (datetime, optional): Only retrieve the pages modified on or after this date.
+    failed_page_ids (list, optional): Collects the IDs of the pages that could not be retrieved after all retries.
 
-def retrieve_space(space_key, update_date=None):
+    Yields:
+    dict: The data of each retrieved page.
+    """
     logging.info(f"Starting retrieval for space key: {space_key}")
 
-    page_ids = get_space_page_ids(space_key)
-    page_ids = list(set(page_ids))
     if update_date:
-        page_ids = check_date_filter(update_date, page_ids)
+        logging.info(f"Searching for pages modified since {update_date}")
+        page_ids = get_space_page_ids_updated_since(space_key, update_date)
+    else:
+        page_ids = get_space_page_ids(space_key)
+    page_ids = list(set(page_ids))
     logging.info(f'Discovered {len(page_ids)} pages for retrieval.')
 
-    pages = retrieve_pages(space_key, page_ids)
+    yield from retrieve_pages(space_key, page_ids, failed_page_ids)
     logging.info(f"Finished retrieval for space key: {space_key}")
-
-    return pages
@@ -0,0 +1,58 @@
+# ./database/channel_space_route_manager.py
+from datetime import datetime, timezone
+from sqlalchemy.dialects.postgresql import insert
+from models.channel_space_route import ChannelSpaceRoute
+from database.database import get_db_session
+
+
+class ChannelSpaceRouteManager:
+    def __init__(self):
+        pass
+
+    def get_routes(self, channel_id=None):
+        """
+        Retrieve the routes of the Slack channels to the Confluence spaces.
+        :param channel_id: Optional; only include the routes of this channel.
+        :return: The ChannelSpaceRoute records, by channel and space, detached from the session.
+        """
+        with get_db_session() as session:
+            query = session.query(ChannelSpaceRoute)
+            if channel_id is not None:
+                query = query.filter(ChannelSpaceRoute.channel_id == channel_id)
+            routes = query.order_by(ChannelSpaceRoute.channel_id, ChannelSpaceRoute.space_key).all()
+            session.expunge_all()
+            return routes
+
+    def get_space_keys(self, channel_id):
+        """
+        Get the keys of the spaces the questions of a channel are answered from.
+        :return: The space keys, empty when the channel has no routes.
+        """
+        with get_db_session() as session:
+            return session.scalars(session.query(ChannelSpaceRoute.space_key)
+                                   .filter(ChannelSpaceRoute.channel_id == channel_id)
+                                   .order_by(ChannelSpaceRoute.space_key)).all()
+
+    def add_route(self, channel_id, space_key):
+        """
+        Route the questions of a channel to a space, relying on the unique
+        ix_channel_space_routes_channel_id_space_key index to leave an existing route unchanged.
+        :return: Whether the route was added.
+        """
+        statement = insert(ChannelSpaceRoute).values(channel_id=channel_id, space_key=space_key,
+                                                     created_at=datetime.now(timezone.utc)) \
+            .on_conflict_do_nothing(index_elements=[ChannelSpaceRoute.channel_id, ChannelSpaceRoute.space_key])
+        with get_db_session() as session:
+            return session.execute(statement).rowcount > 0
+
+    def remove_routes(self, channel_id, space_key=None):
+        """
+        Remove the routes of a channel, so that its questions are answered from all the spaces once none is left.
+        :param space_key: Optional; only remove the route to this space.
+        :return: The number of removed routes.
+        """
+        with get_db_session() as session:
+            query = session.query(ChannelSpaceRoute).filter(ChannelSpaceRoute.channel_id == channel_id)
+            if space_key is not None:
+                query = query.filter(ChannelSpaceRoute.space_key == space_key)
+            return query.delete(synchronize_session=False)
@@ -0,0 +1,240 @@
+# ./database/embed_vector_manager.py
+import hashlib
+import logging
+
+from sqlalchemy import bindparam, cast, func, literal, or_, text, update
+from configuration import vector_store
+from database.database import engine, get_db_session
+from models.base import PgVector
+
+# The maximum dimensions of the vectors of an HNSW index of pgvector, larger vectors are searched exhaustively
+HNSW_MAX_DIMENSIONS = 2000
+# The number of candidates of an HNSW search, the most results a search returns, unless raised for a query
+HNSW_DEFAULT_EF_SEARCH = 40
+# The number of candidates of a filtered HNSW search, the candidates being filtered after the search, so that
+# enough of them are left when the filter only matches a part of the rows, such as the pages of a few spaces
+HNSW_FILTERED_EF_SEARCH = 400
+
+# The columns an embedding is written to: embed, and embed_vector when the embeddings are searched in the database
+# by the pgvector store, so that they are searchable as soon as they are stored
+EMBED_COLUMNS = ('embed', 'embed_vector') if vector_store == 'pgvector' else ('embed',)
+
+
+def get_embed_values(embed, prefix=''):
+    """The values of the columns an embedding is written to, by column name, prefixed for bind parameters."""
+    return {f'{prefix}{column}': embed for column in EMBED_COLUMNS}
+
+
+def get_embed_bindparams():
+    """The bind parameters of the columns an embedding is written to, named like get_embed_values(embed, 'b_')."""
+    return {column: bindparam(f'b_{column}') for column in EMBED_COLUMNS}
+
+
+def get_version_dimensions(embedding_version):
+    """The number of dimensions of the embeddings of a version, "<model>:<dimensions>"."""
+    return int(embedding_version.rsplit(':', 1)[1])
+
+
+def get_vector_distance(model, embedding, embedding_version):
+    """
+    The cosine distance of the embed_vector of the rows of a model to an embedding.
+    The vectors are cast to the dimensions of the version like in the HNSW index of its collection,
+    so that the index is used.
+    """
+    vector_type = PgVector(get_version_dimensions(embedding_version))
+    return cast(model.embed_vector, vector_type).cosine_distance(literal(embedding, vector_type))
+
+
+def find_similar(session, query, model, embedding, embedding_version, count, conditions=()):
+    """
+    Restrict a query of the rows of a model to the count rows whose embed_vector of a version is the most similar
+    to an embedding, the most similar first, adding their cosine distance to the embedding as the distance column.
+    :param conditions: Optional; the conditions of the rows to search, such as the spaces of their pages.
+    """
+    ef_search = max(count, HNSW_FILTERED_EF_SEARCH if conditions else HNSW_DEFAULT_EF_SEARCH)
+    if ef_search > HNSW_DEFAULT_EF_SEARCH:
+        session.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef_search)}"))
+    # Ordered by the label of the column, so that the embedding is sent once
+    distance = get_vector_distance(model, embedding, embedding_version).label('distance')
+    return query.add_columns(distance) \
+        .filter(model.embedding_version == embedding_version, model.embed_vector.is_not(None), *conditions) \
+        .order_by(distance).limit(count)
+
+
+def is_unsynced_to_vector(model):
+    """Filter of the rows whose embedding changed since it was last imported into the vector database."""
+    return or_(model.last_synced_to_vector.is_(None), model.last_embedded > model.last_synced_to_vector)
+
+
+class EmbedVectorManager:
+    """
+    Reads and rewrites the embed column of any model storing embeddings as float32 vectors,
+    such as PageData, PageChunk and QAInteraction, by batches of primary keys.
+    """
+
+    def __init__(self):
+        pass
+
+    def get_embeds_to_truncate(self, model, embedding_model, dimensions, after_id, limit):
+        """
+        Retrieve the embeddings of an embedding model having more than a number of dimensions, by ascending ID.
+        :param model: The SQLAlchemy model storing the embeddings, with id, embed and embedding_version columns.
+        :param embedding_model: The embedding model, as in the embedding versions.
+        :param dimensions: The number of dimensions the embeddings must exceed.
+        :param after_id: Only retrieve the rows with a greater ID, to page through the table.
+        :param limit: The maximum number of rows to retrieve.
+        :return: A list of (id, embed) rows, embed being a float32 numpy array.
+        """
+        with get_db_session() as session:
+            return session.query(model.id, model.embed) \
+                .filter(model.id > after_id, model.embedding_version.startswith(f"{embedding_model}:", autoescape=True),
+                        func.length(model.embed) > dimensions * 4) \
+                .order_by(model.id).limit(limit).all()
+
+    def get_ids_not_of_version(self, model, id_column, embedding_version):
+        """
+        Retrieve the IDs of the rows whose embedding is of another version, or of an unknown one.
+        :param model: The SQLAlchemy model storing the embeddings.
+        :param id_column: The column identifying the rows, such as PageData.page_id.
+        :param embedding_version: The expected version of the embeddings.
+        :return: The IDs of the rows.
+        """
+        with get_db_session() as session:
+            return session.scalars(session.query(id_column)
+                                   .filter(model.embed.is_not(None),
+                                           or_(model.embedding_version.is_(None),
+                                               model.embedding_version != embedding_version))
+                                   .order_by(id_column)).all()
+
+    def count_embeds_by_version(self, model):
+        """
+        Count the embeddings of a model by embedding version.
+        :param model: The SQLAlchemy model storing the embeddings.
+        :return: A dict of the number of embeddings by version, None for the embeddings of an unknown version.
+        """
+        with get_db_session() as session:
+            rows = session.query(model.embedding_version, func.count()) \
+                .filter(model.embed.is_not(None)) \
+                .group_by(model.embedding_version).all()
+            return dict(rows)
+
+    def update_embeds(self, model, embeds_by_id, embedding_version):
+        """
+        Replace embeddings with a single executemany UPDATE, leaving the other columns unchanged.
+        :param model: The SQLAlchemy model storing the embeddings.
+        :param embeds_by_id: The new embedding of each row by ID.
+        :param embedding_version: The version of the new embeddings.
+        """
+        if not embeds_by_id:
+            return
+
+        table = model.__table__
+        # Imported into the vector database again, by the next sync
+        statement = update(table).where(table.c.id == bindparam('b_id')) \
+            .values(**get_embed_bindparams(), embedding_version=embedding_version, last_synced_to_vector=None)
+        with get_db_session() as session:
+            session.execute(statement, [{'b_id': row_id, **get_embed_values(embed, 'b_')}
+                                        for row_id, embed in embeds_by_id.items()])
+
+    def mark_synced_to_vector(self, model, rows):
+        """
+        Record that embeddings were imported into the vector database. A row embedded again since it was read
+        is left unsynced, its new embedding being imported by the next sync.
+        :param model: The SQLAlchemy model storing the embeddings.
+        :param rows: The imported rows, with their id and last_embedded as read.
+        """
+        if not rows:
+            return
+
+        table = model.__table__
+        statement = update(table) \
+            .where(table.c.id == bindparam('b_id'), table.c.last_embedded == bindparam('b_last_embedded')) \
+            .values(last_synced_to_vector=bindparam('b_last_embedded'))
+        with get_db_session() as session:
+            session.execute(statement, [{'b_id': row.id, 'b_last_embedded': row.last_embedded} for row in rows])
+
+    def find_similar_ids(self, model, id_column, embedding, embedding_version, count, conditions=()):
+        """
+        Find the rows of a model whose embed_vector of a version is the most similar to an embedding.
+        :param model: The SQLAlchemy model storing the embeddings.
+        :param id_column: The column identifying the rows, such as PageChunk.chunk_id.
+        :param embedding: The embedding of the query.
+        :param embedding_version: The version of the embedding, and of the rows to search.
+        :param count: The number of rows to find.
+        :param conditions: Optional; the conditions of the rows to search.
+        :return: The (ID, cosine distance) pairs of the rows, the most similar first.
+        """
+        with get_db_session() as session:
+            return [(row[0], row.distance) for row in find_similar(session, session.query(id_column), model,
+                                                                   embedding, embedding_version, count, conditions)]
+
+    def count_embed_vectors(self, model, embedding_version):
+        """Count the rows of a model whose embed_vector of a version is searchable."""
+        with get_db_session() as session:
+            return session.query(func.count()).select_from(model) \
+                .filter(model.embedding_version == embedding_version, model.embed_vector.is_not(None)).scalar()
+
+    def get_embeds_without_vector(self, model, after_id, limit):
+        """
+        Retrieve the embeddings not copied to embed_vector yet, by ascending ID.
+        :return: A list of (id, embed) rows, embed being a float32 numpy array.
+        """
+        with get_db_session() as session:
+            return session.query(model.id, model.embed) \
+                .filter(model.id > after_id, model.embed.is_not(None), model.embed_vector.is_(None)) \
+                .order_by(model.id).limit(limit).all()
+
+    def update_embed_vectors(self, model, id_column, embeds_by_id):
+        """
+        Write the embed_vector of rows with a single executemany UPDATE, leaving their embed unchanged.
+        :param model: The SQLAlchemy model storing the embeddings.
+        :param id_column: The column identifying the rows, such as PageChunk.chunk_id.
+        :param embeds_by_id: The embedding of each row by ID, None to remove it from the searched rows.
+        """
+        if not embeds_by_id:
+            return
+
+        table = model.__table__
+        statement = update(table).where(table.c[id_column.key] == bindparam('b_id')) \
+            .values(embed_vector=bindparam('b_embed_vector'))
+        with get_db_session() as session:
+            session.execute(statement, [{'b_id': row_id, 'b_embed_vector': embed}
+                                        for row_id, embed in embeds_by_id.items()])
+
+    def clear_embed_vectors(self, model, *conditions):
+        """Remove the embed_vector of the rows of a model matching conditions from the searched rows."""
+        with get_db_session() as session:
+            session.query(model).filter(*conditions).update({model.embed_vector: None}, synchronize_session=False)
+
+    def create_vector_index(self, model, embedding_version):
+        """
+        Create the HNSW index of the embed_vector of a version, unless it exists, without locking the table.
+        The embeddings of more than HNSW_MAX_DIMENSIONS dimensions can't be indexed, and are searched exhaustively.
+        :return: Whether the index exists.
+        """
+        dimensions = get_version_dimensions(embedding_version)
+        if dimensions > HNSW_MAX_DIMENSIONS:
+            logging.warning(f"The {dimensions} dimensions embeddings of {model.__tablename__} of version "
+                            f"{embedding_version} can't be indexed, beyond {HNSW_MAX_DIMENSIONS} dimensions, "
+                            f"they are searched exhaustively.")
+            return False
+
+        version = embedding_version.replace("'", "''")
+        # CREATE INDEX CONCURRENTLY can't run in a transaction
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            connection.execute(text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {get_vector_index_name(model, embedding_version)} "
+                f"ON {model.__tablename__} USING hnsw ((embed_vector::vector({dimensions})) vector_cosine_ops) "
+                f"WHERE embedding_version = '{version}'"))
+        return True
+
+    def drop_vector_index(self, model, embedding_version):
+        """Drop the HNSW index of the embed_vector of a version, if it exists, without locking the table."""
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            connection.execute(text(
+                f"DROP INDEX CONCURRENTLY IF EXISTS {get_vector_index_name(model, embedding_version)}"))
+
+
+def get_vector_index_name(model, embedding_version):
+    """Name the HNSW index of the embed_vector of a version, within the 63 characters of PostgreSQL."""
+    return f"ix_{model.__tablename__}_embed_vector_{hashlib.md5(embedding_version.encode()).hexdigest()[:12]}"
@@ -0,0 +1,60 @@
+# ./database/embedding_cache_manager.py
+from datetime import datetime, timezone
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from models.embedding_cache import EmbeddingCacheEntry
+from database.database import get_db_session
+
+
+class EmbeddingCacheManager:
+    def __init__(self):
+        pass
+
+    def get_embeds(self, cache_keys):
+        """
+        Retrieve cached embeddings and mark them as used.
+        :param cache_keys: The cache keys to look up.
+        :return: A dict of the found embeddings by cache key, as float32 numpy arrays.
+        """
+        if not cache_keys:
+            return {}
+
+        with get_db_session() as session:
+            rows = session.query(EmbeddingCacheEntry.cache_key, EmbeddingCacheEntry.embed) \
+                .filter(EmbeddingCacheEntry.cache_key.in_(cache_keys)).all()
+            if rows:
+                session.query(EmbeddingCacheEntry) \
+                    .filter(EmbeddingCacheEntry.cache_key.in_([row.cache_key for row in rows])) \
+                    .update({EmbeddingCacheEntry.last_used: datetime.now(timezone.utc)}, synchronize_session=False)
+            return {row.cache_key: row.embed for row in rows}
+
+    def add_embeds(self, entries):
+        """
+        Cache embeddings, keeping the existing entry when a key is already cached.
+        :param entries: Dicts with the cache_key, model, dimensions and embed keys.
+        """
+        if not entries:
+            return
+
+        now = datetime.now(timezone.utc)
+        rows = {entry['cache_key']: {**entry, 'created_at': now, 'last_used': now} for entry in entries}
+        with get_db_session() as session:
+            session.execute(insert(EmbeddingCacheEntry).on_conflict_do_nothing(index_elements=['cache_key']),
+                            list(rows.values()))
+
+    def evict(self, max_bytes):
+        """
+        Delete the least recently used embeddings beyond a total size.
+        :param max_bytes: The maximum total size of the cached embeddings, in bytes.
+        :return: The number of deleted entries.
+        """
+        with get_db_session() as session:
+            result = session.execute(text(
+                "DELETE FROM embedding_cache WHERE id IN ("
+                "  SELECT id FROM ("
+                "    SELECT id, sum(length(embed)) OVER (ORDER BY last_used DESC, id DESC) AS cumulative_bytes"
+                "    FROM embedding_cache"
+                "  ) AS entries WHERE cumulative_bytes > :max_bytes"
+                ")"
+            ), {'max_bytes': max_bytes})
+            return result.rowcount
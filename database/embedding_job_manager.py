@@ -0,0 +1,160 @@
+# ./database/embedding_job_manager.py
+from datetime import datetime, timedelta, timezone
+import random
+from sqlalchemy import func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+import metrics
+from models.embedding_job import EmbeddingJob
+from database.database import get_db_session
+
+
+class EmbeddingJobManager:
+    def __init__(self):
+        pass
+
+    def enqueue(self, kind, target_ids):
+        """
+        Queue embedding jobs, available immediately.
+        A target already having a pending or running job is not queued again, its job is returned instead,
+        so that concurrent requests to embed a target are coalesced into one job.
+        :param kind: The kind of the jobs, EmbeddingJob.PAGE or EmbeddingJob.INTERACTION.
+        :param target_ids: The IDs of the pages or interactions to embed.
+        :return: The IDs of the jobs of the targets, in the order of the target IDs.
+        """
+        if not target_ids:
+            return []
+
+        target_ids = [str(target_id) for target_id in target_ids]
+        now = datetime.now(timezone.utc)
+        rows = [{'kind': kind, 'target_id': target_id, 'status': EmbeddingJob.PENDING, 'attempts': 0,
+                 'available_at': now, 'created_at': now} for target_id in dict.fromkeys(target_ids)]
+        # Conflicts on the unique index of the unfinished jobs, see the add_embedding_jobs_unfinished_index migration
+        unfinished = text(f"status IN ('{EmbeddingJob.PENDING}', '{EmbeddingJob.RUNNING}')")
+        statement = insert(EmbeddingJob) \
+            .on_conflict_do_nothing(index_elements=['kind', 'target_id'], index_where=unfinished) \
+            .returning(EmbeddingJob.target_id, EmbeddingJob.id)
+        with get_db_session() as session:
+            job_ids = {row.target_id: row.id for row in session.execute(statement, rows)}
+            coalesced_target_ids = [row['target_id'] for row in rows if row['target_id'] not in job_ids]
+            if coalesced_target_ids:
+                # The latest job of a target is the unfinished one, unless it finished since the insert
+                job_ids.update(session.query(EmbeddingJob.target_id, func.max(EmbeddingJob.id))
+                               .filter(EmbeddingJob.kind == kind, EmbeddingJob.target_id.in_(coalesced_target_ids))
+                               .group_by(EmbeddingJob.target_id).all())
+        metrics.increment('embedding_jobs.coalesced', len(coalesced_target_ids))
+        return [job_ids[target_id] for target_id in target_ids]
+
+    def claim(self, worker_id, limit, kinds=None):
+        """
+        Claim available pending jobs for a worker.
+        Jobs locked by another claiming transaction are skipped rather than waited for,
+        so concurrent workers, on any node, claim disjoint jobs without blocking each other.
+        :param worker_id: The identifier of the worker, recorded on the claimed jobs.
+        :param limit: The maximum number of jobs to claim.
+        :param kinds: Optional; only claim jobs of these kinds.
+        :return: The claimed jobs, rows with the id, kind, target_id and attempts (this one included) columns.
+        """
+        now = datetime.now(timezone.utc)
+        available = select(EmbeddingJob.id) \
+            .where(EmbeddingJob.status == EmbeddingJob.PENDING, EmbeddingJob.available_at <= now)
+        if kinds:
+            available = available.where(EmbeddingJob.kind.in_(kinds))
+        available = available.order_by(EmbeddingJob.id).limit(limit).with_for_update(skip_locked=True)
+
+        statement = update(EmbeddingJob) \
+            .where(EmbeddingJob.id.in_(available.scalar_subquery())) \
+            .values(status=EmbeddingJob.RUNNING, attempts=EmbeddingJob.attempts + 1,
+                    locked_at=now, locked_by=worker_id) \
+            .returning(EmbeddingJob.id, EmbeddingJob.kind, EmbeddingJob.target_id, EmbeddingJob.attempts)
+        with get_db_session() as session:
+            return sorted(session.execute(statement).all(), key=lambda job: job.id)
+
+    def complete(self, job_ids):
+        """
+        Mark running jobs as done.
+        :param job_ids: The IDs of the completed jobs.
+        """
+        if not job_ids:
+            return
+
+        with get_db_session() as session:
+            session.query(EmbeddingJob) \
+                .filter(EmbeddingJob.id.in_(job_ids), EmbeddingJob.status == EmbeddingJob.RUNNING) \
+                .update({EmbeddingJob.status: EmbeddingJob.DONE,
+                         EmbeddingJob.finished_at: datetime.now(timezone.utc)}, synchronize_session=False)
+
+    def fail(self, jobs, error, max_attempts, backoff_base, backoff_max):
+        """
+        Record the failure of running jobs. A job is retried after an exponential backoff with full jitter,
+        or moved to the dead state once it failed max_attempts times.
+        :param jobs: The failed jobs, as returned by claim.
+        :param error: The error message recorded on the jobs.
+        :param max_attempts: The number of attempts after which a job is dead.
+        :param backoff_base: The base delay in seconds of the backoff.
+        :param backoff_max: The maximum delay in seconds of the backoff.
+        :return: The IDs of the dead jobs.
+        """
+        now = datetime.now(timezone.utc)
+        dead_job_ids = []
+        with get_db_session() as session:
+            for job in jobs:
+                values = {EmbeddingJob.last_error: error, EmbeddingJob.locked_at: None, EmbeddingJob.locked_by: None}
+                if job.attempts >= max_attempts:
+                    values.update({EmbeddingJob.status: EmbeddingJob.DEAD, EmbeddingJob.finished_at: now})
+                    dead_job_ids.append(job.id)
+                else:
+                    delay = random.uniform(0, min(backoff_max, backoff_base * 2 ** job.attempts))
+                    values.update({EmbeddingJob.status: EmbeddingJob.PENDING,
+                                   EmbeddingJob.available_at: now + timedelta(seconds=delay)})
+                session.query(EmbeddingJob) \
+                    .filter(EmbeddingJob.id == job.id, EmbeddingJob.status == EmbeddingJob.RUNNING) \
+                    .update(values, synchronize_session=False)
+        return dead_job_ids
+
+    def release_stale(self, timeout, max_attempts):
+        """
+        Make running jobs locked for too long available again, as their worker stopped without finishing them.
+        Their attempt is counted, so a job killing its workers is moved to the dead state once it was claimed
+        max_attempts times, as a failed job would be.
+        :param timeout: The number of seconds after which a running job is considered abandoned.
+        :param max_attempts: The number of attempts after which a job is dead.
+        :return: The number of released jobs and the number of dead jobs.
+        """
+        now = datetime.now(timezone.utc)
+        values = {EmbeddingJob.locked_at: None, EmbeddingJob.locked_by: None,
+                  EmbeddingJob.last_error: 'Abandoned by its worker'}
+        with get_db_session() as session:
+            stale_jobs = session.query(EmbeddingJob) \
+                .filter(EmbeddingJob.status == EmbeddingJob.RUNNING,
+                        EmbeddingJob.locked_at < now - timedelta(seconds=timeout))
+            dead_count = stale_jobs.filter(EmbeddingJob.attempts >= max_attempts) \
+                .update({**values, EmbeddingJob.status: EmbeddingJob.DEAD, EmbeddingJob.finished_at: now},
+                        synchronize_session=False)
+            released_count = stale_jobs.filter(EmbeddingJob.attempts < max_attempts) \
+                .update({**values, EmbeddingJob.status: EmbeddingJob.PENDING, EmbeddingJob.available_at: now},
+                        synchronize_session=False)
+        return released_count, dead_count
+
+    def get_job(self, job_id):
+        """
+        Retrieve a job by its ID.
+        :param job_id: The ID of the job.
+        :return: The job, or None if not found.
+        """
+        with get_db_session() as session:
+            job = session.get(EmbeddingJob, job_id)
+            if job is not None:
+                session.expunge(job)
+            return job
+
+    def count_statuses(self, job_ids):
+        """
+        Count jobs by status.
+        :param job_ids: The IDs of the jobs.
+        :return: A dict of the number of jobs by status.
+        """
+        with get_db_session() as session:
+            rows = session.query(EmbeddingJob.status, func.count()) \
+                .filter(EmbeddingJob.id.in_(job_ids)) \
+                .group_by(EmbeddingJob.status).all()
+            return {status: count for status, count in rows}
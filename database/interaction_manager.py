@@ -1,7 +1,9 @@
 # ./database/interaction_manager.py
 from datetime import datetime, timezone
+from sqlalchemy import func, update
 from models.qa_interaction import QAInteraction
 from database.database import get_db_session
+from database.embed_vector_manager import find_similar, get_embed_values, is_unsynced_to_vector
 import json
 
 
@@ -10,7 +12,17 @@ class QAInteractionManager:
         pass
 
     def add_question_and_answer(self, question, answer, thread_id, assistant_thread_id, channel_id, question_ts,
-                                answer_ts, slack_user_id):
+                                answer_ts, slack_user_id, source_pages=None, answer_message_ts=None,
+                                cached_from_interaction_id=None, context_distances=None, context_chunk_count=None):
+        """
+        Store a question and its answer.
+        :param source_pages: Optional; the last updated date of each page the answer was generated from, by page ID.
+        :param answer_message_ts: Optional; the Slack timestamp of the answer message.
+        :param cached_from_interaction_id: Optional; the interaction whose answer was reused.
+        :param context_distances: Optional; the distances to the question of the chunks retrieved for its context.
+        :param context_chunk_count: Optional; the number of these chunks selected for the context.
+        :return: The ID of the interaction.
+        """
         with get_db_session() as session:
             serialized_answer = json.dumps(answer.__dict__) if not isinstance(answer, str) else answer
             interaction = QAInteraction(
@@ -22,11 +34,24 @@ class QAInteractionManager:
                 question_timestamp=question_ts,
                 answer_timestamp=answer_ts,
                 comments=json.dumps([]),
-                slack_user_id=slack_user_id
+                slack_user_id=slack_user_id,
+                source_pages=json.dumps({page_id: last_updated.isoformat() if last_updated else None
+                                         for page_id, last_updated in source_pages.items()})
+                if source_pages is not None else None,
+                answer_message_ts=answer_message_ts,
+                cached_from_interaction_id=cached_from_interaction_id,
+                context_distances=json.dumps(context_distances) if context_distances is not None else None,
+                context_chunk_count=context_chunk_count,
             )
             session.add(interaction)
+            session.flush()
+            return interaction.id
 
     def add_comment_to_interaction(self, thread_id, comment):
+        """
+        Add a comment to the interaction of a thread. A follow-up to a reused answer counts against the answer
+        it reused, so that it is no longer reused, as a negative reaction does.
+        """
         with get_db_session() as session:
             interaction = self.get_interaction_by_thread_id(session, thread_id)
             if interaction:
@@ -35,6 +60,11 @@ class QAInteractionManager:
                 comments = json.loads(interaction.comments)
                 comments.append(comment)
                 interaction.comments = json.dumps(comments)
+                if interaction.cached_from_interaction_id is not None:
+                    session.query(QAInteraction) \
+                        .filter(QAInteraction.id == interaction.cached_from_interaction_id) \
+                        .update({QAInteraction.negative_reactions: QAInteraction.negative_reactions + 1},
+                                synchronize_session=False)
 
     def get_interaction_by_thread_id(self, session, thread_id):
         return session.query(QAInteraction).filter_by(thread_id=thread_id).first()
@@ -45,25 +75,99 @@ class QAInteractionManager:
     def get_interactions_by_interaction_ids(self, session, interaction_ids):
         return session.query(QAInteraction).filter(QAInteraction.id.in_(interaction_ids)).all()
 
+    def find_similar_interactions(self, session, embedding, embedding_version, count):
+        """
+        Find the interactions most similar to an embedding by a single query of their embed_vector,
+        for the pgvector store, the most similar first.
+        """
+        return [row.QAInteraction for row in find_similar(session, session.query(QAInteraction), QAInteraction,
+                                                          embedding, embedding_version, count)]
+
+    def get_reusable_interactions(self, session, interaction_ids, answered_since):
+        """
+        Find the interactions whose answer may be reused for a similar question: answered since a date from known
+        source pages, and without negative reactions or follow-ups in their thread. Answers reusing another answer
+        are left out, the original answer being reused instead.
+        :param interaction_ids: The IDs of the interactions to check.
+        :param answered_since: The date of the oldest answer to reuse.
+        :return: The reusable QAInteraction records, in the order of interaction_ids.
+        """
+        interactions = session.query(QAInteraction).filter(
+            QAInteraction.id.in_(interaction_ids),
+            QAInteraction.answer_text.is_not(None),
+            QAInteraction.source_pages.is_not(None),
+            QAInteraction.answer_timestamp >= answered_since,
+            QAInteraction.negative_reactions == 0,
+            QAInteraction.cached_from_interaction_id.is_(None),
+            func.coalesce(QAInteraction.comments, '[]') == '[]',
+        ).all()
+        rank = {interaction_id: i for i, interaction_id in enumerate(interaction_ids)}
+        return sorted(interactions, key=lambda interaction: rank[interaction.id])
+
+    def add_negative_reaction(self, channel_id, answer_message_ts):
+        """
+        Count a negative reaction to an answer, against the answer it reused too, so that it is no longer reused.
+        :param channel_id: The ID of the Slack channel of the answer message.
+        :param answer_message_ts: The Slack timestamp of the answer message.
+        :return: Whether the message is the answer of an interaction.
+        """
+        with get_db_session() as session:
+            interaction = session.query(QAInteraction).filter_by(channel_id=channel_id,
+                                                                 answer_message_ts=answer_message_ts).first()
+            if interaction is None:
+                return False
+            session.query(QAInteraction) \
+                .filter(QAInteraction.id.in_([interaction.id, interaction.cached_from_interaction_id])) \
+                .update({QAInteraction.negative_reactions: QAInteraction.negative_reactions + 1},
+                        synchronize_session=False)
+            return True
+
     def get_qa_interactions(self, session):
         return session.query(QAInteraction).all()
 
+    def get_questions_by_thread_id(self, session):
+        """Return (thread_id, question_text) rows of all interactions, without loading the other columns."""
+        return session.query(QAInteraction.thread_id, QAInteraction.question_text).all()
+
     def add_embed_to_interaction(self, session, interaction_id, embed):
-        interaction = session.query(QAInteraction).filter_by(id=interaction_id).first()
-        if interaction:
-            interaction.embed = json.dumps(embed)
-            interaction.last_embedded = datetime.now(timezone.utc)
+        session.query(QAInteraction).filter_by(id=interaction_id).update({
+            **get_embed_values(embed),
+            QAInteraction.last_embedded: datetime.now(timezone.utc),
+        }, synchronize_session=False)
+
+    def add_embeds_to_interactions(self, session, embeds_by_interaction_id, embedding_version=None):
+        """
+        Store the embeds of several interactions with a single executemany UPDATE by primary key,
+        tagged with the version of their embedding.
+        """
+        now = datetime.now(timezone.utc)
+        session.execute(update(QAInteraction), [
+            {'id': interaction_id, **get_embed_values(embed), 'embedding_version': embedding_version,
+             'last_embedded': now}
+            for interaction_id, embed in embeds_by_interaction_id.items()
+        ])
 
     def get_interactions_without_embeds(self, session):
-        return session.query(QAInteraction).filter(
+        """Return the id rows of the interactions without embeds."""
+        return session.query(QAInteraction.id).filter(
             (QAInteraction.embed.is_(None)) |
-            (QAInteraction.embed == json.dumps([])) |
-            (QAInteraction.embed == '')
+            (func.length(QAInteraction.embed) == 0)
         ).all()
 
-    def get_interactions_with_embeds(self, session):
-        return session.query(QAInteraction).filter(
-            (QAInteraction.embed.is_not(None)) |
-            (QAInteraction.embed == json.dumps([])) |
-            (QAInteraction.embed == '')
-        ).all()
+    def get_interactions_with_embeds(self, session, unsynced_only=False, after_id=0, limit=None):
+        """
+        Return (id, embed, embedding_version, last_embedded) rows of the interactions with embeds, by ascending ID.
+        :param unsynced_only: Only include the interactions embedded since they were last imported
+            into the vector database.
+        :param after_id: Only include the interactions of a greater ID, to page through them.
+        :param limit: Optional; the maximum number of interactions to return.
+        """
+        query = session.query(QAInteraction.id, QAInteraction.embed, QAInteraction.embedding_version,
+                              QAInteraction.last_embedded).filter(
+            (QAInteraction.embed.is_not(None)) &
+            (func.length(QAInteraction.embed) > 0) &
+            (QAInteraction.id > after_id)
+        )
+        if unsynced_only:
+            query = query.filter(is_unsynced_to_vector(QAInteraction))
+        return query.order_by(QAInteraction.id).limit(limit).all()
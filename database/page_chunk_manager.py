@@ -0,0 +1,118 @@
+# ./database/page_chunk_manager.py
+from collections import namedtuple
+from datetime import datetime, timezone
+from sqlalchemy import insert
+from models.page_chunk import PageChunk
+from models.page_data import PageData
+from database.database import get_db_session
+from database.embed_vector_manager import find_similar, get_embed_values, is_unsynced_to_vector
+
+
+# A chunk with the title, space key and last updated date of its page, and its distance to the question
+# it was retrieved for, like the rows of find_similar_chunks
+ChunkRow = namedtuple('ChunkRow', ['PageChunk', 'title', 'space_key', 'lastUpdated', 'distance'])
+
+
+class PageChunkManager:
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def make_chunk_id(page_id, chunk_index):
+        return f"{page_id}:{chunk_index}"
+
+    def replace_chunks(self, chunks_by_page):
+        """
+        Replace the chunks of pages with newly embedded ones, in a single transaction.
+
+        Args:
+            chunks_by_page (dict): The chunks of each page ID in page order, dicts with the start_offset,
+                end_offset, content, token_count, embed and embedding_version keys.
+        """
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                'chunk_id': self.make_chunk_id(page_id, chunk_index),
+                'page_id': page_id,
+                'chunk_index': chunk_index,
+                'start_offset': chunk['start_offset'],
+                'end_offset': chunk['end_offset'],
+                'content': chunk['content'],
+                'token_count': chunk['token_count'],
+                **get_embed_values(chunk['embed']),
+                'embedding_version': chunk['embedding_version'],
+                'last_embedded': now,
+            }
+            for page_id, chunks in chunks_by_page.items()
+            for chunk_index, chunk in enumerate(chunks)
+        ]
+
+        with get_db_session() as session:
+            session.query(PageChunk).filter(PageChunk.page_id.in_(list(chunks_by_page))) \
+                .delete(synchronize_session=False)
+            if rows:
+                session.execute(insert(PageChunk), rows)
+        print(f"{len(rows)} chunks stored for {len(chunks_by_page)} pages.")
+
+    def get_chunk_embeds(self, space_key=None, embedded_since=None, unsynced_only=False, after_page_id=None,
+                         page_limit=None):
+        """
+        Retrieve the embeddings of the page chunks, by page.
+        :param space_key: Optional; only include the chunks of the pages of this space.
+        :param embedded_since: Optional; only include the chunks embedded on or after this date.
+        :param unsynced_only: Only include the pages with chunks embedded since they were last imported
+            into the vector database, with all their chunks.
+        :param after_page_id: Optional; only include the pages of a greater ID, to page through them.
+        :param page_limit: Optional; the maximum number of pages to include the chunks of.
+        :return: A list of (id, chunk_id, page_id, chunk_index, space_key, author, lastUpdated, embed,
+            embedding_version, last_embedded) rows, the space key, author and last updated date being the ones
+            of the page, embed being a float32 numpy array, ordered by page ID and chunk index.
+        """
+        with get_db_session() as session:
+            page_ids = session.query(PageChunk.page_id).filter(PageChunk.embed.is_not(None))
+            if space_key:
+                page_ids = page_ids.join(PageData, PageData.page_id == PageChunk.page_id) \
+                    .filter(PageData.space_key == space_key)
+            if embedded_since:
+                page_ids = page_ids.filter(PageChunk.last_embedded >= embedded_since)
+            if unsynced_only:
+                page_ids = page_ids.filter(is_unsynced_to_vector(PageChunk))
+            if after_page_id is not None:
+                page_ids = page_ids.filter(PageChunk.page_id > after_page_id)
+            page_ids = page_ids.distinct().order_by(PageChunk.page_id).limit(page_limit)
+
+            return session.query(PageChunk.id, PageChunk.chunk_id, PageChunk.page_id, PageChunk.chunk_index,
+                                 PageData.space_key, PageData.author, PageData.lastUpdated,
+                                 PageChunk.embed, PageChunk.embedding_version, PageChunk.last_embedded) \
+                .join(PageData, PageData.page_id == PageChunk.page_id) \
+                .filter(PageChunk.embed.is_not(None), PageChunk.page_id.in_(page_ids.scalar_subquery())) \
+                .order_by(PageChunk.page_id, PageChunk.chunk_index).all()
+
+    def find_chunks(self, chunk_ids, session, distances=None):
+        """
+        Find chunks by their IDs, with the title, space key and last updated date of their page.
+        :param chunk_ids: The IDs of the chunks to find.
+        :param distances: Optional; the distance of each chunk to the question, as found by a vector store.
+        :return: A list of ChunkRow, in the order of chunk_ids, without distance when no distances are given.
+        """
+        rows = session.query(PageChunk, PageData.title, PageData.space_key, PageData.lastUpdated) \
+            .join(PageData, PageData.page_id == PageChunk.page_id) \
+            .filter(PageChunk.chunk_id.in_(chunk_ids)).all()
+        rank = {chunk_id: i for i, chunk_id in enumerate(chunk_ids)}
+        return [ChunkRow(*row, distances[rank[row.PageChunk.chunk_id]] if distances is not None else None)
+                for row in sorted(rows, key=lambda row: rank[row.PageChunk.chunk_id])]
+
+    def find_similar_chunks(self, embedding, embedding_version, count, session, conditions=()):
+        """
+        Find the chunks most similar to an embedding, with the title, space key and last updated date of their page,
+        by a single query of their embed_vector, for the pgvector store.
+        :param embedding: The embedding of the question.
+        :param embedding_version: The version of the embedding, and of the chunks to search.
+        :param count: The number of chunks to find.
+        :param conditions: Optional; the conditions of the chunks to search, such as the spaces of their pages.
+        :return: A list of (PageChunk, title, space_key, lastUpdated, distance) rows, the most similar first,
+            like the ChunkRow of find_chunks.
+        """
+        query = session.query(PageChunk, PageData.title, PageData.space_key, PageData.lastUpdated) \
+            .join(PageData, PageData.page_id == PageChunk.page_id)
+        return find_similar(session, query, PageChunk, embedding, embedding_version, count, conditions).all()
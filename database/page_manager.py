@@ -1,9 +1,16 @@
 # ./database/nur_database.py
 from typing import List, Optional
+from sqlalchemy import bindparam, literal_column, update
+from sqlalchemy.orm import undefer
+from sqlalchemy.dialects.postgresql import insert
+from configuration import page_import_batch_size
+from models.page_chunk import PageChunk
 from models.page_data import PageData
 from datetime import datetime, timezone
 from database.database import get_db_session
-import json
+from database.embed_vector_manager import get_embed_bindparams, get_embed_values, is_unsynced_to_vector
+import hashlib
+import logging
 
 
 class PageManager:
@@ -22,69 +29,191 @@ class PageManager:
         """
         return datetime.fromisoformat(date_string.replace('Z', '+00:00'))
 
-    def store_pages_data(self, space_key, pages):
+    def store_pages_data(self, space_key, pages, batch_size=page_import_batch_size):
         """
         Store Confluence page data into the database.
+        Pages are consumed lazily and upserted in batches, so an import generator can be passed directly
+        and pages are persisted while the rest of the space is still being retrieved.
+
+        Args:
+        space_key (str): The key of the Confluence space.
+        pages (iterable): An iterable of page data
+        batch_size (int): The number of pages upserted per statement and transaction.
+
+        Returns:
+        dict: The number of inserted, updated and unchanged pages.
+        """
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+        def store(batch):
+            for key, count in self.store_pages_batch(space_key, batch).items():
+                counts[key] += count
+            logging.info(f"Stored {sum(counts.values())} pages of space {space_key}: {counts}")
+
+        batch = []
+        for page in pages:
+            batch.append(page)
+            if len(batch) >= batch_size:
+                store(batch)
+                batch = []
+
+        if batch:
+            store(batch)
+
+        return counts
+
+    def store_pages_batch(self, space_key, pages):
+        """
+        Upsert a batch of Confluence page data with a single INSERT ... ON CONFLICT (page_id) DO UPDATE statement,
+        relying on the unique ix_page_data_page_id index.
+        Existing pages whose content hash, space and last updated date did not change are left untouched.
+        The embeddings of the updated pages and of their chunks are imported into the vector database again,
+        with the space and last updated date they are filtered by, even when their content did not change.
 
         Args:
         space_key (str): The key of the Confluence space.
         pages (list): A list of page data
+
+        Returns:
+        dict: The number of inserted, updated and unchanged pages.
         """
+        # Keyed by page ID, as a statement can't update the same row twice
+        rows = {}
+        for page in pages:
+            row = {
+                'page_id': page['pageId'],
+                'space_key': space_key,
+                'title': page['title'],
+                'author': page['author'],
+                'createdDate': self.parse_datetime(page['createdDate']),
+                'lastUpdated': self.parse_datetime(page['lastUpdated']),
+                'content': page['content'],
+                'comments': page['comments'],
+            }
+            row['content_hash'] = self.compute_content_hash(PageData(**row))
+            rows[row['page_id']] = row
+
+        statement = insert(PageData.__table__)
+        excluded = statement.excluded
+        statement = statement.on_conflict_do_update(
+            index_elements=[PageData.page_id],
+            set_={
+                'space_key': excluded.space_key,
+                'title': excluded.title,
+                'lastUpdated': excluded.lastUpdated,
+                'content': excluded.content,
+                'comments': excluded.comments,
+                'content_hash': excluded.content_hash,
+                'last_synced_to_vector': None,
+            },
+            where=(PageData.content_hash.is_distinct_from(excluded.content_hash) |
+                   PageData.space_key.is_distinct_from(excluded.space_key) |
+                   PageData.lastUpdated.is_distinct_from(excluded.lastUpdated)),
+        ).returning(PageData.page_id,
+                    literal_column('xmax = 0').label('inserted'))  # xmax is only 0 for freshly inserted rows
+
         with get_db_session() as session:
-            for page in pages:
-                page_id = page['pageId']
-                old_page = session.query(PageData).filter_by(page_id=page_id).first()
-                if old_page:
-                    old_page.title = page['title']
-                    old_page.lastUpdated = self.parse_datetime(page['lastUpdated'])
-                    old_page.content = page['content']
-                    old_page.comments = page['comments']
-                    print(f"Page with ID {page_id} updated.")
-                else:
-                    new_page = PageData(page_id=page_id,
-                                        space_key=space_key,
-                                        title=page['title'],
-                                        author=page['author'],
-                                        createdDate=self.parse_datetime(page['createdDate']),
-                                        lastUpdated=self.parse_datetime(page['lastUpdated']),
-                                        content=page['content'],
-                                        comments=page['comments']
-                                        )
-                    session.add(new_page)
-                    print(f"Page with ID {page_id} created.")
+            # Executed as a batched multi-row INSERT with a cached compiled statement
+            results = session.execute(statement, list(rows.values())).all()
+            inserted = [result.inserted for result in results]
+            updated_page_ids = [result.page_id for result in results if not result.inserted]
+            if updated_page_ids:
+                session.query(PageChunk).filter(PageChunk.page_id.in_(updated_page_ids)) \
+                    .update({PageChunk.last_synced_to_vector: None}, synchronize_session=False)
+
+        inserted_count = sum(inserted)
+        return {
+            'inserted': inserted_count,
+            'updated': len(inserted) - inserted_count,
+            'unchanged': len(rows) - len(inserted),
+        }
+
+    def compute_content_hash(self, page: PageData) -> str:
+        """
+        Compute the hash of the normalized text embedded for a page, as produced by format_page_for_llm.
+        The dates are left out and whitespace is collapsed,
+        so that metadata-only updates and whitespace edits keep the same hash.
+        :param page: The page data.
+        :return: The SHA-256 hex digest of the normalized page text.
+        """
+        lines = [line for line in self.format_page_for_llm(page).splitlines()
+                 if not line.startswith(('createdDate: ', 'lastUpdated: '))]
+        normalized = ' '.join('\n'.join(lines).split())
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
 
     def get_page_ids_missing_embeds(self):
         """
         Retrieve the page IDs of pages that are missing embeddings.
+        Pages updated since they were embedded are skipped when their content hash did not change.
         :return: A list of page IDs.
         """
         with get_db_session() as session:
-            records = session.query(PageData).filter(
-                (PageData.lastUpdated > PageData.last_embedded) |
-                (PageData.last_embedded.is_(None))
+            records = session.query(PageData.page_id).filter(
+                (PageData.last_embedded.is_(None)) |
+                ((PageData.lastUpdated > PageData.last_embedded) &
+                 (PageData.embedded_content_hash.is_(None) |
+                  PageData.embedded_content_hash.is_distinct_from(PageData.content_hash)))
             ).all()
             page_ids = [record.page_id for record in records]
             return page_ids
 
-    def get_all_page_data_from_db(self, space_key=None):
+    def get_all_page_data_from_db(self, space_key=None, embedded_since=None):
         """
         Retrieve all page data and embeddings from the database. If a space_key is provided,
         filter the records to only include pages from that specific space.
         :param space_key: Optional; the specific space key to filter pages by.
-        :return: Tuple of page_ids (list of page IDs), all_documents (list of document strings), and embeddings (list of embeddings as strings)
+        :param embedded_since: Optional; only include pages embedded on or after this date.
+        :return: Tuple of page_ids (list of page IDs), all_documents (list of document strings), and embeddings (list of float32 numpy arrays)
         """
         with get_db_session() as session:
+            query = session.query(PageData).options(undefer(PageData.embed))
             if space_key:
-                records = session.query(PageData).filter(PageData.space_key == space_key).all()
-            else:
-                records = session.query(PageData).all()
+                query = query.filter(PageData.space_key == space_key)
+            if embedded_since:
+                query = query.filter(PageData.last_embedded >= embedded_since)
+            records = query.all()
 
             formatted = self.format_page_data(records)
             return formatted
 
+    def get_page_embeds(self, space_key=None, embedded_since=None, unsynced_only=False, after_id=0, limit=None):
+        """
+        Retrieve the IDs and embeddings of the embedded pages, without loading their content, by ascending ID.
+        :param space_key: Optional; the specific space key to filter pages by.
+        :param embedded_since: Optional; only include pages embedded on or after this date.
+        :param unsynced_only: Only include the pages embedded since they were last imported into the vector database.
+        :param after_id: Only include the pages of a greater ID, to page through them.
+        :param limit: Optional; the maximum number of pages to retrieve.
+        :return: A list of (id, page_id, space_key, author, lastUpdated, embed, embedding_version, last_embedded)
+            rows, embed being a float32 numpy array.
+        """
+        with get_db_session() as session:
+            query = session.query(PageData.id, PageData.page_id, PageData.space_key, PageData.author,
+                                  PageData.lastUpdated, PageData.embed, PageData.embedding_version,
+                                  PageData.last_embedded) \
+                .filter(PageData.embed.is_not(None), PageData.id > after_id)
+            if space_key:
+                query = query.filter(PageData.space_key == space_key)
+            if embedded_since:
+                query = query.filter(PageData.last_embedded >= embedded_since)
+            if unsynced_only:
+                query = query.filter(is_unsynced_to_vector(PageData))
+            return query.order_by(PageData.id).limit(limit).all()
+
+    def get_page_versions(self, page_ids):
+        """
+        Retrieve the space and last updated date of pages, without loading their content.
+        :param page_ids: The IDs of the pages.
+        :return: The (space_key, lastUpdated) of each existing page, by page ID.
+        """
+        with get_db_session() as session:
+            rows = session.query(PageData.page_id, PageData.space_key, PageData.lastUpdated) \
+                .filter(PageData.page_id.in_(page_ids)).all()
+            return {row.page_id: (row.space_key, row.lastUpdated) for row in rows}
+
     def format_page_data(self, records):
         page_ids = [record.page_id for record in records]
-        embeddings = [record.embed for record in records]  # Assuming embed is directly stored as a string
+        embeddings = [record.embed for record in records]  # float32 numpy arrays, or None when not embedded yet
         all_documents = [
             f"Page id: {record.page_id}, space key: {record.space_key}, title: {record.title}, "
             f"author: {record.author}, created date: {record.createdDate}, last updated: {record.lastUpdated}, "
@@ -93,24 +222,55 @@ class PageManager:
         ]
         return page_ids, all_documents, embeddings
 
-    def add_or_update_embed_vector(self, page_id, embed_vector):
+    def add_or_update_embed_vector(self, page_id, embed_vector, content_hash=None):
         """
         Add or update the embed vector data for a specific page in the database, and update the last_embedded timestamp.
 
         Args:
             page_id (str): The ID of the page to update.
             embed_vector: The embed vector data to be added or updated, expected to be a list of floats.
+            content_hash (str): The content hash of the page text the vector was computed from.
         """
         with get_db_session() as session:
-            page = session.query(PageData).filter_by(page_id=page_id).first()
+            # Updated in place, without loading the page
+            updated = session.query(PageData).filter_by(page_id=page_id).update({
+                **get_embed_values(embed_vector),
+                PageData.embedded_content_hash: content_hash,
+                PageData.last_embedded: datetime.now(timezone.utc),
+            }, synchronize_session=False)
 
-            if page:
-                page.embed = json.dumps(embed_vector)
-                page.last_embedded = datetime.now(timezone.utc)
+            if updated:
                 print(f"Embed vector and last_embedded timestamp for page ID {page_id} have been updated.")
             else:
                 print(f"No page found with ID {page_id}. Consider handling this case as needed.")
 
+    def add_or_update_embed_vectors(self, page_embeds):
+        """
+        Add or update the embed vectors of several pages with a single executemany UPDATE,
+        and update their last_embedded timestamp.
+
+        Args:
+            page_embeds (list): Dicts with the page_id, embed (list or array of floats), content_hash
+                and embedding_version keys.
+        """
+        if not page_embeds:
+            return
+
+        now = datetime.now(timezone.utc)
+        statement = update(PageData.__table__) \
+            .where(PageData.__table__.c.page_id == bindparam('b_page_id')) \
+            .values(**get_embed_bindparams(),
+                    embedded_content_hash=bindparam('b_content_hash'),
+                    embedding_version=bindparam('b_embedding_version'),
+                    last_embedded=bindparam('b_last_embedded'))
+        with get_db_session() as session:
+            session.execute(statement, [{'b_page_id': page_embed['page_id'],
+                                         **get_embed_values(page_embed['embed'], 'b_'),
+                                         'b_content_hash': page_embed['content_hash'],
+                                         'b_embedding_version': page_embed['embedding_version'],
+                                         'b_last_embedded': now} for page_embed in page_embeds])
+        print(f"Embed vectors and last_embedded timestamps of {len(page_embeds)} pages have been updated.")
+
     def find_page(self, page_id, session) -> Optional[PageData]:
         """
         Find a page in the database by its ID.
@@ -44,5 +44,5 @@ class QuizQuestionManager:
 
     def get_unposted_questions_timestamps(self):
         with get_db_session() as session:
-            questions = session.query(QuizQuestion).filter_by(posted_on_confluence=None).all()
+            questions = session.query(QuizQuestion.thread_id).filter_by(posted_on_confluence=None).all()
             return [question.thread_id for question in questions]
@@ -0,0 +1,40 @@
+# ./database/rate_limit_manager.py
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from models.rate_limit_bucket import RateLimitBucket
+from database.database import get_db_session
+
+
+class RateLimitManager:
+    def __init__(self):
+        pass
+
+    def update_buckets(self, capacities, update):
+        """
+        Lock token buckets and update their levels within a single transaction,
+        so that the processes sharing the buckets take their tokens one after the other.
+        The buckets are locked in name order, so that transactions locking several buckets can't deadlock.
+        :param capacities: The capacity of each bucket by name, missing buckets are created full.
+        :param update: Called with the (tokens, updated_at) level of each bucket by name and the current time
+            in seconds since the epoch on the database clock. Returns the new tokens of each bucket by name,
+            or None to leave the buckets unchanged, and a result.
+        :return: The result returned by update.
+        """
+        clock = select(func.extract('epoch', func.clock_timestamp())).scalar_subquery()
+        with get_db_session() as session:
+            session.execute(insert(RateLimitBucket)
+                            .values([{'name': name, 'tokens': capacity, 'updated_at': clock}
+                                     for name, capacity in capacities.items()])
+                            .on_conflict_do_nothing(index_elements=['name']))
+            buckets = session.query(RateLimitBucket) \
+                .filter(RateLimitBucket.name.in_(list(capacities))) \
+                .order_by(RateLimitBucket.name).with_for_update().all()
+            # Read once the buckets are locked, as waiting for the lock may take a while
+            now = float(session.execute(select(clock)).scalar())
+
+            new_tokens, result = update({bucket.name: (bucket.tokens, bucket.updated_at) for bucket in buckets}, now)
+            if new_tokens is not None:
+                for bucket in buckets:
+                    bucket.tokens = new_tokens[bucket.name]
+                    bucket.updated_at = now
+            return result
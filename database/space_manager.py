@@ -18,3 +18,10 @@ def upsert_space_info(space_key, space_name, last_import_date):
                 last_import_date=last_import_date_formatted
             )
             session.add(new_space)
+
+
+def get_last_import_date(space_key):
+    """Get the date of the last import of a space, or None if the space was never imported."""
+    with get_db_session() as session:
+        space = session.query(SpaceInfo).filter_by(space_key=space_key).first()
+        return space.last_import_date if space else None
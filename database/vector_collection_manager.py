@@ -0,0 +1,92 @@
+# ./database/vector_collection_manager.py
+from datetime import datetime, timezone
+from models.vector_collection import VectorCollection
+from database.database import get_db_session
+
+
+class VectorCollectionManager:
+    def __init__(self):
+        pass
+
+    def get_collections(self, aliases=None, statuses=None):
+        """
+        Retrieve the vector collections of aliases.
+        :param aliases: Optional; only include the collections of these aliases.
+        :param statuses: Optional; only include the collections of these statuses.
+        :return: The VectorCollection records, detached from the session.
+        """
+        with get_db_session() as session:
+            query = session.query(VectorCollection)
+            if aliases:
+                query = query.filter(VectorCollection.alias.in_(aliases))
+            if statuses:
+                query = query.filter(VectorCollection.status.in_(statuses))
+            collections = query.order_by(VectorCollection.id).all()
+            session.expunge_all()
+            return collections
+
+    def add_building_collection(self, alias, name, embedding_version, embedding_model, embedding_dimensions):
+        """
+        Register the collection being built for an alias, unless it is already registered.
+        A collection being built for another embedding version is retired, the alias being rebuilt for the new one.
+        :param alias: The alias of the collection, such as pages.
+        :param name: The name of the collection in the vector database.
+        :param embedding_version: The version of the embeddings of the collection.
+        :param embedding_model: The embedding model of the collection.
+        :param embedding_dimensions: The dimensions of the embeddings, None for the native dimensions of the model.
+        :return: The collections retired in favour of the new one.
+        """
+        with get_db_session() as session:
+            building = session.query(VectorCollection) \
+                .filter(VectorCollection.alias == alias, VectorCollection.status == VectorCollection.BUILDING) \
+                .with_for_update().all()
+            retired = [collection for collection in building if collection.name != name]
+            for collection in retired:
+                collection.status = VectorCollection.RETIRED
+            if len(retired) == len(building):
+                session.add(VectorCollection(alias=alias, name=name, status=VectorCollection.BUILDING,
+                                             embedding_version=embedding_version, embedding_model=embedding_model,
+                                             embedding_dimensions=embedding_dimensions,
+                                             created_at=datetime.now(timezone.utc)))
+            session.flush()
+            session.expunge_all()
+            return retired
+
+    def switch_live_collections(self, aliases):
+        """
+        Make the collections being built for aliases live, and retire the collections they replace,
+        in a single transaction so that the aliases switch together.
+        :param aliases: The aliases to switch, each having a collection being built.
+        :return: The retired collections.
+        """
+        with get_db_session() as session:
+            collections = session.query(VectorCollection) \
+                .filter(VectorCollection.alias.in_(aliases),
+                        VectorCollection.status.in_([VectorCollection.BUILDING, VectorCollection.LIVE])) \
+                .with_for_update().all()
+            building_aliases = {collection.alias for collection in collections
+                                if collection.status == VectorCollection.BUILDING}
+            if missing_aliases := set(aliases) - building_aliases:
+                raise ValueError(f"No collection being built for the aliases {sorted(missing_aliases)}")
+
+            now = datetime.now(timezone.utc)
+            retired = []
+            for collection in collections:
+                if collection.status == VectorCollection.LIVE:
+                    collection.status = VectorCollection.RETIRED
+                    retired.append(collection)
+                else:
+                    collection.status = VectorCollection.LIVE
+                collection.switched_at = now
+            session.flush()
+            session.expunge_all()
+            return retired
+
+    def delete_collections(self, collection_ids):
+        """
+        Delete the records of collections.
+        :param collection_ids: The IDs of the collections.
+        """
+        with get_db_session() as session:
+            session.query(VectorCollection).filter(VectorCollection.id.in_(collection_ids)) \
+                .delete(synchronize_session=False)
@@ -0,0 +1,141 @@
+# ./interactions/answer_cache.py
+"""
+Semantic cache of the answers to the questions asked again, such as how to connect to the VPN, which answers them
+right away instead of running the assistant again.
+
+The interactions most similar to a question are looked up in the interactions collection, whose embeddings are
+the ones of their question with their answer and comments. The question of each candidate is then compared with
+the question itself, as the embeddings of two phrasings of a question are far more similar than the ones of
+a question and of an interaction. The answer of a candidate is reused when:
+- its question is at least answer_cache_similarity_threshold similar to the question,
+- it was answered within answer_cache_max_age_days, from pages that were not updated since,
+  all in the spaces the channel is routed to, if any,
+- it drew no follow-up in its thread, and no negative reaction, neither to it nor to the answers reusing it.
+"""
+import json
+import logging
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import metrics
+from configuration import (
+    answer_cache_candidate_count,
+    answer_cache_max_age_days,
+    answer_cache_similarity_threshold,
+    vector_collection_interactions,
+)
+from database.database import get_db_session
+from database.interaction_manager import QAInteractionManager
+from database.page_manager import PageManager
+from open_ai.embedding.embed_manager import embed_text, embed_texts_in_batches
+from open_ai.rate_limiter import INTERACTIVE
+from vector.collections import get_live_collection
+from vector.stores import get_store
+
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def find_cached_answer(question, space_keys=None):
+    """
+    Find a previous answer to reuse for a question.
+    :param question: The text of the question.
+    :param space_keys: Optional; the keys of the spaces the question may be answered from.
+    :return: The (QAInteraction, similarity) of the answer to reuse, detached from the session,
+        or None to answer the question with the assistant.
+    """
+    live_collection = get_live_collection(vector_collection_interactions)
+    embedding = embed_text(text=question, model=live_collection.embedding_model,
+                           dimensions=live_collection.embedding_dimensions)
+    similar = get_store().query(live_collection.name, embedding, answer_cache_candidate_count)
+    candidate_ids = [id for id, _ in similar]
+    if not candidate_ids:
+        return None
+
+    answered_since = datetime.now() - timedelta(days=answer_cache_max_age_days)
+    with get_db_session() as session:
+        candidates = QAInteractionManager().get_reusable_interactions(session, [int(id) for id in candidate_ids],
+                                                                      answered_since)
+        session.expunge_all()
+    metrics.increment('answer_cache.rejected.feedback_or_age', len(candidate_ids) - len(candidates))
+    if not candidates:
+        return None
+
+    # The questions were embedded with the same model when they were asked, so their embeddings are cached
+    question_embeddings = embed_texts_in_batches([candidate.question_text for candidate in candidates],
+                                                 model=live_collection.embedding_model, priority=INTERACTIVE,
+                                                 dimensions=live_collection.embedding_dimensions)
+    similarities = get_similarities(embedding, question_embeddings)
+    for candidate, similarity in sorted(zip(candidates, similarities), key=lambda pair: -pair[1]):
+        if similarity < answer_cache_similarity_threshold:
+            metrics.increment('answer_cache.rejected.dissimilar')
+            break
+        if not is_fresh(candidate, space_keys):
+            metrics.increment('answer_cache.rejected.stale')
+            continue
+        return candidate, similarity
+    return None
+
+
+def get_similarities(embedding, embeddings):
+    """The cosine similarity of an embedding to each of several embeddings."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    embedding = np.asarray(embedding, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(embedding)
+    return (embeddings @ embedding / np.where(norms, norms, 1)).tolist()
+
+
+def is_fresh(interaction, space_keys=None):
+    """
+    Whether the pages an answer was generated from still exist, were not updated since, and are all in spaces.
+    :param interaction: The QAInteraction of the answer, with its source pages.
+    :param space_keys: Optional; the keys of the spaces the pages must be in.
+    """
+    source_pages = json.loads(interaction.source_pages)
+    if not source_pages:
+        return False
+    pages = PageManager().get_page_versions(list(source_pages))
+    for page_id, last_updated in source_pages.items():
+        if page_id not in pages:
+            return False
+        space_key, page_last_updated = pages[page_id]
+        if (page_last_updated.isoformat() if page_last_updated else None) != last_updated:
+            return False
+        if space_keys is not None and space_key not in space_keys:
+            return False
+    return True
+
+
+def get_source_pages(chunks):
+    """The last updated date of each page of the context chunks of an answer, by page ID, to store with it."""
+    return {chunk.PageChunk.page_id: chunk.lastUpdated for chunk in chunks}
+
+
+def record_hit(seconds):
+    """Count a question answered from the cache, in seconds from its arrival to its answer."""
+    metrics.increment('answer_cache.hits')
+    metrics.increment('answer_cache.hit_seconds', seconds)
+
+
+def record_miss(seconds):
+    """Count a question answered by the assistant, in seconds from its arrival to its answer."""
+    metrics.increment('answer_cache.misses')
+    metrics.increment('answer_cache.miss_seconds', seconds)
+
+
+def get_stats():
+    """
+    Get the hit rate of the answer cache and an estimate of the time it saved, from the counters of this process.
+    :return: A dict of the hit_rate, the average seconds to answer a hit and a miss, and the estimated seconds saved
+        by the hits, the ones a miss takes on average minus the ones of the hits.
+    """
+    hits, misses = metrics.get_counter('answer_cache.hits'), metrics.get_counter('answer_cache.misses')
+    hit_seconds = metrics.get_counter('answer_cache.hit_seconds') / hits if hits else None
+    miss_seconds = metrics.get_counter('answer_cache.miss_seconds') / misses if misses else None
+    return {
+        'hit_rate': metrics.get_ratio(['answer_cache.hits'], ['answer_cache.hits', 'answer_cache.misses']),
+        'average_hit_seconds': hit_seconds,
+        'average_miss_seconds': miss_seconds,
+        'estimated_seconds_saved': hits * (miss_seconds - hit_seconds) if hits and misses else None,
+    }
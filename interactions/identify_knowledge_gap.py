@@ -7,11 +7,11 @@ from configuration import (
     knowledge_gap_interaction_retrieval_count,
     quizz_assistant_id,
 )
-from database.interaction_manager import QAInteractionManager, QAInteraction
+from database.interaction_manager import QAInteraction
 from database.quiz_question_manager import QuizQuestionManager
-from database.database import get_db_session
 from open_ai.assistants.utility import extract_assistant_response, initiate_client
 from open_ai.assistants.thread_manager import ThreadManager
+from open_ai.rate_limiter import BACKGROUND
 from open_ai.assistants.assistant_manager import AssistantManager
 from slack.message_manager import post_questions_to_slack
 import vector.interactions
@@ -92,7 +92,7 @@ def query_assistant_with_context(context, formatted_interactions, thread_id=None
     print(f"Assistant loaded: {assistant}\n")
 
     # Initialize ThreadManager with or without an existing thread_id
-    thread_manager = ThreadManager(client, assistant.id, thread_id)
+    thread_manager = ThreadManager(client, assistant.id, thread_id, model=assistant.model, priority=BACKGROUND)
     print(f"Thread manager initiated: {thread_manager}\n")
 
     # If no thread_id was provided, create a new thread
@@ -192,10 +192,9 @@ def strip_json(assistant_response: str):
 
 def identify_knowledge_gaps(context):
     query = f"no information in context: {context}"
-    interaction_ids = vector.interactions.retrieve_relevant_ids(query, count=knowledge_gap_interaction_retrieval_count)
-    with get_db_session() as session:
-        relevant_qa_interactions = QAInteractionManager().get_interactions_by_interaction_ids(session, interaction_ids)
-        formatted_interactions, user_ids = format_interactions(relevant_qa_interactions)
+    relevant_qa_interactions = vector.interactions.retrieve_relevant_interactions(
+        query, count=knowledge_gap_interaction_retrieval_count)
+    formatted_interactions, user_ids = format_interactions(relevant_qa_interactions)
     assistant_response, thread_ids = query_assistant_with_context(context, formatted_interactions)
     questions_json = strip_json(assistant_response)
     quiz_question_dtos = process_and_store_questions(questions_json)
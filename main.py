@@ -1,18 +1,20 @@
 # ./main.py
-from configuration import question_context_pages_count
+from configuration import question_context_chunks_count
 from confluence.importer import tui_choose_space, import_space
 from interactions.identify_knowledge_gap import identify_knowledge_gaps
 from open_ai.assistants.openai_assistant import load_manage_assistants
 from open_ai.assistants.query_assistant_from_documents import query_assistant_with_context
 import vector.pages
 import vector.interactions
+from vector.selection import select_context_chunks
 from visualize.pages import load_confluence_pages_spacial_distribution
 from database.database import get_db_session
 
 
 def answer_question_with_assistant(question):
-    page_ids = vector.pages.retrieve_relevant_ids(question, count=question_context_pages_count)
-    response, thread_id = query_assistant_with_context(question, page_ids)
+    chunks = select_context_chunks(vector.pages.retrieve_relevant_chunks(question,
+                                                                         count=question_context_chunks_count))
+    response, thread_id = query_assistant_with_context(question, chunks)
     return response, thread_id
 
 
@@ -0,0 +1,41 @@
+# ./metrics.py
+from collections import Counter
+import threading
+
+
+# Process-wide counters, exposed by the API on /api/v1/metrics
+_counters = Counter()
+_lock = threading.Lock()
+
+
+def increment(name, value=1):
+    """
+    Increment a counter.
+    :param name: The name of the counter.
+    :param value: The value to add to the counter.
+    """
+    with _lock:
+        _counters[name] += value
+
+
+def get_counter(name):
+    with _lock:
+        return _counters[name]
+
+
+def get_ratio(numerator, denominators):
+    """
+    Compute a ratio between counters, for example a hit rate.
+    :param numerator: The names of the counters summed as numerator.
+    :param denominators: The names of the counters summed as denominator.
+    :return: The ratio, or None if the denominator is 0.
+    """
+    with _lock:
+        total = sum(_counters[name] for name in denominators)
+        return sum(_counters[name] for name in numerator) / total if total else None
+
+
+def snapshot():
+    """Return a copy of all the counters."""
+    with _lock:
+        return dict(_counters)
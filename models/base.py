@@ -1,14 +1,81 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, LargeBinary
+from sqlalchemy.orm import deferred
+from sqlalchemy.types import TypeDecorator, UserDefinedType
 import json
+import numpy as np
 
 Base = declarative_base()
 
+
+class Float32Vector(TypeDecorator):
+    """
+    Stores an embedding vector as packed little-endian float32 bytes.
+    Vectors are read back as read-only NumPy arrays viewing the fetched buffer, without copy or parsing.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return np.asarray(value, dtype='<f4').tobytes()
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return np.frombuffer(value, dtype='<f4')
+
+    def compare_values(self, x, y):
+        if x is None or y is None:
+            return x is y
+        return np.array_equal(np.asarray(x, dtype='<f4'), np.asarray(y, dtype='<f4'))
+
+
+class PgVector(UserDefinedType):
+    """
+    A vector of the pgvector extension of PostgreSQL, written from a sequence of floats
+    and read as a float32 NumPy array.
+    The vectors of a column without dimensions may have any number of dimensions, and are cast to a column
+    with dimensions to be indexed, as indexes only accept vectors of fixed dimensions.
+    """
+    cache_ok = True
+
+    def __init__(self, dimensions=None):
+        self.dimensions = dimensions
+
+    def get_col_spec(self, **kw):
+        return "vector" if self.dimensions is None else f"vector({self.dimensions})"
+
+    def bind_processor(self, dialect):
+        def process(value):
+            if value is None:
+                return None
+            return '[' + ','.join(map(str, np.asarray(value, dtype='<f4').tolist())) + ']'
+        return process
+
+    def result_processor(self, dialect, coltype):
+        def process(value):
+            if value is None:
+                return None
+            return np.array(value[1:-1].split(','), dtype='<f4')
+        return process
+
+    class comparator_factory(UserDefinedType.Comparator):
+        def cosine_distance(self, other):
+            """The cosine distance to another vector, the <=> operator of pgvector."""
+            return self.op('<=>', return_type=Float)(other)
+
+
 __all__ = ['Base',
            'Column',
            'Integer',
+           'Float',
            'String',
            'Text',
            'DateTime',
+           'Float32Vector',
+           'PgVector',
+           'deferred',
            'json',
            ]
@@ -0,0 +1,14 @@
+from .base import *
+
+
+class ChannelSpaceRoute(Base):
+    """
+    SQLAlchemy model routing the questions asked in a Slack channel to the Confluence spaces they are answered from,
+    a channel having a route per space. The questions of a channel without routes are answered from all the spaces.
+    """
+    __tablename__ = 'channel_space_routes'
+
+    id = Column(Integer, primary_key=True)
+    channel_id = Column(String, nullable=False)
+    space_key = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False)
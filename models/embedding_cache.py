@@ -0,0 +1,17 @@
+from .base import *
+
+
+class EmbeddingCacheEntry(Base):
+    """
+    SQLAlchemy model for caching embeddings by content.
+    """
+    __tablename__ = 'embedding_cache'
+
+    id = Column(Integer, primary_key=True)
+    # SHA-256 of the model, the dimensions and the normalized text
+    cache_key = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    dimensions = Column(Integer)
+    embed = Column(Float32Vector, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    last_used = Column(DateTime, nullable=False)
@@ -0,0 +1,31 @@
+from .base import *
+
+
+class EmbeddingJob(Base):
+    """
+    SQLAlchemy model for the queue of embedding jobs, claimed by the embedding workers.
+    """
+    __tablename__ = 'embedding_jobs'
+
+    # Kinds of jobs, the target being a page ID or an interaction ID
+    PAGE = 'page'
+    INTERACTION = 'interaction'
+
+    # A pending job is claimed once available_at is reached, and is dead once it failed max attempts times
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    DEAD = 'dead'
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    target_id = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False)
+    locked_at = Column(DateTime)
+    locked_by = Column(String)
+    last_error = Column(Text)
+    created_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime)
+
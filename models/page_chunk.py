@@ -0,0 +1,29 @@
+from .base import *
+
+
+class PageChunk(Base):
+    """
+    SQLAlchemy model for storing the chunks of Confluence pages and their embeddings.
+    """
+    __tablename__ = 'page_chunks'
+
+    id = Column(Integer, primary_key=True)
+    # "<page_id>:<chunk_index>", also the ID of the chunk in the vector database
+    chunk_id = Column(String, nullable=False)
+    page_id = Column(String, nullable=False)
+    chunk_index = Column(Integer, nullable=False)
+    # Offsets of the chunk in the page text, to merge overlapping chunks back together
+    start_offset = Column(Integer, nullable=False)
+    end_offset = Column(Integer, nullable=False)
+    content = Column(Text)
+    # Number of tokens of the content for the chat model, counted once when the chunk is stored
+    token_count = Column(Integer)
+    last_embedded = Column(DateTime)
+    # last_embedded of the embedding when it was last imported into the vector database
+    last_synced_to_vector = Column(DateTime)
+    # "<model>:<dimensions>" of the embedding, see get_embedding_version
+    embedding_version = Column(String)
+    embed = deferred(Column(Float32Vector))
+    # The embedding searched in the database by the pgvector store, written with it, see vector/stores.py
+    # Only added where the pgvector extension is available
+    embed_vector = deferred(Column(PgVector))
@@ -16,6 +16,16 @@ class PageData(Base):
     lastUpdated = Column(DateTime)
     content = Column(Text)
     comments = Column(Text, default=json.dumps([]))
+    # Hash of the normalized page content, to skip embedding pages whose content did not change
+    content_hash = Column(String)
+    embedded_content_hash = Column(String)
     last_embedded = Column(DateTime)
-    embed = Column(Text, default=json.dumps([]))
-
+    # last_embedded of the embedding when it was last imported into the vector database
+    last_synced_to_vector = Column(DateTime)
+    # "<model>:<dimensions>" of the embedding, see get_embedding_version
+    embedding_version = Column(String)
+    # Deferred, as most queries don't need the embedding and it is by far the largest column
+    embed = deferred(Column(Float32Vector))
+    # The embedding searched in the database by the pgvector store, written with it, see vector/stores.py
+    # Only added where the pgvector extension is available
+    embed_vector = deferred(Column(PgVector))
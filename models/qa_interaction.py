@@ -17,5 +17,26 @@ class QAInteraction(Base):
     question_timestamp = Column(DateTime)
     answer_timestamp = Column(DateTime)
     comments = Column(Text, default=json.dumps([]))
+    # The last updated date of each page the answer was generated from, as a JSON object by page ID,
+    # so that the answer is only reused while these pages are unchanged, see interactions/answer_cache.py
+    source_pages = Column(Text)
+    # Slack timestamp of the answer message, to match the reactions to the answer
+    answer_message_ts = Column(String)
+    # Number of negative reactions to the answer, or to the answers reusing it
+    negative_reactions = Column(Integer, nullable=False, default=0)
+    # The interaction whose answer was reused to answer this question, if any
+    cached_from_interaction_id = Column(Integer)
+    # The distances to the question of the chunks retrieved for its context, as a JSON list, the most similar first,
+    # and the number of them selected for the context, to tune the selection, see vector/selection.py
+    context_distances = Column(Text)
+    context_chunk_count = Column(Integer)
     last_embedded = Column(DateTime)
-    embed = Column(Text, default=json.dumps([]))
+    # last_embedded of the embedding when it was last imported into the vector database
+    last_synced_to_vector = Column(DateTime)
+    # "<model>:<dimensions>" of the embedding, see get_embedding_version
+    embedding_version = Column(String)
+    # Deferred, as most queries don't need the embedding and it is by far the largest column
+    embed = deferred(Column(Float32Vector))
+    # The embedding searched in the database by the pgvector store, written with it, see vector/stores.py
+    # Only added where the pgvector extension is available
+    embed_vector = deferred(Column(PgVector))
@@ -0,0 +1,15 @@
+from .base import *
+
+
+class RateLimitBucket(Base):
+    """
+    SQLAlchemy model for the token buckets limiting the OpenAI requests of all the processes.
+    """
+    __tablename__ = 'rate_limit_buckets'
+
+    id = Column(Integer, primary_key=True)
+    # "<model>:requests" or "<model>:tokens"
+    name = Column(String, nullable=False)
+    tokens = Column(Float, nullable=False)
+    # Seconds since the epoch on the database clock, shared by all the nodes
+    updated_at = Column(Float, nullable=False)
@@ -0,0 +1,27 @@
+from .base import *
+
+
+class VectorCollection(Base):
+    """
+    SQLAlchemy model for the vector collections behind each alias, such as pages or page_chunks.
+    Questions are answered from the live collection of an alias, while a collection of a new embedding version
+    is built in the background, then made live once it holds all the embeddings.
+    """
+    __tablename__ = 'vector_collections'
+
+    # Statuses of a collection, an alias having at most one live and one building collection
+    BUILDING = 'building'
+    LIVE = 'live'
+    RETIRED = 'retired'
+
+    id = Column(Integer, primary_key=True)
+    alias = Column(String, nullable=False)
+    # Name of the collection in the vector database
+    name = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    # Version of the embeddings of the collection, and the model and dimensions to embed its queries with
+    embedding_version = Column(String, nullable=False)
+    embedding_model = Column(String, nullable=False)
+    embedding_dimensions = Column(Integer)
+    created_at = Column(DateTime, nullable=False)
+    switched_at = Column(DateTime)
@@ -0,0 +1,78 @@
+# ./open_ai/assistants/context_packer.py
+import logging
+
+from configuration import model_id
+from open_ai.embedding.chunking import merge_chunks
+from open_ai.tokenizer import count_tokens, have_same_encoding, truncate_to_tokens
+
+
+# Marks the gaps between the excerpts of a page
+EXCERPT_SEPARATOR = "\n[...]\n"
+# The chunk that doesn't fit is only truncated to the tokens left when at least this many remain
+MIN_TRUNCATED_CHUNK_TOKENS = 100
+
+
+def format_page_header(page_id, title, space_key, last_updated):
+    return f"\nDocument Title: {title}\nSpace Key: {space_key}\nPage ID: {page_id}\nLast Updated: {last_updated}\n\n"
+
+
+def pack_context(chunks, token_budget, model, counted_model=model_id):
+    """
+    Packs page chunks into a context string that fits in a token budget.
+
+    The budget is allocated by rank: chunks are taken from the most relevant down, the header of a page is paid
+    with its first chunk, a chunk that doesn't fit is skipped for smaller less relevant ones, or truncated to
+    the tokens left when enough remain. The selected chunks are then grouped by page, pages ordered by their
+    most relevant chunk, and the chunks of a page are merged in page order.
+
+    Args:
+        chunks (list): The rows of the chunks with their PageChunk, title, space_key and lastUpdated, such as the
+            ChunkRow of PageChunkManager.find_chunks, the most relevant first.
+        token_budget (int): The maximum number of tokens of the context.
+        model (str): The model the context is sent to, whose tokenizer counts the tokens.
+        counted_model (str): The model whose tokenizer counted the token counts stored with the chunks, the configured
+            assistant model, see prepare_page_chunks. The tokens are counted again when the tokenizers differ.
+
+    Returns:
+        str: The formatted context.
+    """
+    separator_tokens = count_tokens(EXCERPT_SEPARATOR, model)
+    # An assistant may run another model than the configured one, whose tokenizer may count other tokens
+    stored_counts_apply = have_same_encoding(counted_model, model)
+    remaining = token_budget
+    pages = {}
+    packed_count = 0
+    for row in chunks:
+        chunk = row.PageChunk
+        header = None
+        cost = separator_tokens
+        if chunk.page_id not in pages:
+            header = format_page_header(chunk.page_id, row.title, row.space_key, row.lastUpdated)
+            cost += count_tokens(header, model)
+
+        content = chunk.content
+        # The token count is stored with the chunk, it is only missing for chunks stored before it was added
+        token_count = chunk.token_count if chunk.token_count is not None and stored_counts_apply \
+            else count_tokens(content, model)
+        if cost + token_count > remaining:
+            available = remaining - cost
+            if available < MIN_TRUNCATED_CHUNK_TOKENS:
+                continue
+            content = truncate_to_tokens(content, available, model)
+            token_count = available
+
+        if header is not None:
+            pages[chunk.page_id] = {'header': header, 'chunks': []}
+        pages[chunk.page_id]['chunks'].append((chunk.start_offset, chunk.start_offset + len(content), content))
+        remaining -= cost + token_count
+        packed_count += 1
+
+    parts = []
+    for page in pages.values():
+        parts.append(page['header'])
+        parts.append(EXCERPT_SEPARATOR.join(merge_chunks(page['chunks'])))
+        parts.append("\n")
+
+    logging.info(f"Context packed with {packed_count}/{len(chunks)} chunks of {len(pages)} pages, "
+                 f"{token_budget - remaining}/{token_budget} tokens.")
+    return "".join(parts)
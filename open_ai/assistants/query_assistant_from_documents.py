@@ -1,55 +1,26 @@
 # ./oai_assistants/query_assistant_from_documents.py
-from typing import List
 from open_ai.assistants.utility import extract_assistant_response, initiate_client
 from open_ai.assistants.thread_manager import ThreadManager
 from open_ai.assistants.assistant_manager import AssistantManager
-from configuration import qa_assistant_id
+from configuration import context_token_budgets, default_context_token_budget, qa_assistant_id
 from database.database import get_db_session
 import logging
 
-from database.page_manager import PageManager, PageData
+from database.page_chunk_manager import PageChunkManager
+from open_ai.assistants.context_packer import pack_context
 
 logging.basicConfig(level=logging.INFO)
 
 
-def format_pages_as_context(pages: List[PageData], max_length=30000, truncation_label=" [Content truncated due to size limit.]"):
+def query_assistant_with_context(question, chunks, thread_id=None):
     """
-    Formats specified files as a context string for referencing in responses,
-    ensuring the total context length does not exceed the specified maximum length.
-
-    Args:
-        pages (list of PageData): List of pages to be formatted as context.
-        max_length (int): The maximum length allowed for the context.
-        truncation_label (str): The label to indicate that the content has been truncated.
-
-    Returns:
-        str: The formatted context within the maximum length.
-    """
-    context = ""
-    for page in pages:
-        title = page.title
-        space_key = page.space_key
-        file_content = PageManager().format_page_for_llm(page)
-        page_data = f"\nDocument Title: {title}\nSpace Key: {space_key}\n\n{file_content}"
-
-        # Truncate and stop if the total length exceeds the maximum allowed
-        if len(context) + len(page_data) > max_length:
-            available_space = max_length - len(context) - len(truncation_label)
-            context += page_data[:available_space] + truncation_label
-            break
-
-        context += page_data
-
-    return context
-
-
-def query_assistant_with_context(question, page_ids, thread_id=None):
-    """
-    Queries the assistant with a specific question, after setting up the necessary context by adding relevant files.
+    Queries the assistant with a specific question, after setting up the necessary context from relevant page chunks.
 
     Args:
     question (str): The question to be asked.
-    page_ids (list): A list of page IDs representing the files to be added to the assistant's context.
+    chunks (list): The page chunks to be added to the assistant's context, the most relevant first,
+        as (PageChunk, title, space_key, lastUpdated) rows returned by vector.pages.retrieve_relevant_chunks,
+        or as chunk IDs, the chunks then being found in the database.
     thread_id (str, optional): The ID of an existing thread to continue the conversation. Default is None.
 
     Returns:
@@ -66,19 +37,22 @@ def query_assistant_with_context(question, page_ids, thread_id=None):
     assistant = assistant_manager.load_assistant(assistant_id=qa_assistant_id)
     print(f"Assistant loaded: {assistant}\n")
 
-    # Ensure page_ids is a list
-    if not isinstance(page_ids, list):
-        page_ids = [page_ids]
-    print(f"IDs of pages to load in context : {page_ids}\n")
-
-    # Format the context
-    with get_db_session() as session:
-        pages = PageManager().find_pages(page_ids, session)
-        context = format_pages_as_context(pages)
+    # Ensure chunks is a list
+    if not isinstance(chunks, list):
+        chunks = [chunks]
+    if any(isinstance(chunk, str) for chunk in chunks):
+        with get_db_session() as session:
+            chunks = PageChunkManager().find_chunks(chunks, session)
+            session.expunge_all()
+    print(f"IDs of page chunks to load in context : {[chunk.PageChunk.chunk_id for chunk in chunks]}\n")
+
+    # Format the context within the token budget of the assistant model
+    token_budget = context_token_budgets.get(assistant.model, default_context_token_budget)
+    context = pack_context(chunks, token_budget, assistant.model)
     print(f"\n\nContext formatted: {context}\n")
 
     # Initialize ThreadManager with or without an existing thread_id
-    thread_manager = ThreadManager(client, assistant.id, thread_id)
+    thread_manager = ThreadManager(client, assistant.id, thread_id, model=assistant.model)
     print(f"Thread manager initiated: {thread_manager}\n")
 
     # If no thread_id was provided, create a new thread
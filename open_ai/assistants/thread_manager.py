@@ -2,6 +2,9 @@
 import time
 import json
 from openai import OpenAI
+from configuration import assistant_run_estimated_completion_tokens, model_id
+from open_ai.rate_limiter import INTERACTIVE, rate_limiter
+from open_ai.tokenizer import count_tokens
 
 class ThreadManager:
     """
@@ -14,7 +17,7 @@ class ThreadManager:
     Attributes:
     client (OpenAI_Client): An instance of the client used for handling thread operations.
     """
-    def __init__(self, client: OpenAI, assistant_id, thread_id=None):
+    def __init__(self, client: OpenAI, assistant_id, thread_id=None, model=model_id, priority=INTERACTIVE):
         """
         Initializes the ThreadManager with a client to manage threads.
 
@@ -22,10 +25,18 @@ class ThreadManager:
         client (OpenAI_Client): The client object used for thread operations.
         assistant_id (str): The ID of the assistant associated with this thread manager.
         thread_id (str, optional): The identifier of an existing thread to be managed. Default is None.
+        model (str, optional): The model of the assistant, whose rate limits apply to the thread operations.
+        priority (str, optional): The rate limiting priority of the thread operations, INTERACTIVE or BACKGROUND.
         """
         self.client = client
         self.assistant_id = assistant_id
         self.thread_id = thread_id
+        self.model = model
+        self.priority = priority
+
+    def acquire_rate_limit(self, tokens=0):
+        """Wait until a thread operation can be sent within the rate limits of the assistant model."""
+        rate_limiter.acquire(self.model, tokens, self.priority)
 
     def create_thread(self):
         """
@@ -35,6 +46,7 @@ class ThreadManager:
         None
         """
         if self.thread_id is None:
+            self.acquire_rate_limit()
             thread = self.client.beta.threads.create()
             self.thread_id = thread.id
             print("\nThread created with ID:", self.thread_id)
@@ -43,6 +55,7 @@ class ThreadManager:
 
     def add_message_and_wait_for_reply(self, user_message):
         # Add the user's message to the thread
+        self.acquire_rate_limit()
         self.client.beta.threads.messages.create(
             thread_id=self.thread_id,
             role="user",
@@ -51,6 +64,7 @@ class ThreadManager:
         print("\nUser message added to thread:", user_message)
 
         # Request the assistant to process the message
+        self.acquire_rate_limit(count_tokens(user_message, self.model) + assistant_run_estimated_completion_tokens)
         run = self.client.beta.threads.runs.create(
             thread_id=self.thread_id,
             assistant_id=self.assistant_id,
@@ -103,6 +117,7 @@ class ThreadManager:
         Returns:
         str: The current status of the thread run.
         """
+        self.acquire_rate_limit()
         return self.client.beta.threads.runs.retrieve(
             thread_id=self.thread_id,
             run_id=run_id
@@ -118,6 +133,7 @@ class ThreadManager:
         Returns:
         list: A list of messages from the thread.
         """
+        self.acquire_rate_limit()
         return self.client.beta.threads.messages.list(
             thread_id=self.thread_id
         )
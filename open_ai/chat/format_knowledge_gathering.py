@@ -2,8 +2,14 @@
 from openai import OpenAI
 from credentials import oai_api_key
 from configuration import model_id
+from open_ai.rate_limiter import rate_limiter
+from open_ai.tokenizer import count_tokens
 
 client = OpenAI(api_key=oai_api_key)
+# Maximum number of tokens of the completion, counted with the prompt against the rate limits
+max_completion_tokens = 4095
+# Estimated number of tokens of the instructions, the context is counted separately
+instruction_tokens = 500
 
 
 def get_response_from_gpt_4t(question, context):
@@ -18,6 +24,7 @@ def get_response_from_gpt_4t(question, context):
     str: The response from the GPT-4T model.
     """
     try:
+        rate_limiter.acquire(model_id, instruction_tokens + count_tokens(context, model_id) + max_completion_tokens)
         response = client.chat.completions.create(
             model=model_id,
             messages=[
@@ -44,7 +51,7 @@ def get_response_from_gpt_4t(question, context):
                 }
             ],
             temperature=0,
-            max_tokens=4095,
+            max_tokens=max_completion_tokens,
             top_p=1,
             frequency_penalty=0,
             presence_penalty=0
@@ -0,0 +1,66 @@
+from typing import List, Tuple
+
+
+# Boundaries a chunk preferably ends at, from the strongest to the weakest
+SEPARATORS = ('\n\n', '\n', '. ', ' ')
+
+
+def split_text(text: str, chunk_size: int, chunk_overlap: int) -> List[Tuple[int, int]]:
+    """
+    Split a text into overlapping chunks of at most chunk_size characters.
+    Chunks end at the strongest boundary found in their second half (paragraph, line, sentence, then word),
+    and the next chunk starts chunk_overlap characters before, at a word boundary.
+
+    Args:
+        text (str): The text to split.
+        chunk_size (int): The maximum number of characters of a chunk.
+        chunk_overlap (int): The number of characters shared by consecutive chunks.
+
+    Returns:
+        List[Tuple[int, int]]: The start and end offsets of the chunks in the text, blank chunks excluded.
+    """
+    spans = []
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + chunk_size, length)
+        if end < length:
+            for separator in SEPARATORS:
+                cut = text.rfind(separator, start + chunk_size // 2, end)
+                if cut != -1:
+                    end = cut + len(separator)
+                    break
+
+        if text[start:end].strip():
+            spans.append((start, end))
+        if end >= length:
+            break
+
+        next_start = max(end - chunk_overlap, start + 1)
+        space = text.find(' ', next_start, end)
+        start = space + 1 if space != -1 else next_start
+
+    return spans
+
+
+def merge_chunks(chunks: List[Tuple[int, int, str]]) -> List[str]:
+    """
+    Merge chunks of the same text that overlap or follow each other, removing the overlapping parts.
+
+    Args:
+        chunks (List[Tuple[int, int, str]]): The start offset, end offset and content of the chunks.
+
+    Returns:
+        List[str]: The contents of the merged chunks, in the order of the text.
+    """
+    merged = []
+    last_end = None
+    for start, end, content in sorted(chunks):
+        if last_end is not None and start <= last_end:
+            if end > last_end:
+                merged[-1] += content[last_end - start:]
+                last_end = end
+        else:
+            merged.append(content)
+            last_end = end
+    return merged
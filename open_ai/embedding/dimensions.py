@@ -0,0 +1,22 @@
+# ./open_ai/embedding/dimensions.py
+import numpy as np
+
+
+def truncate_embeddings(embeddings, dimensions):
+    """
+    Shorten embeddings to their first dimensions and normalize them back to unit length.
+    The text-embedding-3 models are trained so that the leading dimensions carry most of the meaning
+    (Matryoshka representation learning), and the API shortens embeddings the same way when asked for fewer
+    dimensions, so stored embeddings can be shortened locally instead of being embedded again.
+    :param embeddings: An embedding, or a 2D array of embeddings, one per row.
+    :param dimensions: The number of dimensions to keep, None to keep them all.
+    :return: The shortened embeddings as float32 numpy arrays.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if dimensions is None or embeddings.shape[-1] <= dimensions:
+        return embeddings
+
+    truncated = embeddings[..., :dimensions].copy()
+    norms = np.linalg.norm(truncated, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return truncated / norms
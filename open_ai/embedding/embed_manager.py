@@ -1,18 +1,174 @@
 # ./open_ai/embedding/embed_manager.py
-import openai
-from credentials import oai_api_key
+import logging
 
-client = openai.OpenAI(api_key=oai_api_key)
+from configuration import (
+    embedding_cache_database_max_bytes,
+    embedding_cache_memory_max_bytes,
+    embedding_dimensions,
+)
+from database.embedding_cache_manager import EmbeddingCacheManager
+from open_ai.embedding.embedding_cache import EmbeddingCache
+from open_ai.embedding.providers import get_provider
+from open_ai.embedding.single_flight import SingleFlight
+from open_ai.rate_limiter import BACKGROUND, INTERACTIVE, rate_limiter
+from open_ai.tokenizer import count_tokens, truncate_to_tokens
 
+embedding_cache = EmbeddingCache(store=EmbeddingCacheManager(),
+                                 memory_max_bytes=embedding_cache_memory_max_bytes,
+                                 store_max_bytes=embedding_cache_database_max_bytes)
+# Texts being embedded in this process, by cache key, so that concurrent requests for a text embed it once
+embedding_flights = SingleFlight('embedding_single_flight')
 
-def embed_text(text, model):
+
+def get_embedding_version(model, dimensions=embedding_dimensions, provider=None):
+    """
+    Get the version of the embeddings of a model, stored with the embeddings and the vector collections,
+    as embeddings of different versions can't be compared with each other.
+    :param model: The embedding model.
+    :param dimensions: The number of dimensions of the embeddings, None for the native dimensions of the model.
+    :param provider: The embedding provider, the configured one by default.
+    :return: "<model>:<dimensions>", the model being prefixed by the provider unless it is OpenAI.
     """
-    Embed the given text using the specified OpenAI model.
+    provider = provider or get_provider()
+    return f"{provider.get_cache_model(model)}:{provider.get_dimensions(model, dimensions)}"
+
+
+def embed_text(text, model, priority=INTERACTIVE, dimensions=embedding_dimensions, provider=None):
+    """
+    Embed the given text using the specified model, unless its embedding is cached.
     :param text: The text to embed.
-    :param model: The OpenAI model to use.
+    :param model: The embedding model to use.
+    :param priority: The rate limiting priority of the request, interactive by default as texts embedded one by one
+        are questions to answer.
+    :param dimensions: The number of dimensions of the embedding, None for the native dimensions of the model.
+    :param provider: The embedding provider, the configured one by default.
     :return: The embedding vector as a list of floats.
     """
-    response = client.embeddings.create(input=text, model=model)
-    embedding_vector = response.dict()["data"][0]["embedding"]
-    return embedding_vector
+    provider = provider or get_provider()
+    cache_model = provider.get_cache_model(model)
+    cache_key = embedding_cache.make_key(text, cache_model, dimensions)
+    if (cached := embedding_cache.get_many([cache_key])).get(cache_key) is not None:
+        return cached[cache_key].tolist()
+
+    return _embed_missing({cache_key: text}, cache_model,
+                          lambda texts: embed_texts(texts, model, priority, dimensions=dimensions, provider=provider),
+                          dimensions)[cache_key]
+
+
+def embed_texts(texts, model, priority=BACKGROUND, token_count=None, dimensions=embedding_dimensions, provider=None):
+    """
+    Embed several texts with a single request to the specified model.
+    :param texts: The texts to embed, within the per-request limits of the provider.
+    :param model: The embedding model to use.
+    :param priority: The rate limiting priority of the request.
+    :param token_count: The total number of tokens of the texts, when already counted.
+    :param dimensions: The number of dimensions of the embeddings, None for the native dimensions of the model.
+    :param provider: The embedding provider, the configured one by default.
+    :return: The embedding vectors as lists of floats, in the order of the texts.
+    """
+    provider = provider or get_provider()
+    if provider.rate_limited:
+        if token_count is None:
+            token_count = sum(count_tokens(text, model) for text in texts)
+        rate_limiter.acquire(model, token_count, priority)
+    return provider.embed(texts, model, dimensions)
+
+
+def pack_requests(token_counts, max_inputs=None, max_tokens=None):
+    """
+    Group consecutive inputs into requests holding as many inputs as the per-request limits allow.
+    :param token_counts: The number of tokens of each input.
+    :param max_inputs: The maximum number of inputs of a request, None for no limit.
+    :param max_tokens: The maximum total number of tokens of a request, None for no limit.
+    :return: The (start, end) index ranges of the inputs of each request.
+    """
+    max_inputs = max_inputs or float('inf')
+    max_tokens = max_tokens or float('inf')
+    requests = []
+    start, tokens = 0, 0
+    for i, token_count in enumerate(token_counts):
+        if i > start and (i - start >= max_inputs or tokens + token_count > max_tokens):
+            requests.append((start, i))
+            start, tokens = i, 0
+        tokens += token_count
+    if start < len(token_counts):
+        requests.append((start, len(token_counts)))
+    return requests
+
+
+def embed_texts_in_batches(texts, model, priority=BACKGROUND, dimensions=embedding_dimensions, provider=None):
+    """
+    Embed any number of texts with as few requests as possible.
+    Cached embeddings are reused, and the other distinct texts are packed into requests
+    up to the per-request input and token limits of the provider.
+    Texts longer than the per-input token limit are truncated.
+    :param texts: The texts to embed.
+    :param model: The embedding model to use.
+    :param priority: The rate limiting priority of the requests.
+    :param dimensions: The number of dimensions of the embeddings, None for the native dimensions of the model.
+    :param provider: The embedding provider, the configured one by default.
+    :return: The embedding vectors as lists of floats, in the order of the texts.
+    """
+    provider = provider or get_provider()
+    cache_model = provider.get_cache_model(model)
+    cache_keys = [embedding_cache.make_key(text, cache_model, dimensions) for text in texts]
+    cached = embedding_cache.get_many(cache_keys)
+    # Distinct texts missing from the cache, by cache key
+    missing = {key: text for key, text in zip(cache_keys, texts) if key not in cached}
+    logging.info(f"{sum(key in cached for key in cache_keys)}/{len(texts)} embeddings found in the cache, "
+                 f"{len(missing)} distinct texts to embed.")
+
+    computed = _embed_missing(missing, cache_model,
+                              lambda texts: _embed_texts_in_requests(texts, model, priority, dimensions, provider),
+                              dimensions)
+    return [computed[key] if key in computed else cached[key].tolist() for key in cache_keys]
+
+
+def _embed_missing(missing, cache_model, embed, dimensions):
+    """
+    Embed texts missing from the cache and cache them, the texts being embedded by another thread meanwhile
+    being waited for rather than embedded again.
+    :param missing: The texts to embed by cache key.
+    :param cache_model: The model name the embeddings are cached with.
+    :param embed: The function embedding a list of texts.
+    :param dimensions: The number of dimensions of the embeddings.
+    :return: The embedding vectors as lists of floats, by cache key.
+    """
+    leader_keys, followed = embedding_flights.begin(missing)
+    try:
+        embeddings = embed([missing[key] for key in leader_keys]) if leader_keys else []
+        if len(embeddings) != len(leader_keys):
+            raise ValueError(f"{len(embeddings)} embeddings returned for {len(leader_keys)} texts.")
+        computed = dict(zip(leader_keys, embeddings))
+        embedding_cache.put_many(computed, cache_model, dimensions)
+    except BaseException as e:
+        embedding_flights.fail(leader_keys, e)
+        raise
+    # Published once cached, so that the texts are found in the cache by the callers coming next
+    embedding_flights.complete(computed)
+    if followed:
+        logging.info(f"{len(followed)} texts being embedded by another request, waiting for their embeddings.")
+    computed.update({key: future.result() for key, future in followed.items()})
+    return computed
+
+
+def _embed_texts_in_requests(texts, model, priority, dimensions, provider):
+    """Embed texts packed into as few requests as the per-request limits of the provider allow."""
+    if provider.max_input_tokens or provider.max_tokens_per_request or provider.rate_limited:
+        token_counts = [count_tokens(text, model) for text in texts]
+    else:
+        # Not tokenized when nothing depends on the token counts
+        token_counts = [0] * len(texts)
+    for i, token_count in enumerate(token_counts):
+        if provider.max_input_tokens and token_count > provider.max_input_tokens:
+            texts[i] = truncate_to_tokens(texts[i], provider.max_input_tokens, model)
+            token_counts[i] = provider.max_input_tokens
 
+    embeddings = []
+    requests = pack_requests(token_counts, provider.max_inputs_per_request, provider.max_tokens_per_request)
+    for i, (start, end) in enumerate(requests):
+        embeddings.extend(embed_texts(texts[start:end], model, priority, sum(token_counts[start:end]), dimensions,
+                                      provider))
+        logging.info(f"Embedding request {i + 1}/{len(requests)}: {end - start} texts, "
+                     f"{sum(token_counts[start:end])} tokens.")
+    return embeddings
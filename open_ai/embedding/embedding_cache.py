@@ -0,0 +1,120 @@
+# ./open_ai/embedding/embedding_cache.py
+from collections import OrderedDict
+import hashlib
+import logging
+import threading
+
+import numpy as np
+
+import metrics
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of embeddings keyed on the model, the dimensions and the SHA-256 of the normalized text:
+    an in-process LRU in front of a persistent store. Both tiers evict their least recently used entries
+    beyond a size in bytes. Errors of the persistent store are logged and treated as misses.
+    """
+
+    def __init__(self, store=None, memory_max_bytes=64 * 1024 * 1024, store_max_bytes=None, eviction_interval=1000):
+        """
+        Initialize the cache.
+
+        Args:
+        store: The persistent tier, with the get_embeds, add_embeds and evict methods of EmbeddingCacheManager,
+            or None for an in-process cache only.
+        memory_max_bytes (int): The maximum size of the embeddings kept in process.
+        store_max_bytes (int): The maximum size of the embeddings kept in the persistent store, None for no limit.
+        eviction_interval (int): The number of entries added to the persistent store between evictions.
+        """
+        self.store = store
+        self.memory_max_bytes = memory_max_bytes
+        self.store_max_bytes = store_max_bytes
+        self.eviction_interval = eviction_interval
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.added_since_eviction = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def make_key(text, model, dimensions=None):
+        """Hash the model, the dimensions and the text with whitespace collapsed into a cache key."""
+        normalized = ' '.join(text.split())
+        return hashlib.sha256(f"{model}\n{dimensions or ''}\n{normalized}".encode('utf-8')).hexdigest()
+
+    def get_many(self, keys):
+        """
+        Look up embeddings, in process first, then in the persistent store.
+
+        Args:
+        keys (iterable): The cache keys.
+
+        Returns:
+        dict: The found embeddings by cache key, as float32 numpy arrays.
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self.lock:
+            for key in keys:
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    found[key] = self.memory[key]
+        metrics.increment('embedding_cache.memory_hits', len(found))
+
+        missing = [key for key in keys if key not in found]
+        if missing and self.store is not None:
+            try:
+                stored = self.store.get_embeds(missing)
+            except Exception as e:
+                logging.error(f"Error reading the embedding cache: {e}")
+                stored = {}
+            metrics.increment('embedding_cache.store_hits', len(stored))
+            self._remember(stored)
+            found.update(stored)
+
+        metrics.increment('embedding_cache.misses', len(keys) - len(found))
+        return found
+
+    def put_many(self, embeddings, model, dimensions=None):
+        """
+        Cache embeddings in both tiers.
+
+        Args:
+        embeddings (dict): The embeddings by cache key, as lists or arrays of floats.
+        model (str): The model the embeddings were computed with.
+        dimensions (int): The dimensions requested from the model, None for the model default.
+        """
+        arrays = {key: np.asarray(embedding, dtype='<f4') for key, embedding in embeddings.items()}
+        self._remember(arrays)
+        if self.store is None or not arrays:
+            return
+
+        try:
+            self.store.add_embeds([{'cache_key': key, 'model': model, 'dimensions': dimensions, 'embed': embed}
+                                   for key, embed in arrays.items()])
+            self.added_since_eviction += len(arrays)
+            if self.store_max_bytes is not None and self.added_since_eviction >= self.eviction_interval:
+                self.added_since_eviction = 0
+                evicted = self.store.evict(self.store_max_bytes)
+                metrics.increment('embedding_cache.store_evictions', evicted)
+        except Exception as e:
+            logging.error(f"Error writing the embedding cache: {e}")
+
+    def _remember(self, arrays):
+        """Add embeddings to the in-process tier, evicting the least recently used ones beyond its size."""
+        with self.lock:
+            for key, array in arrays.items():
+                if key in self.memory:
+                    self.memory_bytes -= self.memory.pop(key).nbytes
+                self.memory[key] = array
+                self.memory_bytes += array.nbytes
+            while self.memory_bytes > self.memory_max_bytes and self.memory:
+                _, evicted = self.memory.popitem(last=False)
+                self.memory_bytes -= evicted.nbytes
+                metrics.increment('embedding_cache.memory_evictions')
+
+
+def get_hit_rate():
+    """The share of the embedding cache lookups served by either tier, or None before the first lookup."""
+    return metrics.get_ratio(['embedding_cache.memory_hits', 'embedding_cache.store_hits'],
+                             ['embedding_cache.memory_hits', 'embedding_cache.store_hits', 'embedding_cache.misses'])
@@ -0,0 +1,175 @@
+# ./open_ai/embedding/providers.py
+from abc import ABC, abstractmethod
+from functools import lru_cache
+import hashlib
+import re
+import threading
+
+import numpy as np
+
+from configuration import (
+    embedding_max_input_tokens,
+    embedding_max_inputs_per_request,
+    embedding_max_tokens_per_request,
+    embedding_provider,
+)
+from open_ai.embedding.dimensions import truncate_embeddings
+
+# Native dimensions of the OpenAI embedding models
+MODEL_DIMENSIONS = {
+    "text-embedding-3-large": 3072,
+    "text-embedding-3-small": 1536,
+    "text-embedding-ada-002": 1536,
+}
+DEFAULT_MODEL_DIMENSIONS = 1536
+
+
+class EmbeddingProvider(ABC):
+    """
+    Embeds batches of texts with a model.
+    Providers declare the dimensions of their embeddings and their per-request limits,
+    the texts being packed into requests and cached by the embed manager.
+    """
+    # The name of the provider in the embedding_provider configuration
+    name = None
+    # Whether requests count against the OpenAI rate limits
+    rate_limited = False
+    # Per-request limits, None when unlimited
+    max_inputs_per_request = None
+    max_tokens_per_request = None
+    max_input_tokens = None
+
+    def get_dimensions(self, model, dimensions=None):
+        """
+        Get the number of dimensions of the embeddings of a model.
+        :param model: The embedding model ID.
+        :param dimensions: The requested number of dimensions, None for the native dimensions of the model.
+        :return: The number of dimensions of the embeddings returned by embed.
+        """
+        native_dimensions = MODEL_DIMENSIONS.get(model, DEFAULT_MODEL_DIMENSIONS)
+        return native_dimensions if dimensions is None else min(dimensions, native_dimensions)
+
+    def get_cache_model(self, model):
+        """Get the model name the embeddings are cached with, so that providers never share cached embeddings."""
+        return f"{self.name}:{model}"
+
+    @abstractmethod
+    def embed(self, texts, model, dimensions=None):
+        """
+        Embed texts with a single request.
+        :param texts: The texts to embed, within the per-request limits of the provider.
+        :param model: The embedding model ID.
+        :param dimensions: The number of dimensions of the embeddings, None for the native dimensions of the model.
+        :return: The embedding vectors as lists of floats, in the order of the texts.
+        """
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """
+    Embeds texts with the OpenAI embeddings API. The client is created on first use,
+    so that importing the embedding pipeline requires neither network access nor an API key.
+    """
+    name = "openai"
+    rate_limited = True
+    max_inputs_per_request = embedding_max_inputs_per_request
+    max_tokens_per_request = embedding_max_tokens_per_request
+    max_input_tokens = embedding_max_input_tokens
+
+    def __init__(self, api_key=None):
+        self.api_key = api_key
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                import openai
+                from credentials import oai_api_key
+                self._client = openai.OpenAI(api_key=self.api_key or oai_api_key)
+            return self._client
+
+    def get_cache_model(self, model):
+        # Cached by model only, as before providers were introduced
+        return model
+
+    def embed(self, texts, model, dimensions=None):
+        parameters = {} if dimensions is None else {'dimensions': dimensions}
+        response = self.client.embeddings.create(input=texts, model=model, **parameters)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+@lru_cache(maxsize=2 ** 16)
+def hash_feature(feature, seed, dimensions):
+    """Hash a feature to a dimension and a sign."""
+    digest = hashlib.blake2b(f"{seed}:{feature}".encode('utf-8'), digest_size=8).digest()
+    value = int.from_bytes(digest, 'little')
+    return value % dimensions, 1.0 if value >> 63 else -1.0
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Embeds texts locally and deterministically by feature hashing of their words, word pairs and word trigrams,
+    so that texts sharing words or word stems get similar embeddings. Meant for tests and load benchmarks
+    without network access: the embeddings are fast to compute and have the dimensions of the OpenAI model
+    they stand in for, but carry no semantics beyond shared words.
+    Like the OpenAI models, shorter embeddings are the leading dimensions of the native ones, normalized:
+    each feature is hashed into every block of nested prefixes of the dimensions, so that shortened
+    embeddings keep all the features.
+    """
+    name = "hashing"
+    word_pattern = re.compile(r"\w+")
+    # Boundaries of the nested blocks of dimensions, the native dimensions closing the last block
+    block_boundaries = (64, 128, 256, 512, 1024, 2048)
+
+    def __init__(self, seed=0):
+        self.seed = seed
+
+    def get_features(self, text):
+        words = self.word_pattern.findall(text.lower())
+        pairs = [f"{first} {second}" for first, second in zip(words, words[1:])]
+        trigrams = [f"#{word[i:i + 3]}" for word in words if len(word) > 3 for i in range(len(word) - 2)]
+        return words + pairs + trigrams
+
+    def get_blocks(self, native_dimensions):
+        boundaries = [0] + [boundary for boundary in self.block_boundaries if boundary < native_dimensions]
+        return list(zip(boundaries, boundaries[1:] + [native_dimensions]))
+
+    def embed(self, texts, model, dimensions=None):
+        native_dimensions = self.get_dimensions(model)
+        blocks = self.get_blocks(native_dimensions)
+        embeddings = np.zeros((len(texts), native_dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            indices, signs = [], []
+            for feature in self.get_features(text):
+                for start, end in blocks:
+                    index, sign = hash_feature(feature, self.seed, end - start)
+                    indices.append(start + index)
+                    signs.append(sign)
+            np.add.at(embeddings[row], indices, signs)
+
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return truncate_embeddings(embeddings / norms, dimensions).tolist()
+
+
+PROVIDERS = {
+    OpenAIEmbeddingProvider.name: OpenAIEmbeddingProvider,
+    HashingEmbeddingProvider.name: HashingEmbeddingProvider,
+}
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name=embedding_provider) -> EmbeddingProvider:
+    """
+    Get the embedding provider of a name, created once per process.
+    :param name: The name of the provider, the configured embedding_provider by default.
+    :return: The embedding provider.
+    """
+    with _providers_lock:
+        if name not in _providers:
+            if name not in PROVIDERS:
+                raise ValueError(f"Unknown embedding provider '{name}', expected one of {sorted(PROVIDERS)}")
+            _providers[name] = PROVIDERS[name]()
+        return _providers[name]
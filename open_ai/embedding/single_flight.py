@@ -0,0 +1,71 @@
+# ./open_ai/embedding/single_flight.py
+from concurrent.futures import Future
+import threading
+
+import metrics
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent computations of the same keys within a process: the first caller of a key computes it,
+    and the callers asking for the key meanwhile wait for its result instead of computing it again.
+    Results are not kept once published, later callers rely on a cache instead.
+    """
+
+    def __init__(self, name):
+        """
+        Initialize the single flight.
+
+        Args:
+        name (str): The prefix of the metric counting the coalesced keys, <name>.coalesced.
+        """
+        self.name = name
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def begin(self, keys):
+        """
+        Start computing keys, unless they are already being computed.
+
+        Args:
+        keys (iterable): The keys to compute.
+
+        Returns:
+        tuple: The keys the caller must compute then publish with complete or fail,
+            and the futures of the keys computed by other callers, by key.
+        """
+        leader_keys, followed = [], {}
+        with self.lock:
+            for key in dict.fromkeys(keys):
+                if key in self.in_flight:
+                    followed[key] = self.in_flight[key]
+                else:
+                    self.in_flight[key] = Future()
+                    leader_keys.append(key)
+        metrics.increment(f'{self.name}.coalesced', len(followed))
+        return leader_keys, followed
+
+    def complete(self, results):
+        """
+        Publish the results of keys started with begin.
+
+        Args:
+        results (dict): The result of each key.
+        """
+        for future, result in zip(self._finish(results), results.values()):
+            future.set_result(result)
+
+    def fail(self, keys, error):
+        """
+        Publish the failure of keys started with begin, raised to the callers waiting for them.
+
+        Args:
+        keys (list): The keys that could not be computed.
+        error (BaseException): The error raised by the computation.
+        """
+        for future in self._finish(keys):
+            future.set_exception(error)
+
+    def _finish(self, keys):
+        with self.lock:
+            return [self.in_flight.pop(key) for key in keys]
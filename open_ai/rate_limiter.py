@@ -0,0 +1,174 @@
+# ./open_ai/rate_limiter.py
+import logging
+import random
+import threading
+import time
+
+import metrics
+from configuration import (
+    default_openai_rate_limit,
+    openai_background_reserve,
+    openai_local_requests_share,
+    openai_rate_limits,
+)
+from database.rate_limit_manager import RateLimitManager
+
+# Priorities of the OpenAI requests: interactive requests answer users waiting on Slack,
+# background requests, such as embedding jobs, leave them a reserve of each bucket
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+
+def refill(tokens, updated_at, now, capacity, refill_rate):
+    """
+    Compute the tokens of a bucket refilled since its last update.
+    :param tokens: The tokens of the bucket at its last update.
+    :param updated_at: The time of the last update, in seconds.
+    :param now: The current time, in seconds.
+    :param capacity: The maximum tokens of the bucket.
+    :param refill_rate: The tokens added per second.
+    :return: The current tokens of the bucket.
+    """
+    return min(capacity, tokens + max(0.0, now - updated_at) * refill_rate)
+
+
+def take_tokens(levels, now, costs, limits, reserve):
+    """
+    Take tokens from several buckets at once, or from none of them.
+    :param levels: The (tokens, updated_at) level of each bucket by name.
+    :param now: The current time, in seconds.
+    :param costs: The tokens to take from each bucket by name.
+    :param limits: The (capacity, refill_rate) of each bucket by name.
+    :param reserve: The share of the capacity of each bucket that must be left after taking the tokens.
+    :return: The new tokens of each bucket by name, or None if they could not be taken,
+        and the number of seconds to wait before they can be.
+    """
+    available = {name: refill(*levels[name], now, *limits[name]) for name in costs}
+    new_tokens = {}
+    wait = 0.0
+    for name, cost in costs.items():
+        capacity, refill_rate = limits[name]
+        # A request larger than the bucket is let through once the bucket is full enough, rather than never
+        cost = min(cost, capacity * (1 - reserve))
+        needed = cost + capacity * reserve
+        if available[name] < needed:
+            wait = max(wait, (needed - available[name]) / refill_rate)
+        new_tokens[name] = available[name] - cost
+    if wait > 0:
+        return None, wait
+    return new_tokens, 0.0
+
+
+class LocalBucketStore:
+    """
+    Holds token buckets in the memory of the process, for the requests limited within each process,
+    with the update_buckets method of RateLimitManager.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def update_buckets(self, capacities, update):
+        with self.lock:
+            now = self.clock()
+            for name, capacity in capacities.items():
+                self.buckets.setdefault(name, (capacity, now))
+            new_tokens, result = update({name: self.buckets[name] for name in capacities}, now)
+            if new_tokens is not None:
+                self.buckets.update({name: (tokens, now) for name, tokens in new_tokens.items()})
+            return result
+
+
+class RateLimiter:
+    """
+    Limits the OpenAI requests and tokens per minute of each model with token buckets held by a shared store,
+    so that all the threads and processes of all the nodes stay within the limits of the organization together.
+    Background requests leave a reserve of each bucket to interactive ones, so a bulk import can't starve answers.
+    """
+
+    def __init__(self, store, limits, default_limit, background_reserve, max_wait=5.0, local_store=None,
+                 local_requests_share=None):
+        """
+        Initialize the rate limiter.
+
+        Args:
+        store: The store of the buckets, with an update_buckets method like RateLimitManager.
+        limits (dict): The requests_per_minute and tokens_per_minute limits by model.
+        default_limit (dict): The limits of the models missing from limits.
+        background_reserve (float): The share of each bucket left to interactive requests by background ones.
+        max_wait (float): The maximum number of seconds slept before checking the buckets again.
+        local_store: Optional; the store of the buckets of the requests without tokens, such as LocalBucketStore.
+            These requests are frequent polls, limited within each process so that they don't lock the buckets
+            of the store shared by the processes.
+        local_requests_share (float): The share of the limits of a model in the buckets of the local store.
+        """
+        self.store = store
+        self.limits = limits
+        self.default_limit = default_limit
+        self.background_reserve = background_reserve
+        self.max_wait = max_wait
+        self.local_store = local_store
+        self.local_requests_share = local_requests_share
+
+    def get_bucket_limits(self, model, share=1.0):
+        """
+        Return the (capacity, refill_rate) of the requests and tokens buckets of a model by bucket name.
+        :param share: The share of the limits of the model in the buckets.
+        """
+        limit = self.limits.get(model, self.default_limit)
+        requests_per_minute = limit['requests_per_minute'] * share
+        tokens_per_minute = limit['tokens_per_minute'] * share
+        return {
+            # A bucket holds at least one request, so that requests are let through however small the share
+            f"{model}:requests": (max(requests_per_minute, 1), requests_per_minute / 60),
+            f"{model}:tokens": (tokens_per_minute, tokens_per_minute / 60),
+        }
+
+    def acquire(self, model, tokens=0, priority=INTERACTIVE):
+        """
+        Wait until a request to a model can be sent within its rate limits, and count it.
+        The limiter lets requests through when the store is unavailable, rather than failing them.
+        :param model: The model of the request.
+        :param tokens: The estimated number of tokens of the request, its prompt and its completion.
+        :param priority: INTERACTIVE or BACKGROUND.
+        :return: The number of seconds waited.
+        """
+        store, limits = self.store, self.get_bucket_limits(model)
+        if not tokens and self.local_store is not None:
+            store, limits = self.local_store, self.get_bucket_limits(model, self.local_requests_share)
+        requests_bucket, tokens_bucket = limits
+        costs = {requests_bucket: 1, tokens_bucket: tokens}
+        reserve = self.background_reserve if priority == BACKGROUND else 0.0
+
+        waited = 0.0
+        while True:
+            try:
+                wait = store.update_buckets(
+                    {name: capacity for name, (capacity, _) in limits.items()},
+                    lambda levels, now: take_tokens(levels, now, costs, limits, reserve))
+            except Exception as e:
+                logging.error(f"Error checking the rate limits of {model}, sending the request anyway: {e}")
+                wait = 0.0
+            if not wait:
+                break
+            # Jittered, so that the processes waiting on the same bucket don't all check it at once
+            delay = min(wait, self.max_wait) * random.uniform(1.0, 1.1)
+            time.sleep(delay)
+            waited += delay
+
+        metrics.increment(f"openai_rate_limiter.{priority}.requests")
+        if waited:
+            metrics.increment(f"openai_rate_limiter.{priority}.throttled_requests")
+            metrics.increment(f"openai_rate_limiter.{priority}.wait_seconds", waited)
+            logging.info(f"Waited {waited:.1f}s for the rate limits of {model} ({priority}, {tokens} tokens).")
+        return waited
+
+
+rate_limiter = RateLimiter(store=RateLimitManager(),
+                           limits=openai_rate_limits,
+                           default_limit=default_openai_rate_limit,
+                           background_reserve=openai_background_reserve,
+                           local_store=LocalBucketStore(),
+                           local_requests_share=openai_local_requests_share)
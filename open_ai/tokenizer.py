@@ -0,0 +1,51 @@
+# ./open_ai/tokenizer.py
+from functools import lru_cache
+
+import tiktoken
+
+
+# Encoding of the models unknown to tiktoken, the one of the GPT-4 and embedding-3 models
+default_encoding_name = "cl100k_base"
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str) -> tiktoken.Encoding:
+    """
+    Get the tokenizer of an OpenAI model, loaded once per process.
+    :param model: The OpenAI model ID.
+    :return: The tiktoken encoding of the model.
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding(default_encoding_name)
+
+
+def have_same_encoding(model: str, other_model: str) -> bool:
+    """Whether two OpenAI models count the tokens of any text alike, having the same tokenizer."""
+    return get_encoding(model).name == get_encoding(other_model).name
+
+
+def count_tokens(text: str, model: str) -> int:
+    """
+    Count the tokens of a text for an OpenAI model.
+    :param text: The text to count the tokens of.
+    :param model: The OpenAI model ID.
+    :return: The number of tokens.
+    """
+    return len(get_encoding(model).encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str) -> str:
+    """
+    Truncate a text to a number of tokens for an OpenAI model.
+    :param text: The text to truncate.
+    :param max_tokens: The maximum number of tokens to keep.
+    :param model: The OpenAI model ID.
+    :return: The text, truncated if it has more than max_tokens tokens.
+    """
+    encoding = get_encoding(model)
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max(max_tokens, 0)])
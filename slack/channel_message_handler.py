@@ -11,7 +11,15 @@ from database.interaction_manager import QAInteractionManager
 from database.database import get_db_session
 
 from .event_handler import SlackEventHandler
-from .reaction_manager import process_checkmark_added_event, process_bookmark_added_event
+from .reaction_manager import (
+    process_bookmark_added_event,
+    process_checkmark_added_event,
+    process_negative_reaction_added_event,
+)
+
+
+# Reactions to an answer of the bot counted as negative feedback, 👎 being named -1 by Slack
+NEGATIVE_REACTIONS = ('-1', 'thumbsdown')
 
 
 class ChannelMessageHandler(SlackEventHandler):
@@ -26,7 +34,7 @@ class ChannelMessageHandler(SlackEventHandler):
         """ Load processed messages and questions from the database """
         with get_db_session() as session:
             try:
-                interactions = QAInteractionManager().get_qa_interactions(session)
+                interactions = QAInteractionManager().get_questions_by_thread_id(session)
             except Exception as e:
                 logging.error(f"Error loading processed messages and questions: {e}")
                 interactions = []
@@ -87,6 +95,8 @@ class ChannelMessageHandler(SlackEventHandler):
                 process_checkmark_added_event(slack_web_client=web_client, event=event)
             elif event.get("reaction") == "bookmark":
                 process_bookmark_added_event(slack_web_client=web_client, event=event)
+            elif event.get("reaction") in NEGATIVE_REACTIONS:
+                process_negative_reaction_added_event(event=event)
 
         # identify if the bot is trying to gather knowledge
         if user_id == bot_user_id and not thread_ts and "?" in text and "Question:" in text:
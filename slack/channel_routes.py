@@ -0,0 +1,75 @@
+"""
+Route the questions asked in Slack channels to the Confluence spaces they are answered from.
+
+The questions of a channel with routes are answered from the pages of its spaces only, such as the billing space
+for the billing team channel, which searches fewer embeddings and spends the context tokens on relevant pages.
+The questions of a channel without routes are answered from all the spaces. The routes are stored in the
+channel_space_routes table and seen by the bot within channel_space_routes_ttl_seconds.
+
+Usage:
+    poetry run python -m slack.channel_routes list
+    poetry run python -m slack.channel_routes add C0123456789 BILLING FINANCE
+    poetry run python -m slack.channel_routes remove C0123456789 [FINANCE]
+"""
+import argparse
+import logging
+import threading
+import time
+
+from configuration import channel_space_routes_ttl_seconds
+from database.channel_space_route_manager import ChannelSpaceRouteManager
+
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+_channel_space_keys = {}
+_channel_space_keys_lock = threading.Lock()
+
+
+def get_channel_space_keys(channel_id):
+    """
+    Get the keys of the spaces the questions of a channel are answered from, cached for
+    channel_space_routes_ttl_seconds so that questions don't query the database to route them.
+    :param channel_id: The ID of the Slack channel.
+    :return: The space keys, or None to answer from all the spaces when the channel has no routes.
+    """
+    with _channel_space_keys_lock:
+        space_keys, expires_at = _channel_space_keys.get(channel_id, (None, 0))
+    if time.monotonic() < expires_at:
+        return space_keys
+
+    space_keys = ChannelSpaceRouteManager().get_space_keys(channel_id) or None
+    with _channel_space_keys_lock:
+        _channel_space_keys[channel_id] = (space_keys, time.monotonic() + channel_space_routes_ttl_seconds)
+    return space_keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='list the routes of the channels')
+    add = commands.add_parser('add', help='route the questions of a channel to spaces')
+    add.add_argument('channel_id')
+    add.add_argument('space_keys', nargs='+')
+    remove = commands.add_parser('remove', help='remove the routes of a channel, or its routes to spaces')
+    remove.add_argument('channel_id')
+    remove.add_argument('space_keys', nargs='*')
+    args = parser.parse_args()
+
+    manager = ChannelSpaceRouteManager()
+    if args.command == 'list':
+        for route in manager.get_routes():
+            print(f"{route.channel_id} -> {route.space_key}")
+    elif args.command == 'add':
+        for space_key in args.space_keys:
+            if manager.add_route(args.channel_id, space_key):
+                logging.info(f"Questions of channel {args.channel_id} routed to space {space_key}.")
+    else:
+        removed_count = sum(manager.remove_routes(args.channel_id, space_key)
+                            for space_key in args.space_keys) if args.space_keys \
+            else manager.remove_routes(args.channel_id)
+        logging.info(f"{removed_count} routes of channel {args.channel_id} removed.")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,18 +4,24 @@
 # some of its code is still used in the current implementation and should be extracted and the publisher part discarded.
 
 import logging
+import time
 from datetime import datetime
 from pydantic import BaseModel
 from slack_sdk import WebClient
 
-from configuration import question_context_pages_count
+from configuration import answer_cache_enabled, question_context_chunks_count
 from credentials import slack_bot_user_oauth_token
+from database.embedding_job_manager import EmbeddingJobManager
 from database.interaction_manager import QAInteractionManager
 from database.score_manager import ScoreManager
+from interactions.answer_cache import find_cached_answer, get_source_pages, record_hit, record_miss
+from models.embedding_job import EmbeddingJob
 from open_ai.assistants.query_assistant_from_documents import query_assistant_with_context
 from database.database import get_db_session
 from slack_sdk.errors import SlackApiError
+from slack.channel_routes import get_channel_space_keys
 import vector.pages
+from vector.selection import select_context_chunks
 
 
 class QuestionEvent(BaseModel):
@@ -49,47 +55,111 @@ class EventConsumer:
         self.web_client = WebClient(token=slack_bot_user_oauth_token)
         logging.log(logging.DEBUG, f"Slack Event Consumer initiated successfully")
 
-    def add_question_and_response_to_database(self, question_event, response_text, assistant_thread_id):
-        QAInteractionManager().add_question_and_answer(question=question_event.text,
-                                                       answer=response_text,
-                                                       thread_id=question_event.ts,
-                                                       assistant_thread_id=assistant_thread_id,
-                                                       channel_id=question_event.channel,
-                                                       question_ts=datetime.fromtimestamp(
-                                                           float(question_event.ts)),
-                                                       answer_ts=datetime.now(),
-                                                       slack_user_id=question_event.user)
+    def add_question_and_response_to_database(self, question_event, response_text, assistant_thread_id,
+                                              source_pages=None, answer_message_ts=None,
+                                              cached_from_interaction_id=None, context_distances=None,
+                                              context_chunk_count=None):
+        interaction_id = QAInteractionManager().add_question_and_answer(
+            question=question_event.text,
+            answer=response_text,
+            thread_id=question_event.ts,
+            assistant_thread_id=assistant_thread_id,
+            channel_id=question_event.channel,
+            question_ts=datetime.fromtimestamp(float(question_event.ts)),
+            answer_ts=datetime.now(),
+            slack_user_id=question_event.user,
+            source_pages=source_pages,
+            answer_message_ts=answer_message_ts,
+            cached_from_interaction_id=cached_from_interaction_id,
+            context_distances=context_distances,
+            context_chunk_count=context_chunk_count)
 
         print(
             f"\n\nQuestion and answer stored in the database: question: {question_event.dict()},\nAnswer: {response_text},\nAssistant_id {assistant_thread_id}\n\n")
+        return interaction_id
+
+    def get_cached_answer(self, question_event, space_keys):
+        """
+        Find a previous answer to reuse for a question, see interactions/answer_cache.py.
+        :return: The text of the reply, the previous answer with a link to its thread, and the QAInteraction
+            of the previous answer, or (None, None) to answer the question with the assistant.
+        """
+        if not answer_cache_enabled:
+            return None, None
+        try:
+            cached = find_cached_answer(question_event.text, space_keys)
+        except Exception as e:
+            print(f"Error looking up a previous answer: {e}")
+            return None, None
+        if not cached:
+            return None, None
+
+        interaction, similarity = cached
+        print(f"Reusing the answer of interaction {interaction.id}, similar at {similarity:.3f}")
+        try:
+            permalink = self.web_client.chat_getPermalink(channel=interaction.channel_id,
+                                                          message_ts=interaction.thread_id)['permalink']
+            origin = f"<{permalink}|this thread>"
+        except SlackApiError as e:
+            print(f"Error fetching the link to the thread of interaction {interaction.id}: {e.response['error']}")
+            origin = "a previous thread"
+        return (f"{interaction.answer_text}\n\n_A similar question was answered in {origin}. "
+                f"Reply here if this answer does not help._"), interaction
 
     def process_question(self, question_event: QuestionEvent):  # TODO: Refactor this method
         channel_id = question_event.channel
         message_ts = question_event.ts
+        started_at = time.monotonic()
+        retrieved_chunks = []
+        context_chunks = []
+        assistant_thread_id = None
 
+        # The questions of a channel routed to spaces are only answered from their pages
         try:
-            context_page_ids = vector.pages.retrieve_relevant_ids(question_event.text,
-                                                                  count=question_context_pages_count)
-            response_text, assistant_thread_id = query_assistant_with_context(question_event.text,
-                                                                              context_page_ids,
-                                                                              None)
+            space_keys = get_channel_space_keys(channel_id)
         except Exception as e:
-            print(f"Error processing question: {e}")
-            response_text = None
+            print(f"Error getting the spaces of channel {channel_id}, answering from all the spaces: {e}")
+            space_keys = None
+        response_text, cached_interaction = self.get_cached_answer(question_event, space_keys)
+        if not response_text:
+            try:
+                retrieved_chunks = vector.pages.retrieve_relevant_chunks(question_event.text,
+                                                                         count=question_context_chunks_count,
+                                                                         space_keys=space_keys)
+                context_chunks = select_context_chunks(retrieved_chunks)
+                response_text, assistant_thread_id = query_assistant_with_context(question_event.text,
+                                                                                  context_chunks,
+                                                                                  None)
+            except Exception as e:
+                print(f"Error processing question: {e}")
+                response_text = None
 
         if response_text:
             print(f"Response from assistant: {response_text}\n")
             try:
-                self.add_question_and_response_to_database(question_event,
-                                                           response_text,
-                                                           assistant_thread_id=assistant_thread_id)
+                response = self.web_client.chat_postMessage(channel=channel_id, text=response_text,
+                                                            thread_ts=message_ts)
+                print(f"\nResponse posted to Slack thread: {message_ts}\n")
+                if cached_interaction:
+                    record_hit(time.monotonic() - started_at)
+                else:
+                    record_miss(time.monotonic() - started_at)
+                interaction_id = self.add_question_and_response_to_database(
+                    question_event,
+                    response_text,
+                    assistant_thread_id=assistant_thread_id,
+                    source_pages=None if cached_interaction else get_source_pages(context_chunks),
+                    answer_message_ts=response['ts'],
+                    cached_from_interaction_id=cached_interaction.id if cached_interaction else None,
+                    context_distances=[chunk.distance for chunk in retrieved_chunks] if retrieved_chunks else None,
+                    context_chunk_count=len(context_chunks) if retrieved_chunks else None)
+                # Embedded and imported by the embedding workers, for its answer to be reused
+                EmbeddingJobManager().enqueue(EmbeddingJob.INTERACTION, [interaction_id])
                 try:
                     ScoreManager().add_or_update_score(slack_user_id=question_event.user, category='seeker')
                     print(f"Score updated for user {question_event.user}")
                 except Exception as e:
                     print(f"Error updating score for user {question_event.user}: {e}")
-                self.web_client.chat_postMessage(channel=channel_id, text=response_text, thread_ts=message_ts)
-                print(f"\nResponse posted to Slack thread: {message_ts}\n")
             except Exception as e:
                 print(f"Error registering message as processed, adding to db and responding to the question on slack: {e}")
 
@@ -119,10 +189,12 @@ class EventConsumer:
         if existing_interaction:
             extended_context_query = self.generate_extended_context_query(existing_interaction, feedback_event.text)
             print(f"\n\nExtended context: {extended_context_query}\n\n")
-            page_ids = vector.pages.retrieve_relevant_ids(extended_context_query, count=question_context_pages_count)
+            chunks = select_context_chunks(vector.pages.retrieve_relevant_chunks(
+                extended_context_query, count=question_context_chunks_count,
+                space_keys=get_channel_space_keys(channel_id)))
             try:
                 response_text, assistant_thread_id = query_assistant_with_context(feedback_event.text,
-                                                                                  page_ids,
+                                                                                  chunks,
                                                                                   assistant_thread_id)
             except Exception as e:
                 print(f"Error processing feedback: {e}")
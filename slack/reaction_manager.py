@@ -1,3 +1,4 @@
+from database.interaction_manager import QAInteractionManager
 from database.quiz_question_manager import QuizQuestionManager
 from open_ai.chat.format_knowledge_gathering import query_gpt_4t_with_context
 import json
@@ -139,3 +140,17 @@ def process_bookmark_added_event(slack_web_client, event):
             print("No messages found for the bookmarked conversation.")
     except SlackApiError as e:
         print(f"Failed to fetch conversation replies: {e.response['error']}")
+
+
+def process_negative_reaction_added_event(event):
+    """
+    Count a negative reaction to an answer of the bot, so that the answer is no longer reused for similar questions,
+    see interactions/answer_cache.py.
+    """
+    channel = event.get("item", {}).get("channel")
+    item_ts = event.get("item", {}).get("ts")
+    try:
+        if QAInteractionManager().add_negative_reaction(channel, item_ts):
+            print(f"Negative reaction counted against the answer {item_ts} in channel {channel}")
+    except Exception as e:
+        print(f"Error counting the negative reaction to message {item_ts}: {e}")
@@ -0,0 +1,96 @@
+import os
+
+# The configuration is read from the environment when imported, the unit tests only need it to be importable
+for name, value in {'DB_HOST': 'localhost', 'DB_PORT': '5432', 'DB_NAME': 'test',
+                    'CHROMA_HOST': 'localhost', 'CHROMA_PORT': '8000',
+                    'NUR_API_HOST': 'localhost', 'NUR_API_PORT': '8080'}.items():
+    os.environ.setdefault(name, value)
+
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import database.embedding_job_manager
+import database.interaction_manager
+import vector.collections
+from models.base import Base
+from models.vector_collection import VectorCollection
+from vector.collections import clear_live_collections
+
+
+class FakeCollectionManager:
+    """The vector_collections table in memory, switched like VectorCollectionManager."""
+
+    def __init__(self):
+        self.collections = []
+        self.reads = 0
+
+    def add(self, alias, name, status, embedding_version):
+        self.collections.append(SimpleNamespace(id=len(self.collections) + 1, alias=alias, name=name, status=status,
+                                                embedding_version=embedding_version,
+                                                embedding_model=embedding_version.split(':')[0],
+                                                embedding_dimensions=None))
+
+    def get_collections(self, aliases=None, statuses=None):
+        self.reads += 1
+        return [collection for collection in self.collections
+                if (not aliases or collection.alias in aliases) and (not statuses or collection.status in statuses)]
+
+    def add_building_collection(self, alias, name, embedding_version, embedding_model, embedding_dimensions):
+        building = [collection for collection in self.collections
+                    if collection.alias == alias and collection.status == VectorCollection.BUILDING]
+        retired = [collection for collection in building if collection.name != name]
+        for collection in retired:
+            collection.status = VectorCollection.RETIRED
+        if len(retired) == len(building):
+            self.add(alias, name, VectorCollection.BUILDING, embedding_version)
+        return retired
+
+    def switch_live_collections(self, aliases):
+        retired = []
+        for collection in self.collections:
+            if collection.alias not in aliases:
+                continue
+            if collection.status == VectorCollection.LIVE:
+                collection.status = VectorCollection.RETIRED
+                retired.append(collection)
+            elif collection.status == VectorCollection.BUILDING:
+                collection.status = VectorCollection.LIVE
+        return retired
+
+    def delete_collections(self, collection_ids):
+        self.collections = [collection for collection in self.collections if collection.id not in collection_ids]
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    """The vector collections of the tests, without the cached live collections of the others."""
+    manager = FakeCollectionManager()
+    monkeypatch.setattr(vector.collections, 'VectorCollectionManager', lambda: manager)
+    clear_live_collections()
+    yield manager
+    clear_live_collections()
+
+
+@pytest.fixture
+def in_memory_database(monkeypatch):
+    """Sessions of an in-memory database, used by the database managers instead of the configured database."""
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    @contextmanager
+    def get_db_session():
+        session = Session()
+        try:
+            yield session
+            session.commit()
+        finally:
+            session.close()
+
+    for module in (database.embedding_job_manager, database.interaction_manager):
+        monkeypatch.setattr(module, 'get_db_session', get_db_session)
+    return Session
@@ -0,0 +1,148 @@
+import json
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import metrics
+from database.interaction_manager import QAInteractionManager
+from interactions import answer_cache
+from models.qa_interaction import QAInteraction
+
+
+UPDATED = datetime(2026, 10, 1, 12, 30)
+
+
+@pytest.fixture(autouse=True)
+def counters(monkeypatch):
+    monkeypatch.setattr(metrics, '_counters', Counter())
+
+
+def make_interaction(id, question, source_pages=None):
+    if source_pages is None:
+        source_pages = {'p1': UPDATED}
+    return SimpleNamespace(id=id, question_text=question, answer_text=f'Answer {id}',
+                           source_pages=json.dumps({page_id: last_updated.isoformat()
+                                                    for page_id, last_updated in source_pages.items()}))
+
+
+def use_pages(monkeypatch, page_versions):
+    monkeypatch.setattr(answer_cache, 'PageManager',
+                        lambda: SimpleNamespace(get_page_versions=lambda page_ids: page_versions))
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """
+    Answer the questions embedded as in the embeddings dict from the reusable interactions of the candidates list,
+    with the page p1 of the space SPACE unchanged since the interactions were answered.
+    """
+    state = SimpleNamespace(embeddings={}, candidates=[])
+    monkeypatch.setattr(answer_cache, 'answer_cache_similarity_threshold', 0.9)
+    monkeypatch.setattr(answer_cache, 'get_live_collection',
+                        lambda alias: SimpleNamespace(name='interactions', embedding_model='model',
+                                                      embedding_dimensions=None))
+    monkeypatch.setattr(answer_cache, 'embed_text', lambda text, model, dimensions: state.embeddings[text])
+    monkeypatch.setattr(answer_cache, 'embed_texts_in_batches',
+                        lambda texts, model, priority, dimensions: [state.embeddings[text] for text in texts])
+    monkeypatch.setattr(answer_cache, 'get_store', lambda: SimpleNamespace(
+        query=lambda name, embedding, count: [(str(candidate.id), 0.1) for candidate in state.candidates]))
+    monkeypatch.setattr(answer_cache, 'get_db_session', lambda: nullcontext(SimpleNamespace(expunge_all=lambda: None)))
+    monkeypatch.setattr(answer_cache, 'QAInteractionManager', lambda: SimpleNamespace(
+        get_reusable_interactions=lambda session, ids, answered_since: state.candidates))
+    use_pages(monkeypatch, {'p1': ('SPACE', UPDATED)})
+    return state
+
+
+def test_an_answer_is_fresh_while_its_pages_are_unchanged_in_the_spaces(monkeypatch):
+    use_pages(monkeypatch, {'p1': ('SPACE', UPDATED)})
+
+    assert answer_cache.is_fresh(make_interaction(1, 'q'))
+    assert answer_cache.is_fresh(make_interaction(1, 'q'), space_keys=['SPACE'])
+
+
+def test_an_answer_from_an_updated_page_is_stale(monkeypatch):
+    use_pages(monkeypatch, {'p1': ('SPACE', datetime(2026, 10, 2))})
+
+    assert not answer_cache.is_fresh(make_interaction(1, 'q'))
+
+
+def test_an_answer_from_a_deleted_page_is_stale(monkeypatch):
+    use_pages(monkeypatch, {})
+
+    assert not answer_cache.is_fresh(make_interaction(1, 'q'))
+
+
+def test_an_answer_from_a_page_out_of_the_routed_spaces_is_not_reused(monkeypatch):
+    use_pages(monkeypatch, {'p1': ('OTHER', UPDATED)})
+
+    assert not answer_cache.is_fresh(make_interaction(1, 'q'), space_keys=['SPACE'])
+    assert not answer_cache.is_fresh(make_interaction(1, 'q', source_pages={}))
+
+
+def test_the_source_pages_are_the_pages_of_the_context_chunks():
+    chunks = [SimpleNamespace(PageChunk=SimpleNamespace(page_id=page_id), lastUpdated=UPDATED)
+              for page_id in ('p1', 'p2', 'p1')]
+
+    assert answer_cache.get_source_pages(chunks) == {'p1': UPDATED, 'p2': UPDATED}
+
+
+def test_the_similarity_is_the_cosine_similarity():
+    assert answer_cache.get_similarities([1, 0], [[2, 0], [0, 3], [1, 1], [0, 0]]) == \
+        pytest.approx([1, 0, 2 ** -0.5, 0])
+
+
+def test_the_answer_to_a_similar_question_is_reused(cache):
+    cache.embeddings = {'How do I use the VPN?': [1, 0], 'How to connect to the VPN?': [0.95, 0.31]}
+    cache.candidates = [make_interaction(7, 'How to connect to the VPN?')]
+
+    interaction, similarity = answer_cache.find_cached_answer('How do I use the VPN?')
+
+    assert interaction.id == 7 and similarity == pytest.approx(0.95, abs=0.01)
+
+
+def test_no_answer_is_reused_below_the_similarity_threshold(cache):
+    cache.embeddings = {'How do I use the VPN?': [1, 0], 'How do I use the printer?': [0.85, 0.53]}
+    cache.candidates = [make_interaction(7, 'How do I use the printer?')]
+
+    assert answer_cache.find_cached_answer('How do I use the VPN?') is None
+    assert metrics.get_counter('answer_cache.rejected.dissimilar') == 1
+
+
+def test_the_most_similar_fresh_answer_is_reused(cache):
+    cache.embeddings = {'q': [1, 0], 'stale': [1, 0.01], 'fresh': [0.95, 0.31]}
+    cache.candidates = [make_interaction(7, 'fresh'), make_interaction(8, 'stale', source_pages={'p2': UPDATED})]
+
+    interaction, _ = answer_cache.find_cached_answer('q', space_keys=['SPACE'])
+
+    assert interaction.id == 7
+    assert metrics.get_counter('answer_cache.rejected.stale') == 1
+
+
+def test_the_stats_estimate_the_seconds_saved_by_the_hits():
+    assert answer_cache.get_stats() == {'hit_rate': None, 'average_hit_seconds': None, 'average_miss_seconds': None,
+                                        'estimated_seconds_saved': None}
+
+    answer_cache.record_hit(1)
+    answer_cache.record_hit(3)
+    for seconds in (10, 12, 14):
+        answer_cache.record_miss(seconds)
+
+    assert answer_cache.get_stats() == {'hit_rate': 0.4, 'average_hit_seconds': 2, 'average_miss_seconds': 12,
+                                        'estimated_seconds_saved': 20}
+
+
+def test_a_follow_up_to_a_reused_answer_counts_against_the_original(in_memory_database):
+    with in_memory_database() as session:
+        session.add_all([QAInteraction(id=1, thread_id='original', comments='[]'),
+                         QAInteraction(id=2, thread_id='reused', comments='[]', cached_from_interaction_id=1)])
+        session.commit()
+
+    QAInteractionManager().add_comment_to_interaction(thread_id='reused', comment='That is not what I asked')
+
+    with in_memory_database() as session:
+        original, reused = session.query(QAInteraction).order_by(QAInteraction.id)
+        assert json.loads(reused.comments) == ['That is not what I asked']
+        assert original.negative_reactions == 1
@@ -0,0 +1,18 @@
+from types import SimpleNamespace
+
+import pytest
+
+import vector.chroma
+from vector.chroma import get_cosine_distances
+
+
+@pytest.mark.parametrize('metadata, distances, expected', [
+    (None, [0.0, 0.5, 2.0], [0.0, 0.25, 1.0]),
+    ({'hnsw:space': 'l2'}, [1.2], [0.6]),
+    ({'hnsw:space': 'cosine'}, [0.3, 0.6], [0.3, 0.6]),
+    ({'hnsw:space': 'ip'}, [0.3], [0.3]),
+])
+def test_distances_are_converted_to_cosine_distances(monkeypatch, metadata, distances, expected):
+    monkeypatch.setattr(vector.chroma, 'get_collection', lambda name: SimpleNamespace(metadata=metadata))
+
+    assert get_cosine_distances('pages', distances) == pytest.approx(expected)
@@ -0,0 +1,29 @@
+from open_ai.embedding.chunking import merge_chunks, split_text
+
+
+TEXT = ("First paragraph with a few sentences. It keeps going for a while.\n\n"
+        "Second paragraph, a little longer than the first one. It also has two sentences.\n"
+        "A single line after it.")
+
+
+def test_split_text_covers_the_text_with_bounded_overlapping_chunks():
+    spans = split_text(TEXT, chunk_size=60, chunk_overlap=15)
+
+    assert spans[0][0] == 0 and spans[-1][1] == len(TEXT)
+    assert all(end - start <= 60 for start, end in spans)
+    for (_, previous_end), (start, _) in zip(spans, spans[1:]):
+        assert start < previous_end
+
+
+def test_split_text_prefers_paragraph_boundaries():
+    spans = split_text(TEXT, chunk_size=100, chunk_overlap=0)
+
+    assert TEXT[:spans[0][1]].endswith('\n\n')
+
+
+def test_merge_chunks_removes_overlaps_and_keeps_gaps():
+    spans = split_text(TEXT, chunk_size=40, chunk_overlap=10)
+    chunks = [(start, end, TEXT[start:end]) for start, end in spans]
+
+    assert merge_chunks(list(reversed(chunks))) == [TEXT]
+    assert merge_chunks([chunks[0], chunks[3]]) == [chunks[0][2], chunks[3][2]]
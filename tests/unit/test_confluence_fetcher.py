@@ -0,0 +1,79 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import pytest
+
+from confluence.fetcher import AdaptiveConcurrencyLimiter, ConfluencePageFetcher, parse_retry_after
+
+
+class StubConfluenceHandler(BaseHTTPRequestHandler):
+    """Serves pages, throttling the first request of each page and always failing page 'broken'."""
+    throttled = set()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        page_id = urlparse(self.path).path.rstrip('/').split('/')[-1]
+        with self.lock:
+            first_request = page_id not in self.throttled
+            self.throttled.add(page_id)
+
+        if page_id == 'broken':
+            self.respond(500, {})
+        elif first_request:
+            self.respond(429, {}, headers={'Retry-After': '0'})
+        else:
+            self.respond(200, {'id': page_id, 'title': f'Page {page_id}'})
+
+    def respond(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    StubConfluenceHandler.throttled = set()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubConfluenceHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+
+
+def test_fetch_pages_retries_throttled_requests_and_reports_failures(stub_server):
+    fetcher = ConfluencePageFetcher(stub_server, 'user', 'token', expand='body.storage',
+                                    initial_concurrency=4, max_concurrency=8, max_attempts=3,
+                                    backoff_base=0.01, backoff_max=0.05)
+    page_ids = [str(i) for i in range(20)] + ['broken']
+
+    pages = list(fetcher.fetch_pages(page_ids))
+
+    assert sorted(page['id'] for page in pages) == sorted(page_ids[:-1])
+    assert fetcher.failed_page_ids == ['broken']
+
+
+def test_limiter_halves_once_per_throttling_burst_and_grows_back():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8, min_limit=1, max_limit=10)
+    epoch = limiter.epoch
+    limiter.on_throttle(epoch)
+    limiter.on_throttle(epoch)
+    assert limiter.limit == 4
+
+    for _ in range(4):
+        limiter.on_success()
+    assert limiter.limit == 5
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('2.5') == 2.5
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import pytest
+import tiktoken
+
+import open_ai.tokenizer
+from database.page_chunk_manager import ChunkRow
+from open_ai.assistants.context_packer import pack_context
+
+
+@pytest.fixture(autouse=True)
+def byte_encoding(monkeypatch):
+    """A tokenizer with one token per byte, so that token counts are predictable and nothing is downloaded."""
+    encoding = tiktoken.Encoding(name='bytes', pat_str=r'[\s\S]', mergeable_ranks={bytes([i]): i for i in range(256)},
+                                 special_tokens={})
+    monkeypatch.setattr(open_ai.tokenizer, 'get_encoding', lambda model: encoding)
+
+
+def make_chunk(page_id, start, content, token_count=None, distance=None):
+    chunk = SimpleNamespace(page_id=page_id, start_offset=start, end_offset=start + len(content),
+                            content=content, token_count=token_count)
+    return ChunkRow(chunk, f'Title {page_id}', 'SPACE', None, distance)
+
+
+def test_chunks_are_packed_by_rank_and_grouped_by_page():
+    chunks = [make_chunk('b', 0, 'b' * 200), make_chunk('a', 500, 'y' * 200), make_chunk('a', 0, 'x' * 200)]
+
+    context = pack_context(chunks, token_budget=10000, model='any')
+
+    assert context.index('Page ID: b') < context.index('Page ID: a')
+    assert context.index('x' * 200) < context.index('[...]') < context.index('y' * 200)
+
+
+def test_chunk_that_does_not_fit_is_truncated_to_the_budget():
+    chunks = [make_chunk('a', 0, 'a' * 300), make_chunk('b', 0, 'b' * 2000), make_chunk('c', 0, 'c' * 10)]
+
+    context = pack_context(chunks, token_budget=1000, model='any')
+
+    assert len(context.encode()) <= 1000
+    assert 'a' * 300 in context
+    assert 'b' * 500 in context and 'b' * 1000 not in context
+    assert 'Page ID: c' not in context
+
+
+def test_chunk_that_does_not_fit_is_skipped_when_too_few_tokens_are_left():
+    chunks = [make_chunk('a', 0, 'a' * 800), make_chunk('b', 0, 'b' * 2000), make_chunk('c', 0, 'c' * 10)]
+
+    context = pack_context(chunks, token_budget=1000, model='any')
+
+    assert len(context.encode()) <= 1000
+    assert 'Page ID: b' not in context and 'c' * 10 in context
+
+
+def test_stored_token_counts_are_used():
+    chunks = [make_chunk('a', 0, 'a' * 50, token_count=900), make_chunk('b', 0, 'b' * 50)]
+
+    context = pack_context(chunks, token_budget=1000, model='any')
+
+    assert 'a' * 50 in context and 'Page ID: b' not in context
+
+
+def test_retrieved_rows_with_their_distance_are_packed():
+    chunks = [make_chunk('a', 0, 'a' * 50, distance=0.2), make_chunk('b', 0, 'b' * 50, distance=0.3)]
+
+    context = pack_context(chunks, token_budget=1000, model='any')
+
+    assert 'Document Title: Title a\nSpace Key: SPACE\nPage ID: a' in context and 'b' * 50 in context
+
+
+def test_token_counts_stored_with_another_tokenizer_are_counted_again(monkeypatch):
+    encodings = {model: tiktoken.Encoding(name=model, pat_str=r'[\s\S]',
+                                          mergeable_ranks={bytes([i]): i for i in range(256)}, special_tokens={})
+                 for model in ('assistant', 'configured')}
+    monkeypatch.setattr(open_ai.tokenizer, 'get_encoding', lambda model: encodings[model])
+    chunks = [make_chunk('a', 0, 'a' * 50, token_count=900), make_chunk('b', 0, 'b' * 50)]
+
+    context = pack_context(chunks, token_budget=1000, model='assistant', counted_model='configured')
+
+    assert 'a' * 50 in context and 'b' * 50 in context
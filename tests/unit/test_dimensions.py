@@ -0,0 +1,20 @@
+import numpy as np
+
+from open_ai.embedding.dimensions import truncate_embeddings
+
+
+def test_truncate_embeddings_keeps_the_leading_dimensions_at_unit_length():
+    embeddings = np.random.default_rng(0).standard_normal((3, 16))
+
+    truncated = truncate_embeddings(embeddings, 4)
+
+    assert truncated.shape == (3, 4) and truncated.dtype == np.float32
+    assert np.allclose(np.linalg.norm(truncated, axis=1), 1.0)
+    assert np.allclose(truncated[0] * np.linalg.norm(embeddings[0, :4]), embeddings[0, :4], atol=1e-6)
+
+
+def test_truncate_embeddings_leaves_short_enough_embeddings_unchanged():
+    embedding = [0.6, 0.8]
+
+    assert np.array_equal(truncate_embeddings(embedding, None), np.float32(embedding))
+    assert np.array_equal(truncate_embeddings(embedding, 4), np.float32(embedding))
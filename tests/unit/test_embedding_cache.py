@@ -0,0 +1,61 @@
+import numpy as np
+
+import metrics
+from open_ai.embedding.embedding_cache import EmbeddingCache
+
+
+class InMemoryStore:
+    def __init__(self):
+        self.entries = {}
+        self.evictions = []
+
+    def get_embeds(self, cache_keys):
+        return {key: self.entries[key] for key in cache_keys if key in self.entries}
+
+    def add_embeds(self, entries):
+        for entry in entries:
+            self.entries.setdefault(entry['cache_key'], entry['embed'])
+
+    def evict(self, max_bytes):
+        self.evictions.append(max_bytes)
+        return 0
+
+
+def test_keys_depend_on_model_and_dimensions_but_not_whitespace():
+    key = EmbeddingCache.make_key('How do I  deploy?\n', 'model-a')
+
+    assert key == EmbeddingCache.make_key('How do I deploy?', 'model-a')
+    assert key != EmbeddingCache.make_key('How do I deploy?', 'model-b')
+    assert key != EmbeddingCache.make_key('How do I deploy?', 'model-a', dimensions=256)
+
+
+def test_embeddings_are_served_from_memory_then_from_the_store():
+    store = InMemoryStore()
+    cache = EmbeddingCache(store=store)
+    cache.put_many({'a': [1.0, 2.0]}, 'model')
+    store_hits = metrics.get_counter('embedding_cache.store_hits')
+
+    assert cache.get_many(['a'])['a'].tolist() == [1.0, 2.0]
+    assert metrics.get_counter('embedding_cache.store_hits') == store_hits
+
+    cold_cache = EmbeddingCache(store=store)
+    assert cold_cache.get_many(['a', 'b']).keys() == {'a'}
+    assert metrics.get_counter('embedding_cache.store_hits') == store_hits + 1
+
+
+def test_memory_tier_evicts_the_least_recently_used_embeddings():
+    cache = EmbeddingCache(memory_max_bytes=2 * 4 * 4)
+    cache.put_many({'a': np.zeros(4), 'b': np.zeros(4)}, 'model')
+    cache.get_many(['a'])
+    cache.put_many({'c': np.zeros(4)}, 'model')
+
+    assert cache.get_many(['a', 'b', 'c']).keys() == {'a', 'c'}
+
+
+def test_store_is_evicted_every_interval():
+    store = InMemoryStore()
+    cache = EmbeddingCache(store=store, store_max_bytes=1000, eviction_interval=2)
+    cache.put_many({'a': [1.0]}, 'model')
+    assert store.evictions == []
+    cache.put_many({'b': [1.0]}, 'model')
+    assert store.evictions == [1000]
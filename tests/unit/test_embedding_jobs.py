@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+from database.embedding_job_manager import EmbeddingJobManager
+from models.embedding_job import EmbeddingJob
+
+
+MAX_ATTEMPTS = 3
+
+
+def add_running_job(in_memory_database, target_id, attempts, locked_seconds_ago):
+    now = datetime.utcnow()
+    with in_memory_database() as session:
+        session.add(EmbeddingJob(kind=EmbeddingJob.PAGE, target_id=target_id, status=EmbeddingJob.RUNNING,
+                                 attempts=attempts, available_at=now, created_at=now, locked_by='worker',
+                                 locked_at=now - timedelta(seconds=locked_seconds_ago)))
+        session.commit()
+
+
+def get_jobs(in_memory_database):
+    with in_memory_database() as session:
+        return {job.target_id: job for job in session.query(EmbeddingJob)}
+
+
+def test_an_abandoned_job_is_released_for_another_attempt(in_memory_database):
+    add_running_job(in_memory_database, 'abandoned', attempts=1, locked_seconds_ago=600)
+    add_running_job(in_memory_database, 'running', attempts=1, locked_seconds_ago=10)
+
+    assert EmbeddingJobManager().release_stale(300, MAX_ATTEMPTS) == (1, 0)
+
+    jobs = get_jobs(in_memory_database)
+    assert jobs['abandoned'].status == EmbeddingJob.PENDING and jobs['abandoned'].locked_by is None
+    assert jobs['abandoned'].finished_at is None
+    assert jobs['running'].status == EmbeddingJob.RUNNING
+
+
+def test_a_job_abandoned_on_its_last_attempt_is_dead(in_memory_database):
+    add_running_job(in_memory_database, 'killing', attempts=MAX_ATTEMPTS, locked_seconds_ago=600)
+
+    assert EmbeddingJobManager().release_stale(300, MAX_ATTEMPTS) == (0, 1)
+
+    job = get_jobs(in_memory_database)['killing']
+    assert job.status == EmbeddingJob.DEAD and job.finished_at is not None
+    assert job.last_error == 'Abandoned by its worker'
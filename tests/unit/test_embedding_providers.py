@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from open_ai.embedding import embed_manager
+from open_ai.embedding.embedding_cache import EmbeddingCache
+from open_ai.embedding.providers import HashingEmbeddingProvider, get_provider
+from open_ai.embedding.single_flight import SingleFlight
+
+
+def test_hashing_embeddings_are_deterministic_with_the_declared_dimensions():
+    provider = HashingEmbeddingProvider()
+    model = 'text-embedding-3-large'
+
+    first, second = provider.embed(['How do I deploy?', 'How do I deploy?'], model)
+
+    assert first == second == HashingEmbeddingProvider().embed(['How do I deploy?'], model)[0]
+    assert len(first) == provider.get_dimensions(model) == 3072
+    assert np.isclose(np.linalg.norm(first), 1.0)
+
+
+def test_hashing_embeddings_of_texts_sharing_words_are_more_similar():
+    question, related, unrelated = np.array(HashingEmbeddingProvider().embed(
+        ['How do I submit an invoice?', 'Invoices are submitted to billing', 'Vacation policy for engineers'],
+        'text-embedding-3-small'))
+
+    assert question @ related > question @ unrelated
+
+
+def test_hashing_embeddings_are_shortened_like_the_openai_models():
+    provider = HashingEmbeddingProvider()
+    full = provider.embed(['invoice billing'], 'text-embedding-3-small')[0]
+
+    short = provider.embed(['invoice billing'], 'text-embedding-3-small', dimensions=256)[0]
+
+    assert len(short) == provider.get_dimensions('text-embedding-3-small', 256) == 256
+    assert np.allclose(short, np.array(full[:256]) / np.linalg.norm(full[:256]), atol=1e-6)
+
+
+def test_batches_are_embedded_and_cached_without_network_access(monkeypatch):
+    monkeypatch.setattr(embed_manager, 'embedding_cache', EmbeddingCache())
+    provider = HashingEmbeddingProvider()
+    texts = ['first page', 'second page', 'first page']
+
+    embeddings = embed_manager.embed_texts_in_batches(texts, 'text-embedding-3-large', dimensions=None,
+                                                      provider=provider)
+
+    assert [len(embedding) for embedding in embeddings] == [3072] * 3
+    assert np.allclose(embeddings[0], embeddings[2])
+    key = EmbeddingCache.make_key('second page', 'hashing:text-embedding-3-large')
+    assert key in embed_manager.embedding_cache.get_many([key])
+
+
+def test_the_followers_fail_when_fewer_embeddings_are_returned(monkeypatch):
+    monkeypatch.setattr(embed_manager, 'embedding_cache', EmbeddingCache())
+    monkeypatch.setattr(embed_manager, 'embedding_flights', SingleFlight('test_embedding_flights'))
+    followers = {}
+
+    def embed(texts):
+        # Another request for the same text, coming while it is being embedded
+        followers.update(embed_manager.embedding_flights.begin(['a'])[1])
+        return [[1.0]]
+
+    with pytest.raises(ValueError):
+        embed_manager._embed_missing({'a': 'first page', 'b': 'second page'}, 'model', embed, dimensions=None)
+
+    with pytest.raises(ValueError):
+        followers['a'].result(timeout=1)
+    assert embed_manager.embedding_flights.begin(['a', 'b'])[0] == ['a', 'b']
+
+
+def test_unknown_providers_are_rejected():
+    with pytest.raises(ValueError):
+        get_provider('unknown')
@@ -0,0 +1,96 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from vector.local_index import CollectionNotFound, LocalVectorIndex
+from vector.metadata import get_page_filter
+
+
+def random_embeddings(count, dimensions=16, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, dimensions)).astype(np.float32)
+
+
+def exact_top(embeddings, query, count):
+    embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return list(np.argsort(-(embeddings @ (query / np.linalg.norm(query))), kind='stable')[:count])
+
+
+def exact_top_ids(embeddings, query, ids):
+    rows = [int(id) - 1 for id in ids]
+    return [ids[i] for i in exact_top(embeddings[rows], query, len(rows))]
+
+
+def test_query_finds_the_exact_top_k(tmp_path):
+    index = LocalVectorIndex.create(str(tmp_path / 'pages'))
+    embeddings = random_embeddings(500)
+    index.upsert([str(i) for i in range(500)], embeddings, [{"page_id": str(i)} for i in range(500)])
+
+    query = random_embeddings(1, seed=1)[0]
+    ids, distances = index.query(query, 10)
+
+    assert ids == [str(row) for row in exact_top(embeddings, query, 10)]
+    assert distances == sorted(distances)
+
+
+def test_replaced_and_deleted_embeddings_are_not_found(tmp_path):
+    index = LocalVectorIndex.create(str(tmp_path / 'chunks'))
+    embeddings = random_embeddings(4)
+    index.upsert(['a', 'b', 'c', 'd'], embeddings, [{"page_id": "1"}, {"page_id": "1"}, {"page_id": "2"},
+                                                    {"page_id": "3"}])
+
+    index.upsert(['a'], [-embeddings[0]], [{"page_id": "1"}])
+    index.delete_rows(where={"page_id": {"$in": ["2", "3"]}})
+
+    assert index.count() == 2
+    assert index.query(embeddings[0], 4)[0] == ['b', 'a']
+    assert index.query(embeddings[1], 4, where={"page_id": "1"})[0][0] == 'b'
+
+
+def test_writes_are_seen_by_the_other_instances(tmp_path):
+    path = str(tmp_path / 'interactions')
+    writer = LocalVectorIndex.create(path)
+    reader = LocalVectorIndex(path)
+    embeddings = random_embeddings(3)
+
+    writer.upsert(['1', '2'], embeddings[:2])
+    assert reader.query(embeddings[1], 1)[0] == ['2']
+
+    writer.upsert(['3'], embeddings[2:])
+    writer.delete_rows(ids=['2'])
+    assert reader.query(embeddings[1], 3)[0] == exact_top_ids(embeddings, embeddings[1], ['1', '3'])
+
+    writer.delete()
+    with pytest.raises(CollectionNotFound):
+        reader.query(embeddings[0], 1)
+
+
+def test_compaction_keeps_the_live_embeddings(tmp_path):
+    path = str(tmp_path / 'pages')
+    index = LocalVectorIndex.create(path, compaction_ratio=0.25, compaction_min_rows=10)
+    reader = LocalVectorIndex(path)
+    embeddings = random_embeddings(100)
+    index.upsert([str(i) for i in range(100)], embeddings, [{"page_id": str(i % 10)} for i in range(100)])
+    query = random_embeddings(1, seed=2)[0]
+    expected = reader.query(query, 5, where={"page_id": {"$in": ["1", "2"]}})
+
+    index.delete_rows(where={"page_id": {"$in": ["5", "6", "7"]}})
+    index.compaction.join()
+
+    assert index.count() == reader.count() == 70
+    assert len(np.fromfile(f"{path}/vectors-1", dtype=np.float32)) == 70 * 16
+    assert reader.query(query, 5, where={"page_id": {"$in": ["1", "2"]}}) == expected
+
+
+def test_query_filters_by_metadata_values_and_ranges(tmp_path):
+    index = LocalVectorIndex.create(str(tmp_path / 'pages'))
+    embeddings = random_embeddings(6)
+    index.upsert([str(i) for i in range(1, 7)], embeddings,
+                 [{"space_key": "BILLING" if i % 2 else "HR", "last_updated": 1000 * i} for i in range(1, 7)])
+
+    where = get_page_filter(space_keys=["BILLING"], updated_since=datetime.fromtimestamp(2000, timezone.utc))
+
+    assert where == {"$and": [{"space_key": {"$in": ["BILLING"]}}, {"last_updated": {"$gte": 2000}}]}
+    assert index.query(embeddings[0], 6, where)[0] == exact_top_ids(embeddings, embeddings[0], ['3', '5'])
+    assert index.query(embeddings[0], 6, {"last_updated": {"$lte": 2000}})[0] == \
+        exact_top_ids(embeddings, embeddings[0], ['1', '2'])
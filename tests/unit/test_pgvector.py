@@ -0,0 +1,29 @@
+import numpy as np
+from sqlalchemy.dialects import postgresql
+
+from database.embed_vector_manager import get_vector_distance, get_vector_index_name, get_version_dimensions
+from models.base import PgVector
+from models.page_chunk import PageChunk
+
+
+def test_vectors_are_written_as_text_and_read_as_float32_arrays():
+    vector_type = PgVector(3)
+    dialect = postgresql.dialect()
+
+    written = vector_type.bind_processor(dialect)(np.array([0.5, -1.0, 2.25]))
+    read = vector_type.result_processor(dialect, None)(written)
+
+    assert written == '[0.5,-1.0,2.25]'
+    assert read.dtype == np.float32 and read.tolist() == [0.5, -1.0, 2.25]
+    assert vector_type.bind_processor(dialect)(None) is None
+
+
+def test_distance_casts_the_vectors_to_the_dimensions_of_the_version():
+    version = 'text-embedding-3-large:1024'
+
+    sql = str(get_vector_distance(PageChunk, [0.0] * 1024, version).compile(dialect=postgresql.dialect()))
+
+    assert get_version_dimensions(version) == 1024
+    assert 'CAST(page_chunks.embed_vector AS vector(1024)) <=>' in sql
+    assert len(get_vector_index_name(PageChunk, version)) <= 63
+    assert get_vector_index_name(PageChunk, version) != get_vector_index_name(PageChunk, 'text-embedding-3-large:3072')
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from open_ai import rate_limiter as rate_limiter_module
+from open_ai.rate_limiter import BACKGROUND, INTERACTIVE, LocalBucketStore, RateLimiter, take_tokens
+
+
+class InMemoryStore:
+    def __init__(self, clock):
+        self.clock = clock
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def update_buckets(self, capacities, update):
+        with self.lock:
+            now = self.clock()
+            for name, capacity in capacities.items():
+                self.buckets.setdefault(name, (capacity, now))
+            new_tokens, result = update({name: self.buckets[name] for name in capacities}, now)
+            if new_tokens is not None:
+                self.buckets.update({name: (tokens, now) for name, tokens in new_tokens.items()})
+            return result
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A fake clock advanced by time.sleep."""
+    now = [0.0]
+    monkeypatch.setattr(rate_limiter_module.time, 'sleep', lambda seconds: now.__setitem__(0, now[0] + seconds))
+    return lambda: now[0]
+
+
+def test_take_tokens_refills_and_takes_from_all_buckets_or_none():
+    limits = {'requests': (10, 1.0), 'tokens': (100, 10.0)}
+    levels = {'requests': (0, 0.0), 'tokens': (100, 0.0)}
+
+    assert take_tokens(levels, 0.0, {'requests': 1, 'tokens': 50}, limits, 0.0) == (None, 1.0)
+    assert take_tokens(levels, 2.0, {'requests': 1, 'tokens': 50}, limits, 0.0) == ({'requests': 1.0, 'tokens': 50.0},
+                                                                                    0.0)
+
+
+def test_background_requests_leave_the_reserve_to_interactive_ones(clock):
+    limiter = RateLimiter(InMemoryStore(clock), limits={}, background_reserve=0.5,
+                          default_limit={'requests_per_minute': 60, 'tokens_per_minute': 6000})
+
+    # Background requests stop at half the bucket, then wait for it to refill
+    for _ in range(3):
+        assert limiter.acquire('model', 1000, BACKGROUND) == 0
+    assert limiter.acquire('model', 1000, BACKGROUND) > 0
+
+    # Interactive requests can still use the reserve
+    assert limiter.acquire('model', 2000, INTERACTIVE) == 0
+
+
+def test_requests_larger_than_the_bucket_wait_for_a_full_bucket(clock):
+    limiter = RateLimiter(InMemoryStore(clock), limits={}, background_reserve=0.0,
+                          default_limit={'requests_per_minute': 60, 'tokens_per_minute': 600})
+
+    assert limiter.acquire('model', 500) == 0
+    assert limiter.acquire('model', 5000) == pytest.approx(50, rel=0.1)
+
+
+def test_requests_without_tokens_are_limited_within_the_process(clock):
+    shared_store = InMemoryStore(clock)
+    limiter = RateLimiter(shared_store, limits={}, background_reserve=0.0,
+                          default_limit={'requests_per_minute': 600, 'tokens_per_minute': 60000},
+                          local_store=LocalBucketStore(clock), local_requests_share=0.01)
+
+    # The local bucket holds 6 requests, refilled by one every 10 seconds
+    for _ in range(6):
+        assert limiter.acquire('model') == 0
+    assert limiter.acquire('model') == pytest.approx(10, rel=0.1)
+    assert shared_store.buckets == {}
+
+    assert limiter.acquire('model', 100) == 0
+    assert shared_store.buckets['model:tokens'][0] == 60000 - 100
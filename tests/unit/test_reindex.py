@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+
+import pytest
+
+import vector.interactions
+import vector.pages
+from models.vector_collection import VectorCollection
+from vector import reindex
+from vector.collections import ALIASES, get_live_collection, get_versioned_name
+
+
+STORED_COUNT = 10
+
+
+class FakeStore:
+    """A vector store counting the vectors of its collections."""
+    searches_database = False
+
+    def __init__(self):
+        self.counts = {}
+
+    def create_collection(self, name, metadata=None):
+        self.counts.setdefault(name, 0)
+
+    def delete_collection(self, name):
+        del self.counts[name]
+
+    def count(self, name):
+        return self.counts[name]
+
+
+@pytest.fixture
+def build(manager, monkeypatch):
+    """
+    Reindex the live collections of the version old:1, all the stored embeddings being of the configured version
+    already, imported into the collections of the aliases listed in imported_aliases.
+    """
+    state = SimpleNamespace(store=FakeStore(), imported_aliases=list(ALIASES), live_during_imports=[],
+                            version=reindex.get_embedding_version(reindex.embedding_model_id, None))
+    state.names = {alias: get_versioned_name(alias, state.version) for alias in ALIASES}
+    for alias in ALIASES:
+        manager.add(alias, f'{alias}__old', VectorCollection.LIVE, 'old:1')
+        state.store.counts[f'{alias}__old'] = STORED_COUNT
+
+    def import_from_database(resync=False):
+        state.live_during_imports.append({alias: get_live_collection(alias).name for alias in ALIASES})
+        for alias in state.imported_aliases:
+            state.store.counts[state.names[alias]] = STORED_COUNT
+
+    monkeypatch.setattr(reindex, 'VectorCollectionManager', lambda: manager)
+    monkeypatch.setattr(reindex, 'get_store', lambda: state.store)
+    monkeypatch.setattr(reindex, 'embedding_dimensions', None)
+    monkeypatch.setattr(reindex, 'embed_stored_embeddings', lambda embedding_version: {})
+    monkeypatch.setattr(reindex, 'EmbedVectorManager', lambda: SimpleNamespace(
+        count_embeds_by_version=lambda model: {state.version: STORED_COUNT}))
+    monkeypatch.setattr(vector.pages, 'import_from_database', import_from_database)
+    monkeypatch.setattr(vector.interactions, 'import_from_database', import_from_database)
+    return state
+
+
+def get_live_names(manager):
+    return {collection.alias: collection.name for collection in manager.get_collections(
+        statuses=[VectorCollection.LIVE])}
+
+
+def test_the_aliases_switch_once_the_new_collections_are_complete(build, manager):
+    assert reindex.reindex()
+
+    assert build.live_during_imports[-1] == {alias: f'{alias}__old' for alias in ALIASES}
+    assert get_live_names(manager) == build.names
+    assert get_live_collection('pages').name == build.names['pages']
+    assert {collection.name for collection in manager.get_collections(statuses=[VectorCollection.RETIRED])} \
+        == {f'{alias}__old' for alias in ALIASES}
+
+
+def test_the_aliases_stay_live_while_a_new_collection_is_incomplete(build, manager):
+    build.imported_aliases = ['pages', 'page_chunks']
+
+    assert not reindex.reindex()
+
+    assert get_live_names(manager) == {alias: f'{alias}__old' for alias in ALIASES}
+    assert get_live_collection('interactions').name == 'interactions__old'
+    assert {collection.name for collection in manager.get_collections(statuses=[VectorCollection.BUILDING])} \
+        == set(build.names.values())
+
+
+def test_an_interrupted_build_is_resumed(build, manager):
+    build.imported_aliases = ['pages']
+    assert not reindex.reindex()
+
+    build.imported_aliases = list(ALIASES)
+    assert reindex.reindex()
+
+    assert get_live_names(manager) == build.names
+    assert len(manager.collections) == 2 * len(ALIASES)
+
+
+def test_the_retired_collections_are_dropped(build, manager):
+    reindex.reindex()
+
+    reindex.drop_retired_collections()
+
+    assert {collection.name for collection in manager.collections} == set(build.names.values())
+    assert set(build.store.counts) == set(build.names.values())
+
+
+def test_the_pgvector_store_is_not_reindexed_in_place(build, manager):
+    build.store.searches_database = True
+
+    assert not reindex.reindex()
+
+    assert get_live_names(manager) == {alias: f'{alias}__old' for alias in ALIASES}
+    assert not manager.get_collections(statuses=[VectorCollection.BUILDING])
@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+import metrics
+from vector.selection import select_context_chunks, select_count
+
+
+def test_a_clear_match_keeps_the_chunks_before_the_gap():
+    distances = [0.20, 0.22, 0.25, 0.26, 0.27, 0.45, 0.46, 0.48]
+
+    assert select_count(distances, min_count=2, max_distance=0.7, min_gap=0.05) == 5
+
+
+def test_an_ambiguous_question_keeps_the_chunks_within_the_maximum_distance():
+    distances = [0.40, 0.41, 0.43, 0.44, 0.46, 0.47, 0.49, 0.72, 0.74]
+
+    assert select_count(distances, min_count=2, max_distance=0.7, min_gap=0.05) == 7
+
+
+def test_the_minimum_count_is_kept_however_distant():
+    assert select_count([0.9, 0.95, 1.0, 1.1], min_count=2, max_distance=0.7, min_gap=0.05) == 2
+    assert select_count([0.1], min_count=2) == 1
+    assert select_count([0.1, 0.5, 0.9], min_count=3, max_distance=0.2, min_gap=0.05) == 3
+
+
+def test_the_selected_context_chunks_are_the_most_similar_and_counted():
+    chunks = [SimpleNamespace(chunk_id=str(i), distance=distance)
+              for i, distance in enumerate([0.20, 0.21, 0.22, 0.23, 0.24, 0.50, 0.51])]
+    counted = metrics.get_counter('context_selection.chunks')
+
+    selected = select_context_chunks(chunks)
+
+    assert [chunk.chunk_id for chunk in selected] == ['0', '1', '2', '3', '4']
+    assert metrics.get_counter('context_selection.chunks') == counted + 5
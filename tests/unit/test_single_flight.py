@@ -0,0 +1,31 @@
+import pytest
+
+import metrics
+from open_ai.embedding.single_flight import SingleFlight
+
+
+def test_keys_in_flight_are_followed_until_published():
+    flights = SingleFlight('test_flights')
+    leader_keys, followed = flights.begin(['a', 'b', 'a'])
+
+    second_leader_keys, second_followed = flights.begin(['b', 'c'])
+
+    assert leader_keys == ['a', 'b'] and followed == {}
+    assert second_leader_keys == ['c'] and list(second_followed) == ['b']
+    assert metrics.get_counter('test_flights.coalesced') == 1
+
+    flights.complete({'a': 1, 'b': 2})
+    assert second_followed['b'].result() == 2
+    assert flights.begin(['a'])[0] == ['a']
+
+
+def test_failures_are_raised_to_the_followers():
+    flights = SingleFlight('test_failed_flights')
+    leader_keys, _ = flights.begin(['a'])
+    _, followed = flights.begin(['a'])
+
+    flights.fail(leader_keys, RuntimeError('rate limited'))
+
+    with pytest.raises(RuntimeError):
+        followed['a'].result()
+    assert flights.begin(['a'])[0] == ['a']
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+from configuration import embedding_dimensions, embedding_model_id
+from models.vector_collection import VectorCollection
+from open_ai.embedding.embed_manager import get_embedding_version
+from vector.collections import (
+    clear_live_collections,
+    get_import_collections,
+    get_live_collection,
+    get_versioned_name,
+    group_by_version,
+)
+
+
+def test_versioned_names_are_valid_collection_names():
+    assert get_versioned_name('pages', 'text-embedding-3-large:1024') == 'pages__text-embedding-3-large-1024'
+    assert get_versioned_name('page_chunks', 'hashing:text-embedding-3-large:3072') \
+        == 'page_chunks__hashing-text-embedding-3-large-3072'
+
+    name = get_versioned_name('interactions', 'a' * 80 + ':256')
+    assert len(name) <= 63 and name[-1].isalnum()
+
+
+def test_records_are_grouped_by_version_in_order():
+    records = [SimpleNamespace(id=i, embedding_version=version) for i, version in enumerate(['a:1', 'b:2', 'a:1'])]
+
+    grouped = group_by_version(records)
+
+    assert {version: [record.id for record in group] for version, group in grouped.items()} == {'a:1': [0, 2],
+                                                                                               'b:2': [1]}
+
+
+def test_the_live_collection_is_cached_until_cleared(manager):
+    manager.add('pages', 'pages__old', VectorCollection.RETIRED, 'old:1')
+    manager.add('pages', 'pages__new', VectorCollection.LIVE, 'new:1')
+
+    assert get_live_collection('pages').name == 'pages__new'
+    manager.collections[1].status = VectorCollection.RETIRED
+    manager.collections[0].status = VectorCollection.LIVE
+    assert get_live_collection('pages').name == 'pages__new' and manager.reads == 1
+
+    clear_live_collections()
+    assert get_live_collection('pages').name == 'pages__old'
+
+
+def test_an_alias_without_live_collection_uses_the_configured_one(manager):
+    collection = get_live_collection('pages')
+
+    assert collection.name == 'pages'
+    assert collection.embedding_version == get_embedding_version(embedding_model_id, embedding_dimensions)
+
+
+def test_embeddings_are_imported_into_the_collections_of_their_version(manager):
+    manager.add('pages', 'pages__old', VectorCollection.LIVE, 'old:1')
+    manager.add('pages', 'pages__new', VectorCollection.BUILDING, 'new:1')
+    manager.add('pages', 'pages__retired', VectorCollection.RETIRED, 'new:1')
+
+    assert get_import_collections('pages', 'old:1') == ['pages__old']
+    assert get_import_collections('pages', 'new:1') == ['pages__new']
+    assert get_import_collections('pages', 'other:1') == []
+
+
+def test_embeddings_of_the_configured_version_are_imported_without_live_collection(manager):
+    manager.add('pages', 'pages__new', VectorCollection.BUILDING, 'new:1')
+    configured_version = get_embedding_version(embedding_model_id, embedding_dimensions)
+
+    assert get_import_collections('pages', configured_version) == ['pages']
@@ -1,14 +1,96 @@
+import logging
+import os
+import threading
+
 import chromadb
+from chromadb.errors import InvalidCollectionException
 
 from configuration import chroma_host, chroma_port, chroma_database
 
 
+# The client of the process and the collection handles it returned, by collection name
+_client = None
+_client_pid = None
+_collections = {}
+_lock = threading.Lock()
+
+
 def get_client() -> chromadb.ClientAPI:
     """
-    Get a connection to the ChromaDB database.
+    Get the connection to the ChromaDB database of the process.
+    The client is created once, as creating it validates the tenant and the database with two requests,
+    and its HTTP session keeps its connections to the server alive across queries.
+    A forked process creates its own client, as connections can't be shared with the parent process.
+    """
+    global _client, _client_pid
+    with _lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = chromadb.HttpClient(
+                host=chroma_host,
+                port=chroma_port,
+                database=chroma_database,
+            )
+            _client_pid = os.getpid()
+            _collections.clear()
+        return _client
+
+
+def get_collection(name):
+    """
+    Get a collection, from the handles cached by the process so that querying it requires no other request.
+    :param name: The name of the collection.
+    :return: The collection.
+    """
+    client = get_client()
+    with _lock:
+        collection = _collections.get(name)
+    if collection is None:
+        collection = client.get_collection(name)
+        with _lock:
+            _collections[name] = collection
+    return collection
+
+
+def forget_collection(name):
+    """Forget the cached handle of a collection, after the collection was deleted or created again."""
+    with _lock:
+        _collections.pop(name, None)
+
+
+def is_collection_not_found(error):
+    """Whether an error raised by the client means that a collection does not exist."""
+    return isinstance(error, InvalidCollectionException) or 'does not exist' in str(error)
+
+
+def query_collection(name, **query):
+    """
+    Query a collection through its cached handle. A collection deleted and created again has a new ID,
+    so the handle is refreshed once when the collection is not found.
+    :param name: The name of the collection.
+    :param query: The arguments of the query, such as query_embeddings, n_results and include.
+    :return: The query result.
+    """
+    try:
+        return get_collection(name).query(**query)
+    except Exception as e:
+        if not is_collection_not_found(e):
+            raise
+        logging.info(f"Collection '{name}' not found, refreshing its handle: {e}")
+        forget_collection(name)
+        return get_collection(name).query(**query)
+
+
+def get_cosine_distances(name, distances):
+    """
+    Convert the distances returned by a query of a collection to cosine distances, like the other vector stores.
+    The collections are created with the default squared L2 distance, which is twice the cosine distance
+    of the L2-normalized embeddings stored.
+    :param name: The name of the queried collection.
+    :param distances: The distances of the results of the query, in the space of the collection.
+    :return: The cosine distances.
     """
-    return chromadb.HttpClient(
-        host=chroma_host,
-        port=chroma_port,
-        database=chroma_database,
-    )
+    space = (get_collection(name).metadata or {}).get('hnsw:space', 'l2')
+    if space == 'l2':
+        return [distance / 2 for distance in distances]
+    # The cosine distance, or 1 - the inner product, which is the same for L2-normalized embeddings
+    return list(distances)
@@ -0,0 +1,131 @@
+import logging
+import re
+import threading
+import time
+
+from configuration import (
+    embedding_dimensions,
+    embedding_model_id,
+    vector_collection_alias_ttl_seconds,
+    vector_collection_interactions,
+    vector_collection_page_chunks,
+    vector_collection_pages,
+)
+from database.embed_vector_manager import EmbedVectorManager
+from database.vector_collection_manager import VectorCollectionManager
+from models.vector_collection import VectorCollection
+from open_ai.embedding.embed_manager import get_embedding_version
+
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Aliases switched together to the collections of a new embedding version
+ALIASES = (vector_collection_pages, vector_collection_page_chunks, vector_collection_interactions)
+
+_live_collections = {}
+_live_collections_lock = threading.Lock()
+
+
+def get_configured_collection(alias):
+    """
+    The collection of an alias without a registered live collection: named after the alias,
+    with the configured embedding model and dimensions.
+    """
+    return VectorCollection(alias=alias, name=alias, status=VectorCollection.LIVE,
+                            embedding_version=get_embedding_version(embedding_model_id, embedding_dimensions),
+                            embedding_model=embedding_model_id, embedding_dimensions=embedding_dimensions)
+
+
+def get_live_collection(alias):
+    """
+    Get the live collection of an alias, the one questions are answered from, cached for
+    vector_collection_alias_ttl_seconds so that questions don't query the database to resolve it.
+    :param alias: The alias, such as pages.
+    :return: The VectorCollection record, with the name of the collection and the model and dimensions
+        its queries must be embedded with.
+    """
+    with _live_collections_lock:
+        collection, expires_at = _live_collections.get(alias, (None, 0))
+    if time.monotonic() < expires_at:
+        return collection
+
+    live = VectorCollectionManager().get_collections([alias], [VectorCollection.LIVE])
+    collection = live[0] if live else get_configured_collection(alias)
+    with _live_collections_lock:
+        _live_collections[alias] = (collection, time.monotonic() + vector_collection_alias_ttl_seconds)
+    return collection
+
+
+def clear_live_collections():
+    """Forget the cached live collections, after a switch made by this process."""
+    with _live_collections_lock:
+        _live_collections.clear()
+
+
+def get_import_collections(alias, embedding_version, count=0):
+    """
+    Get the collections of an alias that embeddings of a version are imported into:
+    the live collection and the collection being built, if their version is the same.
+    Not cached, so that imports reach a collection as soon as it starts being built.
+    :param alias: The alias, such as pages.
+    :param embedding_version: The version of the embeddings to import.
+    :param count: The number of embeddings to import, logged when no collection has their version.
+    :return: The names of the collections.
+    """
+    collections = VectorCollectionManager().get_collections(
+        [alias], [VectorCollection.LIVE, VectorCollection.BUILDING])
+    if not any(collection.status == VectorCollection.LIVE for collection in collections):
+        collections.append(get_configured_collection(alias))
+    names = [collection.name for collection in collections if collection.embedding_version == embedding_version]
+    if not names:
+        logging.warning(f"{count} embeddings of version {embedding_version} not imported into {alias}, "
+                        f"no collection has this version. Build one with: python -m vector.reindex")
+    return names
+
+
+def get_versioned_name(alias, embedding_version):
+    """
+    Name the collection of an alias for an embedding version, such as pages__text-embedding-3-large-1024,
+    within the 63 characters allowed by the vector database.
+    """
+    return f"{alias}__{re.sub(r'[^a-zA-Z0-9]+', '-', embedding_version)}"[:63].strip('-')
+
+
+def group_by_version(records):
+    """
+    Group embedding records by version.
+    :param records: Records with an embedding_version attribute.
+    :return: A dict of the records of each version, in their order.
+    """
+    records_by_version = {}
+    for record in records:
+        records_by_version.setdefault(record.embedding_version, []).append(record)
+    return records_by_version
+
+
+def sync_to_collections(alias, model, read_batch, insert, get_key):
+    """
+    Import embeddings read by batches into the collections of their version, and record them as synced
+    once imported into all of them. The embeddings of a batch that failed are left unsynced,
+    so that the next sync imports them again, resuming an interrupted one.
+    :param alias: The alias of the collections, such as pages.
+    :param model: The SQLAlchemy model storing the embeddings.
+    :param read_batch: The function reading the next batch of rows, given the key of the last row read
+        or None for the first batch, rows having the id, embed, embedding_version and last_embedded columns.
+    :param insert: The function inserting rows into a collection, given the rows and the name of the collection,
+        and returning whether they were all inserted.
+    :param get_key: The function returning the key of a row, to read the next batch after it.
+    :return: The number of synced embeddings.
+    """
+    synced_count = 0
+    key = None
+    while rows := read_batch(key):
+        for embedding_version, version_rows in group_by_version(rows).items():
+            collection_names = get_import_collections(alias, embedding_version, len(version_rows))
+            # Inserted into every collection, even when one fails
+            if collection_names and all([insert(version_rows, name) for name in collection_names]):
+                EmbedVectorManager().mark_synced_to_vector(model, version_rows)
+                synced_count += len(version_rows)
+        key = get_key(rows[-1])
+        logging.info(f"{synced_count} embeddings synced to the {alias} collections.")
+    return synced_count
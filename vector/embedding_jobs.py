@@ -0,0 +1,97 @@
+import logging
+import os
+import socket
+import time
+
+from configuration import (
+    embedding_job_backoff_base_seconds,
+    embedding_job_backoff_max_seconds,
+    embedding_job_claim_size,
+    embedding_job_max_attempts,
+    embedding_job_stale_timeout_seconds,
+    embedding_worker_poll_interval_seconds,
+)
+from database.embedding_job_manager import EmbeddingJobManager
+from models.embedding_job import EmbeddingJob
+
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def get_worker_id():
+    """Identify the current process across the nodes running workers."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def process_jobs(jobs, generators):
+    """
+    Run claimed jobs, grouped by kind, and record their outcome.
+    The targets of a kind are embedded together, the jobs whose target was not embedded are failed and retried.
+    :param jobs: The claimed jobs, as returned by EmbeddingJobManager.claim.
+    :param generators: The function embedding the targets of each kind of job, given a list of target IDs
+        and returning the list of embedded target IDs.
+    """
+    manager = EmbeddingJobManager()
+    jobs_by_kind = {}
+    for job in jobs:
+        jobs_by_kind.setdefault(job.kind, []).append(job)
+
+    for kind, kind_jobs in jobs_by_kind.items():
+        generator = generators.get(kind)
+        if generator is None:
+            manager.fail(kind_jobs, f"Unknown job kind {kind}", 0, 0, 0)
+            continue
+
+        # The same target may have been queued several times, it is embedded once for all its jobs
+        target_ids = list(dict.fromkeys(job.target_id for job in kind_jobs))
+        try:
+            embedded_ids = {str(target_id) for target_id in generator(target_ids)}
+            error = "Target not found or not embedded"
+        except Exception as e:
+            logging.error(f"Error running {len(kind_jobs)} {kind} embedding jobs: {e}")
+            embedded_ids, error = set(), str(e)
+
+        manager.complete([job.id for job in kind_jobs if job.target_id in embedded_ids])
+        failed_jobs = [job for job in kind_jobs if job.target_id not in embedded_ids]
+        if failed_jobs:
+            dead_job_ids = manager.fail(failed_jobs, error, embedding_job_max_attempts,
+                                        embedding_job_backoff_base_seconds, embedding_job_backoff_max_seconds)
+            logging.warning(f"{len(failed_jobs)} {kind} embedding jobs failed, "
+                            f"{len(dead_job_ids)} of them dead after {embedding_job_max_attempts} attempts.")
+
+
+def run_once(generators, worker_id, claim_size=embedding_job_claim_size):
+    """
+    Claim and run a batch of jobs of the kinds handled by the generators.
+    :return: The number of claimed jobs.
+    """
+    manager = EmbeddingJobManager()
+    manager.release_stale(embedding_job_stale_timeout_seconds, embedding_job_max_attempts)
+    jobs = manager.claim(worker_id, claim_size, kinds=list(generators))
+    if jobs:
+        logging.info(f"Worker {worker_id} claimed {len(jobs)} embedding jobs.")
+        process_jobs(jobs, generators)
+    return len(jobs)
+
+
+def wait_for_jobs(job_ids, generators, poll_interval=embedding_worker_poll_interval_seconds):
+    """
+    Wait until jobs are done or dead, running the available jobs in this process meanwhile,
+    so that the jobs complete whether embedding workers are running or not.
+    :param job_ids: The IDs of the jobs to wait for.
+    :param generators: The function embedding the targets of each kind of job, see process_jobs.
+    :param poll_interval: The number of seconds to wait when no job is available,
+        while jobs are run by other workers or are waiting to be retried.
+    :return: A dict of the number of jobs by status.
+    """
+    manager = EmbeddingJobManager()
+    worker_id = get_worker_id()
+    while True:
+        statuses = manager.count_statuses(job_ids)
+        unfinished = statuses.get(EmbeddingJob.PENDING, 0) + statuses.get(EmbeddingJob.RUNNING, 0)
+        if not unfinished:
+            return statuses
+
+        if not run_once(generators, worker_id):
+            logging.info(f"Waiting for {unfinished} of {len(job_ids)} embedding jobs.")
+            time.sleep(poll_interval)
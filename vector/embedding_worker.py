@@ -0,0 +1,103 @@
+import argparse
+import logging
+import multiprocessing
+import signal
+import time
+
+from configuration import embedding_worker_count, embedding_worker_poll_interval_seconds
+from database.database import engine
+from models.embedding_job import EmbeddingJob
+from vector.embedding_jobs import get_worker_id, run_once
+from vector.interactions import import_from_database as import_interactions
+from vector.interactions.embeddings.generate_batch import generate_embeddings_to_database as embed_interactions
+from vector.pages.embeddings.generate_batch import generate_embeddings_to_database as embed_pages
+
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def embed_and_import_interactions(interaction_ids):
+    """
+    Vectorize interactions and import them into the vector database right away, so that the answers to
+    the questions just asked are found for the next similar questions, see interactions/answer_cache.py.
+    :return: The IDs of the vectorized interactions.
+    """
+    embedded_interaction_ids = embed_interactions(interaction_ids)
+    if embedded_interaction_ids:
+        import_interactions()
+    return embedded_interaction_ids
+
+
+GENERATORS = {
+    EmbeddingJob.PAGE: embed_pages,
+    EmbeddingJob.INTERACTION: embed_and_import_interactions,
+}
+
+
+def run_worker(stop_event, poll_interval=embedding_worker_poll_interval_seconds):
+    """
+    Claim and run embedding jobs until stopped, waiting for new jobs when the queue is empty.
+    The current batch is finished before stopping, an interrupted batch is claimed again once its lock is stale.
+    :param stop_event: The event set to stop the worker.
+    :param poll_interval: The number of seconds to wait when no job is available.
+    """
+    # Stopping is handled by the parent process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # Connections inherited from the parent process must not be shared, the worker opens its own
+    engine.dispose(close=False)
+    worker_id = get_worker_id()
+    logging.info(f"Embedding worker {worker_id} started.")
+    while not stop_event.is_set():
+        try:
+            claimed = run_once(GENERATORS, worker_id)
+        except Exception as e:
+            logging.error(f"Embedding worker {worker_id} failed to run jobs: {e}")
+            claimed = 0
+        if not claimed:
+            stop_event.wait(poll_interval)
+    logging.info(f"Embedding worker {worker_id} stopped.")
+
+
+def run_worker_pool(worker_count=embedding_worker_count):
+    """
+    Run embedding workers in separate processes until interrupted or terminated.
+    Pools can run on several nodes against the same database, jobs being claimed without overlap.
+    :param worker_count: The number of worker processes.
+    """
+    stop_event = multiprocessing.Event()
+
+    def stop(signum, frame):
+        logging.info("Stopping the embedding workers after their current jobs.")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    workers = [multiprocessing.Process(target=run_worker, args=(stop_event,), name=f"embedding-worker-{i}")
+               for i in range(worker_count)]
+    for worker in workers:
+        worker.start()
+
+    while not stop_event.is_set():
+        # A crashed worker is replaced, its jobs are claimed again once their lock is stale
+        for i, worker in enumerate(workers):
+            if not worker.is_alive():
+                logging.error(f"Embedding worker {worker.name} exited with code {worker.exitcode}, restarting it.")
+                workers[i] = multiprocessing.Process(target=run_worker, args=(stop_event,), name=worker.name)
+                workers[i].start()
+        time.sleep(1)
+
+    for worker in workers:
+        worker.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the embedding workers processing the queued embedding jobs.")
+    parser.add_argument('--workers', type=int, default=embedding_worker_count, help="Number of worker processes.")
+    args = parser.parse_args()
+    run_worker_pool(args.workers)
+
+
+if __name__ == '__main__':
+    main()
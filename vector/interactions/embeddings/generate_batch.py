@@ -0,0 +1,85 @@
+import json
+import logging
+
+from configuration import embedding_batch_size, embedding_model_id
+from database.interaction_manager import QAInteractionManager
+from open_ai.embedding.embed_manager import embed_texts_in_batches, get_embedding_version
+from database.database import get_db_session
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def format_comment(raw_comment):
+    if raw_comment is None:
+        return "No comments available."
+
+    try:
+        comment_data = json.loads(raw_comment)
+    except json.JSONDecodeError:
+        return "Invalid comment format."
+
+    formatted_comments = []
+    for comment in comment_data:
+        text = comment["text"].replace('\n', ' ').strip()
+        user = comment["user"]
+        timestamp = comment["timestamp"]
+        formatted_comments.append(f"{text} (Comment by {user} on {timestamp})")
+    return ' '.join(formatted_comments)
+
+
+def format_interaction(interaction):
+    """
+    Create a formatted string containing the page title and content for a given interaction.
+
+    Args:
+    interaction (QAInteraction): A QAInteraction object.
+
+    Returns:
+    str: A string containing the formatted page title and content.
+    """
+    # Create the page title and content
+    comments = format_comment(interaction.comments)
+    formatted_interaction = f"""
+        <h2>Question</h2>
+        <p>{interaction.question_text}</p>
+        <h2>Answer</h2>
+        <p>{interaction.answer_text}</p>
+        <h2>Comments</h2>
+        <p>{comments}</p>
+        """
+    return formatted_interaction
+
+
+def generate_embeddings_to_database(interaction_ids, batch_size=embedding_batch_size):
+    """
+    Vectorize interactions in batches and store them in the database.
+    The interactions of a batch are embedded with as few requests as the API limits allow, and stored in bulk.
+    :param interaction_ids: The IDs of the interactions to vectorize.
+    :param batch_size: The number of interactions loaded, embedded and stored together.
+    :return: The IDs of the vectorized interactions.
+    """
+    embedding_version = get_embedding_version(embedding_model_id)
+    embedded_interaction_ids = []
+    for start in range(0, len(interaction_ids), batch_size):
+        batch_interaction_ids = interaction_ids[start:start + batch_size]
+        with get_db_session() as session:
+            interactions = QAInteractionManager().get_interactions_by_interaction_ids(session, batch_interaction_ids)
+            if not interactions:
+                logging.error(f"No interaction found for IDs {batch_interaction_ids}")
+                continue
+
+            formatted_interactions = [format_interaction(interaction) for interaction in interactions]
+            try:
+                embeds = embed_texts_in_batches(formatted_interactions, model=embedding_model_id)
+            except Exception as e:
+                logging.error(f"Error generating embeddings for interaction IDs {batch_interaction_ids}: {e}")
+                continue
+
+            QAInteractionManager().add_embeds_to_interactions(
+                session, {interaction.id: embed for interaction, embed in zip(interactions, embeds)},
+                embedding_version)
+            embedded_interaction_ids.extend(interaction.id for interaction in interactions)
+            logging.info(f"{len(embedded_interaction_ids)}/{len(interaction_ids)} interactions vectorized "
+                         f"and stored in the database.")
+
+    return embedded_interaction_ids
@@ -1,66 +1,41 @@
 import logging
-import time
 
-from api.request import post_request
-from configuration import interaction_embeds_endpoint
+from database.embedding_job_manager import EmbeddingJobManager
 from database.interaction_manager import QAInteractionManager
 from database.database import get_db_session
+from models.embedding_job import EmbeddingJob
+from vector.embedding_jobs import wait_for_jobs
 
-
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from .generate_batch import generate_embeddings_to_database
 
 
-def find_missing(session):
-    return QAInteractionManager().get_interactions_without_embeds(session)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-def submit_request(interaction_id):
-    """
-    Submit an API request to create interaction embeds.
-    :return: None
-    """
-    post_request(interaction_embeds_endpoint, {"interaction_id": interaction_id})
+def find_missing():
+    with get_db_session() as session:
+        return [interaction.id for interaction in QAInteractionManager().get_interactions_without_embeds(session)]
 
 
-def generate_missing_embeddings_to_database(retry_limit: int = 3, wait_time: int = 5) -> None:
+def generate_missing_embeddings_to_database() -> None:
     """
-    Vectorize all interactions without embeds and store them in the database,
-    with retries for failed attempts.
+    Vectorize all interactions without embeds and store them in the database.
+    The interactions are queued as embedding jobs, which are run by this process and by the embedding workers,
+    and the jobs are waited for until they are done or dead after their retries.
     """
-    for attempt in range(retry_limit):
-        # Retrieve interactions that are still missing embeddings.
-        with get_db_session() as session:
-            interactions = find_missing(session)
-
-            # If there are no interactions missing embeddings, exit the loop and end the process.
-            if not interactions:
-                print("All interactions have embeddings. Process complete.")
-                return
-
-            print(
-                f"Attempt {attempt + 1} of {retry_limit}: Processing {len(interactions)} interactions missing embeddings.")
-            for interaction in interactions:
-                try:
-                    # Attempt to vectorize and store each interaction.
-                    submit_request(str(interaction.id))
-                    # A brief delay between processing to manage load.
-                    time.sleep(0.5)
-                except Exception as e:
-                    logging.error(f"An error occurred while vectorizing interaction with ID {interaction.id}: {e}")
-
-            print(f"Waiting for {wait_time} seconds for embeddings to be processed...")
-            time.sleep(wait_time)
+    # Retrieve interactions that are missing embeddings.
+    interaction_ids = find_missing()
 
-            # After waiting, retrieve the list of interactions still missing embeddings to see if the list has decreased.
-            interactions = find_missing(session)
-            if not interactions:
-                print("All interactions now have embeddings. Process complete.")
-                break  # Break out of the loop if there are no more interactions missing embeddings.
+    # If there are no interactions missing embeddings, end the process.
+    if not interaction_ids:
+        print("All interactions have embeddings. Process complete.")
+        return
 
-            print(f"After attempt {attempt + 1}, {len(interactions)} interactions are still missing embeds.")
+    print(f"Queuing {len(interaction_ids)} interactions missing embeddings.")
+    job_ids = EmbeddingJobManager().enqueue(EmbeddingJob.INTERACTION, interaction_ids)
+    statuses = wait_for_jobs(job_ids, {EmbeddingJob.INTERACTION: generate_embeddings_to_database})
 
-    # After exhausting the retry limit, check if there are still interactions without embeddings.
-    if interactions:
-        print("Some interactions still lack embeddings after all attempts.")
+    if dead_count := statuses.get(EmbeddingJob.DEAD, 0):
+        print(f"{dead_count} interactions still lack embeddings after all attempts.")
     else:
         print("All interactions now have embeddings. Process complete.")
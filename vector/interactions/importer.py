@@ -1,64 +1,76 @@
-import json
 import logging
 
-from configuration import vector_collection_interactions
+from configuration import vector_collection_interactions, vector_sync_batch_size
 from database.interaction_manager import QAInteractionManager
 from database.database import get_db_session
+from models.qa_interaction import QAInteraction
 
-from ..chroma import get_client
+from ..stores import get_store
+from ..collections import sync_to_collections
 
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-def extract_data():
-    with get_db_session() as session:
-        interactions = QAInteractionManager().get_interactions_with_embeds(session)
-        ids, embeddings = [], []
-        # Deserialize the embeddings and filter out None values
-        for i, interaction in enumerate(interactions):
-            if interaction.embed is None:
-                logging.warning(f"Skipping embedding at index {i}: Embed is None")
-                continue
-
-            try:
-                # Deserialize the JSON string into a Python list
-                embeddings.append(json.loads(interaction.embed))
-                ids.append(str(interaction.id))
-            except (json.JSONDecodeError, TypeError) as e:
-                logging.error(f"Failed to deserialize embedding at index {i}: {e}")
-                continue
-
-            if i % 10 == 0:
-                logging.info(f"Processed {i + 1}/{len(embeddings)} embeddings.")
-
-        logging.info("Completed deserializing all embeddings.")
-        return ids, embeddings
-
-
-def insert_data(ids, embeddings):
-    collection_name = vector_collection_interactions
-    logging.info(f"Ensuring collection '{collection_name}' exists...")
-    client = get_client()
-    collection = client.get_or_create_collection(collection_name)
+def extract_data(interactions):
+    ids, embeddings = [], []
+    # Filter out missing embeddings, the vector database expects lists of floats
+    for i, interaction in enumerate(interactions):
+        if interaction.embed is None or not interaction.embed.size:
+            logging.warning(f"Skipping embedding at index {i}: Embed is missing")
+            continue
+
+        embeddings.append(interaction.embed.tolist())
+        ids.append(str(interaction.id))
+
+    logging.info(f"Extracted {len(embeddings)}/{len(interactions)} embeddings.")
+    return ids, embeddings
 
+
+def insert_data(ids, embeddings, collection_name=vector_collection_interactions):
+    """
+    Upsert interaction embeddings into the interaction collection.
+    :return: Whether the embeddings were upserted.
+    """
     # Add interactions to the collection
     logging.info(f"Adding {len(embeddings)} interactions to the collection '{collection_name}'...")
     try:
-        collection.upsert(
+        get_store().upsert(
+            collection_name,
             ids=ids,
             embeddings=embeddings,
             metadatas=[{"interaction_id": iid} for iid in ids]
         )
-        logging.info(f"Successfully added {len(embeddings)} interactions to the collection '{collection_name}'.")
-        logging.info(f"Collection count {collection.count()} ")
-
     except Exception as e:
         logging.error(f"Error adding interactions to the collection: {e}")
+        return False
 
-    logging.info(f"Embeddings added to {collection_name} collection.")
+    logging.info(f"Successfully added {len(embeddings)} interactions to the collection '{collection_name}'.")
+    return True
 
 
-def import_from_database():
-    ids, embeddings = extract_data()
-    insert_data(ids, embeddings)
+def read_interactions(after_id, resync, batch_size):
+    with get_db_session() as session:
+        return QAInteractionManager().get_interactions_with_embeds(session, not resync, after_id or 0, batch_size)
+
+
+def import_from_database(resync=False, batch_size=vector_sync_batch_size):
+    """
+    Extracts the interaction embeddings changed since they were last imported into the vector database,
+    and inserts them by batches. The embeddings of each version are inserted into the live collection and
+    the collection being built of that version, see vector.collections.
+    Each batch is recorded as synced once inserted, so that an interrupted import is resumed by the next one.
+    :param resync: Import all the embeddings, including the ones already imported.
+    :param batch_size: The number of interactions read and sent to the vector database together.
+    """
+    if get_store().searches_database:
+        logging.info("The embeddings are searched in the database they are stored in, there is nothing to import.")
+        return
+
+    batch_size = min(batch_size, get_store().max_batch_size)
+    count = sync_to_collections(
+        vector_collection_interactions, QAInteraction,
+        lambda after_id: read_interactions(after_id, resync, batch_size),
+        lambda interactions, collection_name: insert_data(*extract_data(interactions), collection_name),
+        lambda interaction: interaction.id)
+    logging.info(f"{count} interaction embeddings imported.")
@@ -1,17 +1,20 @@
 
 import logging
-from typing import List
+from typing import List, Tuple
 
-from configuration import embedding_model_id, vector_collection_interactions
+from configuration import vector_collection_interactions
+from database.database import get_db_session
+from database.interaction_manager import QAInteractionManager
 from open_ai.embedding.embed_manager import embed_text
 
-from ..chroma import get_client
+from ..collections import get_live_collection
+from ..stores import get_store
 
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-def retrieve_relevant_ids(query: str, count: int) -> List[int]:
+def retrieve_relevant_ids(query: str, count: int) -> List[Tuple[str, float]]:
     """
     Retrieve the most relevant interactions for a given query using vector database.
 
@@ -19,31 +22,52 @@ def retrieve_relevant_ids(query: str, count: int) -> List[int]:
         query (str): The query to retrieve relevant interactions for.
 
     Returns:
-        List[str]: A list of interaction IDs of the most relevant interactions.
+        List[Tuple[str, float]]: The (interaction ID, cosine distance) pairs of the most relevant interactions,
+            the most relevant first.
     """
 
-    # Generate the query embedding using OpenAI
+    # Generate the query embedding like the embeddings of the live collection
+    live_collection = get_live_collection(vector_collection_interactions)
     try:
-        query_embedding = embed_text(text=query, model=embedding_model_id)
+        query_embedding = embed_text(text=query, model=live_collection.embedding_model,
+                                     dimensions=live_collection.embedding_dimensions)
     except Exception as e:
         logging.error(f"Error generating query embedding: {e}")
         return []
 
-    # Initialize the ChromaDB client
-    client = get_client()
-    collection = client.get_collection(vector_collection_interactions)
-
     # Perform a similarity search in the collection
-    similar_items = collection.query(
-        query_embeddings=[query_embedding],
-        n_results=count
-    )
-
-    # Extract and return the interaction IDs from the results
-    if 'ids' in similar_items:
-        interaction_ids = [id for sublist in similar_items['ids'] for id in sublist]
-    else:
-        logging.warning("No 'ids' key found in similar_items, no interactions retrieved.")
-        interaction_ids = []
-
-    return interaction_ids
+    return get_store().query(live_collection.name, query_embedding, count)
+
+
+def retrieve_relevant_interactions(query: str, count: int) -> list:
+    """
+    Retrieve the most relevant interactions for a given query. With the pgvector store, the interactions are found
+    by a single query of the database, instead of a query of the vector database followed by a query of the
+    interactions.
+
+    Args:
+        query (str): The query to retrieve relevant interactions for.
+        count (int): The number of interactions to retrieve.
+
+    Returns:
+        list: The QAInteraction records of the most relevant interactions, detached from the session.
+    """
+    live_collection = get_live_collection(vector_collection_interactions)
+    try:
+        query_embedding = embed_text(text=query, model=live_collection.embedding_model,
+                                     dimensions=live_collection.embedding_dimensions)
+    except Exception as e:
+        logging.error(f"Error generating query embedding: {e}")
+        return []
+
+    store = get_store()
+    with get_db_session() as session:
+        if store.searches_database:
+            interactions = QAInteractionManager().find_similar_interactions(
+                session, query_embedding, live_collection.embedding_version, count)
+        else:
+            interactions = QAInteractionManager().get_interactions_by_interaction_ids(
+                session, [id for id, _ in store.query(live_collection.name, query_embedding, count)])
+        session.expunge_all()
+    return interactions
+
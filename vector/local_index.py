@@ -0,0 +1,360 @@
+# ./vector/local_index.py
+"""
+An exact nearest neighbour index of a collection, searched within the process instead of through a server.
+
+The embeddings of a collection are stored L2-normalized as float32 rows of a file memory-mapped by the processes
+searching it, so that a query is a single matrix product over the rows followed by a partial sort of the scores.
+The rows are described by an append-only journal of JSON lines, which adds rows with their IDs and metadata
+and deletes rows by ID. Replacing or deleting an embedding only marks its row as deleted, and the collection is
+compacted in the background once enough of its rows are deleted: the live rows are copied to the files
+of a new generation, which the CURRENT file then points to.
+
+Files of a collection directory:
+    CURRENT                 the generation of the files in use
+    vectors-<generation>    the rows, appended before the journal line adding them
+    journal-<generation>    the journal, a line per write
+    lock                    locked by the process writing to the collection
+
+Any number of processes can search a collection while one of them writes to it: before each query,
+the index replays the journal lines appended since the previous one, and reloads after a compaction.
+"""
+import fcntl
+from contextlib import contextmanager
+import json
+import logging
+import operator
+import os
+import shutil
+import threading
+
+import numpy as np
+
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class CollectionNotFound(LookupError):
+    """Raised when a collection does not exist, or was deleted."""
+
+
+def normalize(embeddings):
+    """L2-normalize embeddings as float32 rows, leaving the zero vectors unchanged."""
+    embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.where(norms > 0, norms, 1)
+
+
+class LocalVectorIndex:
+    """
+    The index of a collection stored in a directory, see the module documentation.
+    The instances of the same directory are kept in sync through the files, including across processes.
+    """
+
+    def __init__(self, path, compaction_ratio=0.25, compaction_min_rows=1000):
+        """
+        :param path: The directory of the collection.
+        :param compaction_ratio: The share of deleted rows a collection is compacted beyond.
+        :param compaction_min_rows: The number of deleted rows a collection is compacted from,
+            so that small collections are not compacted at every write.
+        """
+        self.path = path
+        self.compaction_ratio = compaction_ratio
+        self.compaction_min_rows = compaction_min_rows
+        self.lock = threading.RLock()
+        self.compaction = None
+        self._current_stat = None
+        self._load_generation(None)
+
+    @classmethod
+    def create(cls, path, metadata=None, **kwargs):
+        """
+        Create the index of a collection, unless it exists.
+        :param path: The directory of the collection.
+        :param metadata: The metadata of the collection, stored in the first line of the journal.
+        :return: The index.
+        """
+        os.makedirs(path, exist_ok=True)
+        with _file_lock(path):
+            if not os.path.exists(os.path.join(path, 'CURRENT')):
+                _write_generation(path, 0, [json.dumps({"collection": metadata or {}})], np.empty((0, 0)))
+        return cls(path, **kwargs)
+
+    def delete(self):
+        """Delete the files of the collection, the processes searching it then raise CollectionNotFound."""
+        with _file_lock(self.path):
+            os.remove(os.path.join(self.path, 'CURRENT'))
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    @property
+    def metadata(self):
+        self.refresh()
+        return self._metadata
+
+    def count(self):
+        """The number of embeddings of the collection."""
+        self.refresh()
+        return len(self._id_rows)
+
+    def refresh(self):
+        """Apply the writes made since the last refresh, by this process or another one."""
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    current_stat = os.stat(os.path.join(self.path, 'CURRENT'))
+                    if _stat_key(current_stat) != self._current_stat:
+                        with open(os.path.join(self.path, 'CURRENT')) as file:
+                            self._load_generation(int(file.read()))
+                        self._current_stat = _stat_key(current_stat)
+                    self._replay_journal()
+                    return
+                except FileNotFoundError:
+                    # The files of the generation are deleted by a compaction right after switching to the next one
+                    self._current_stat = None
+                    if attempt or not os.path.isdir(self.path):
+                        raise CollectionNotFound(f"Collection '{os.path.basename(self.path)}' does not exist")
+
+    def upsert(self, ids, embeddings, metadatas=None):
+        """
+        Add embeddings, replacing the ones with the same IDs.
+        :param ids: The IDs of the embeddings.
+        :param embeddings: The embeddings, of the same dimensions as the ones of the collection.
+        :param metadatas: The metadata of each embedding, dicts of JSON values.
+        """
+        if not ids:
+            return
+        vectors = normalize(embeddings)
+        metadatas = metadatas or [{}] * len(ids)
+        if not len(ids) == len(vectors) == len(metadatas):
+            raise ValueError(f"{len(ids)} IDs, {len(vectors)} embeddings and {len(metadatas)} metadatas")
+        if len(set(ids)) != len(ids):
+            raise ValueError("Duplicate IDs in the embeddings to add")
+
+        with self._writing():
+            if self._dimensions is not None and vectors.shape[1] != self._dimensions:
+                raise ValueError(f"Embeddings of {vectors.shape[1]} dimensions added to the collection "
+                                 f"'{os.path.basename(self.path)}' of {self._dimensions} dimensions")
+            vectors_path = self._file_path('vectors')
+            # Rows written by a write interrupted before its journal line are overwritten
+            os.truncate(vectors_path, self._row_count * vectors.shape[1] * vectors.itemsize)
+            with open(vectors_path, 'ab') as file:
+                file.write(vectors.tobytes())
+            self._append_journal({"add": list(ids), "metadatas": metadatas, "dimensions": vectors.shape[1]})
+
+    def delete_rows(self, ids=None, where=None):
+        """
+        Delete embeddings, the ones of both the IDs and the filter when both are given.
+        :param ids: The IDs of the embeddings to delete.
+        :param where: The filter of the metadata of the embeddings to delete, see get_filter_mask.
+        """
+        with self._writing():
+            if where is None:
+                deleted_ids = [id for id in ids or [] if id in self._id_rows]
+            else:
+                rows = np.nonzero(self.get_filter_mask(where) & self._alive[:self._row_count])[0]
+                deleted_ids = [self._ids[row] for row in rows]
+                if ids is not None:
+                    deleted_ids = list(set(deleted_ids) & set(ids))
+            if deleted_ids:
+                self._append_journal({"delete": deleted_ids})
+
+    def query(self, embedding, count, where=None):
+        """
+        Find the embeddings most similar to an embedding, by exact cosine similarity.
+        :param embedding: The embedding of the query.
+        :param count: The number of embeddings to find.
+        :param where: Optional; the filter of the metadata of the embeddings to search, see get_filter_mask.
+        :return: The IDs of the most similar embeddings and their cosine distances, the most similar first.
+        """
+        self.refresh()
+        with self.lock:
+            row_count, vectors, ids = self._row_count, self._vectors, self._ids
+            mask = self._alive[:row_count].copy()
+            if where is not None:
+                mask &= self.get_filter_mask(where)[:row_count]
+        count = min(count, int(mask.sum()))
+        if count <= 0:
+            return [], []
+
+        scores = vectors[:row_count] @ normalize(embedding)[0]
+        scores[~mask] = -np.inf
+        rows = np.argpartition(-scores, count - 1)[:count] if count < row_count else np.arange(row_count)
+        rows = rows[np.argsort(-scores[rows], kind='stable')][:count]
+        return [ids[row] for row in rows], (1 - scores[rows]).tolist()
+
+    def get_filter_mask(self, where):
+        """
+        Select rows by their metadata, with the filters of Chroma: {"key": value}, {"key": {"$eq": value}},
+        {"key": {"$in": [values]}}, {"key": {"$gte": number}}, {"key": {"$lte": number}} and {"$and": [filters]}.
+        :return: A boolean array of the rows matching the filter, deleted rows included.
+        """
+        with self.lock:
+            mask = np.ones(self._row_count, dtype=bool)
+            for key, condition in where.items():
+                if key == '$and':
+                    for sub_filter in condition:
+                        mask &= self.get_filter_mask(sub_filter)
+                    continue
+                if not isinstance(condition, dict):
+                    condition = {"$eq": condition}
+                for operator_name, value in condition.items():
+                    key_mask = np.zeros(self._row_count, dtype=bool)
+                    postings = self._postings.get(key, {})
+                    if operator_name in ('$eq', '$in'):
+                        for item in [value] if operator_name == '$eq' else value:
+                            key_mask[postings.get(_posting_value(item), [])] = True
+                    elif operator_name in _RANGE_OPERATORS:
+                        # Compared with every distinct value of the key, numbers only like Chroma
+                        for posting, rows in postings.items():
+                            item = json.loads(posting)
+                            if _is_number(item) and _RANGE_OPERATORS[operator_name](item, value):
+                                key_mask[rows] = True
+                    else:
+                        raise ValueError(f"Unsupported filter operator '{operator_name}'")
+                    mask &= key_mask
+            return mask
+
+    def _load_generation(self, generation):
+        self._generation = generation
+        self._journal_offset = 0
+        self._metadata = {}
+        self._dimensions = None
+        self._row_count = 0
+        self._ids = []
+        self._id_rows = {}
+        # The metadata value of each row is looked up by key then value for filters
+        self._postings = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+
+    def _file_path(self, kind, generation=None):
+        return os.path.join(self.path, f"{kind}-{self._generation if generation is None else generation}")
+
+    def _replay_journal(self):
+        with open(self._file_path('journal'), 'rb') as file:
+            file.seek(self._journal_offset)
+            data = file.read()
+        # A line being written by another process is applied once complete
+        end = data.rfind(b'\n') + 1
+        if not end:
+            return
+        self._journal_offset += end
+        for line in data[:end].splitlines():
+            self._apply(json.loads(line))
+
+        if self._row_count > len(self._vectors):
+            self._vectors = np.memmap(self._file_path('vectors'), dtype=np.float32, mode='r',
+                                      shape=(self._row_count, self._dimensions))
+
+    def _apply(self, entry):
+        if "collection" in entry:
+            self._metadata = entry["collection"]
+        if "add" in entry:
+            self._dimensions = entry["dimensions"]
+            first_row = self._row_count
+            self._row_count += len(entry["add"])
+            if self._row_count > len(self._alive):
+                alive = np.zeros(max(self._row_count, 2 * len(self._alive)), dtype=bool)
+                alive[:first_row] = self._alive[:first_row]
+                self._alive = alive
+            self._alive[first_row:self._row_count] = True
+            for row, (id, metadata) in enumerate(zip(entry["add"], entry["metadatas"]), first_row):
+                if (replaced_row := self._id_rows.get(id)) is not None:
+                    self._alive[replaced_row] = False
+                self._id_rows[id] = row
+                self._ids.append(id)
+                for key, value in metadata.items():
+                    self._postings.setdefault(key, {}).setdefault(_posting_value(value), []).append(row)
+        for id in entry.get("delete", []):
+            if (row := self._id_rows.pop(id, None)) is not None:
+                self._alive[row] = False
+
+    @contextmanager
+    def _writing(self):
+        # The file lock is taken before the thread lock, like by compact
+        with _file_lock(self.path), self.lock:
+            self.refresh()
+            yield
+            self.refresh()
+        self._maybe_compact()
+
+    def _append_journal(self, entry):
+        with open(self._file_path('journal'), 'a') as file:
+            file.write(json.dumps(entry) + '\n')
+
+    def _maybe_compact(self):
+        deleted_count = self._row_count - len(self._id_rows)
+        if deleted_count < max(self.compaction_min_rows, self.compaction_ratio * self._row_count):
+            return
+        with self.lock:
+            if self.compaction is None or not self.compaction.is_alive():
+                # Not a daemon thread, so that a command importing embeddings completes the compaction before exiting
+                self.compaction = threading.Thread(target=self.compact, name=f"compact-{self.path}")
+                self.compaction.start()
+
+    def compact(self):
+        """Copy the live rows to the files of a new generation, and switch to it."""
+        with _file_lock(self.path):
+            with self.lock:
+                self.refresh()
+                rows = np.nonzero(self._alive[:self._row_count])[0].tolist()
+                generation = self._generation
+                lines = [json.dumps({"collection": self._metadata})]
+                if len(rows):
+                    lines.append(json.dumps({"add": [self._ids[row] for row in rows],
+                                             "metadatas": self._get_row_metadatas(rows),
+                                             "dimensions": self._dimensions}))
+                vectors = self._vectors
+            # Searches go on meanwhile, the other writers wait for the lock
+            _write_generation(self.path, generation + 1, lines, vectors[rows] if len(rows) else np.empty((0, 0)))
+            for kind in ('vectors', 'journal'):
+                os.remove(self._file_path(kind, generation))
+        logging.info(f"Collection '{os.path.basename(self.path)}' compacted from {self._row_count} "
+                     f"to {len(rows)} rows.")
+        self.refresh()
+
+    def _get_row_metadatas(self, rows):
+        metadatas = {row: {} for row in rows}
+        for key, postings in self._postings.items():
+            for value, value_rows in postings.items():
+                for row in value_rows:
+                    if row in metadatas:
+                        metadatas[row][key] = json.loads(value)
+        return [metadatas[row] for row in rows]
+
+
+_RANGE_OPERATORS = {'$gt': operator.gt, '$gte': operator.ge, '$lt': operator.lt, '$lte': operator.le}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _posting_value(value):
+    # Metadata values are JSON values, 1 and "1" being different values
+    return json.dumps(value)
+
+
+def _stat_key(stat):
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _write_generation(path, generation, journal_lines, vectors):
+    """Write the files of a generation of a collection, then point CURRENT to it."""
+    with open(os.path.join(path, f"vectors-{generation}"), 'wb') as file:
+        file.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+    with open(os.path.join(path, f"journal-{generation}"), 'w') as file:
+        file.write(''.join(line + '\n' for line in journal_lines))
+    with open(os.path.join(path, 'CURRENT.tmp'), 'w') as file:
+        file.write(str(generation))
+    os.replace(os.path.join(path, 'CURRENT.tmp'), os.path.join(path, 'CURRENT'))
+
+
+@contextmanager
+def _file_lock(path):
+    """Lock a collection against the writes of the other processes."""
+    with open(os.path.join(path, 'lock'), 'a') as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
@@ -0,0 +1,57 @@
+# ./vector/metadata.py
+from datetime import datetime, timezone
+
+
+def get_timestamp(date):
+    """
+    The metadata value of a date, in seconds since the epoch, as metadata values are strings or numbers
+    and numbers can be compared by the $gte and $lte filters.
+    :param date: A datetime, naive dates being UTC like the dates stored in the database.
+    """
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return int(date.timestamp())
+
+
+def get_date(timestamp):
+    """The naive UTC datetime of a metadata timestamp, like the dates stored in the database."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+def get_page_metadata(record, **metadata):
+    """
+    The metadata of the embedding of a page or of one of its chunks, to filter the searches by.
+    Missing values are left out, as the vector database does not store them.
+    :param record: A row with the page_id, space_key, author and lastUpdated of the page.
+    :param metadata: Additional metadata, such as the chunk_index of a chunk.
+    :return: The metadata, with the page_id, space_key, author and last_updated timestamp keys.
+    """
+    metadata = {
+        "page_id": record.page_id,
+        "space_key": record.space_key,
+        "author": record.author,
+        "last_updated": get_timestamp(record.lastUpdated) if record.lastUpdated else None,
+        **metadata,
+    }
+    return {key: value for key, value in metadata.items() if value is not None}
+
+
+def get_page_filter(space_keys=None, authors=None, updated_since=None):
+    """
+    The filter of the metadata of the embeddings of the pages to search, see get_page_metadata.
+    :param space_keys: Optional; only search the pages of these spaces.
+    :param authors: Optional; only search the pages of these authors.
+    :param updated_since: Optional; only search the pages last updated on or after this date.
+    :return: The filter, in the syntax of Chroma, or None to search all the pages.
+    """
+    conditions = []
+    if space_keys is not None:
+        conditions.append({"space_key": {"$in": list(space_keys)}})
+    if authors is not None:
+        conditions.append({"author": {"$in": list(authors)}})
+    if updated_since is not None:
+        conditions.append({"last_updated": {"$gte": get_timestamp(updated_since)}})
+    if len(conditions) > 1:
+        # Chroma requires the $and of at least two conditions
+        return {"$and": conditions}
+    return conditions[0] if conditions else None
@@ -1,12 +1,16 @@
+from .embeddings.generate_batch import generate_embeddings_to_database
 from .embeddings.generate_missing import generate_missing_embeddings_to_database
 from .embeddings.generate_one import generate_one_embedding_to_database
 from .importer import import_from_database
-from .retriever import retrieve_relevant_ids
+from .retriever import retrieve_relevant_chunk_ids, retrieve_relevant_chunks, retrieve_relevant_ids
 
 
 __all__ = [
+    generate_embeddings_to_database,
     generate_missing_embeddings_to_database,
     generate_one_embedding_to_database,
     import_from_database,
+    retrieve_relevant_chunk_ids,
+    retrieve_relevant_chunks,
     retrieve_relevant_ids,
 ]
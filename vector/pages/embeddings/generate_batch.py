@@ -0,0 +1,102 @@
+import logging
+
+import numpy as np
+
+from configuration import embedding_batch_size, embedding_model_id, model_id, page_chunk_overlap, page_chunk_size
+from database.page_chunk_manager import PageChunkManager
+from database.page_manager import PageManager
+from database.database import get_db_session
+from open_ai.embedding.chunking import split_text
+from open_ai.embedding.embed_manager import embed_texts_in_batches, get_embedding_version
+from open_ai.tokenizer import count_tokens
+
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def format_page_text(page):
+    """
+    Format the text of a page that is split into chunks: its content followed by its comments.
+    :param page: The page data.
+    :return: The text of the page.
+    """
+    text = page.content or ''
+    if page.comments:
+        text += f"\n\nComments:\n{page.comments}"
+    return text
+
+
+def format_chunk_for_embedding(page, chunk_content):
+    """Prefix a chunk with the title of its page, so that chunks are retrieved for questions about the page."""
+    return f"title: {page.title}\nspaceKey: {page.space_key}\n\n{chunk_content}"
+
+
+def prepare_page_chunks(page):
+    """
+    Split a page into chunks.
+    :param page: The page data.
+    :return: The chunks, dicts with the start_offset, end_offset, content, token_count
+        and text (the text to embed) keys.
+    """
+    text = format_page_text(page)
+    chunks = [{'start_offset': start, 'end_offset': end, 'content': text[start:end]}
+              for start, end in split_text(text, page_chunk_size, page_chunk_overlap)]
+    if not chunks:
+        # Pages without content are still represented by their title
+        chunks = [{'start_offset': 0, 'end_offset': len(text), 'content': text}]
+
+    for chunk in chunks:
+        # Counted once here with the tokenizer of the assistant model, not the embedding model,
+        # so the question context is packed without tokenizing the chunks again, see pack_context
+        chunk['token_count'] = count_tokens(chunk['content'], model_id)
+        chunk['text'] = format_chunk_for_embedding(page, chunk['content'])
+    return chunks
+
+
+def generate_embeddings_to_database(page_ids, batch_size=embedding_batch_size):
+    """
+    Vectorize documents by batches of pages and store them in the database.
+    The chunks of a batch of pages are embedded with as few requests as the API limits allow,
+    and stored with the page vectors in bulk.
+    The page vector is the normalized mean of the chunk vectors, so the whole page is represented however long it is.
+    :param page_ids: The IDs of the pages to vectorize.
+    :param batch_size: The number of pages loaded, embedded and stored together.
+    :return: The IDs of the vectorized pages.
+    """
+    embedding_version = get_embedding_version(embedding_model_id)
+    embedded_page_ids = []
+    for start in range(0, len(page_ids), batch_size):
+        batch_page_ids = page_ids[start:start + batch_size]
+        with get_db_session() as session:
+            pages = PageManager().find_pages(batch_page_ids, session)
+            chunks_by_page = {page.page_id: prepare_page_chunks(page) for page in pages}
+            content_hashes = {page.page_id: page.content_hash for page in pages}
+
+        if missing_page_ids := set(batch_page_ids) - set(chunks_by_page):
+            logging.error(f"Page content for page IDs {sorted(missing_page_ids)} could not be retrieved.")
+
+        chunks = [chunk for page_chunks in chunks_by_page.values() for chunk in page_chunks]
+        try:
+            embeddings = embed_texts_in_batches([chunk['text'] for chunk in chunks], model=embedding_model_id)
+        except Exception as e:
+            logging.error(f"Error generating embeddings for page IDs {list(chunks_by_page)}: {e}")
+            continue
+
+        for chunk, embedding in zip(chunks, embeddings):
+            chunk['embed'] = embedding
+            chunk['embedding_version'] = embedding_version
+
+        page_embeds = []
+        for page_id, page_chunks in chunks_by_page.items():
+            embedding = np.mean([chunk['embed'] for chunk in page_chunks], axis=0)
+            embedding /= np.linalg.norm(embedding) or 1.0
+            page_embeds.append({'page_id': page_id, 'embed': embedding, 'content_hash': content_hashes[page_id],
+                                'embedding_version': embedding_version})
+
+        PageChunkManager().replace_chunks(chunks_by_page)
+        PageManager().add_or_update_embed_vectors(page_embeds)
+        embedded_page_ids.extend(chunks_by_page)
+        logging.info(f"Embeddings of {len(chunks)} chunks of {len(page_embeds)} pages stored in the database "
+                     f"({len(embedded_page_ids)}/{len(page_ids)} pages).")
+
+    return embedded_page_ids
@@ -1,69 +1,126 @@
-import json
 import logging
 
-from configuration import vector_collection_pages
+from configuration import vector_collection_page_chunks, vector_collection_pages, vector_sync_batch_size
+from database.page_chunk_manager import PageChunkManager
 from database.page_manager import PageManager
+from models.page_chunk import PageChunk
+from models.page_data import PageData
 
-from ..chroma import get_client
+from ..collections import sync_to_collections
+from ..metadata import get_page_metadata
+from ..stores import get_store
 
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-def extract_data(space_key):
-    page_ids, _, embeddings = PageManager().get_all_page_data_from_db(space_key=space_key)
-
-    # Deserialize the embeddings and filter out None values
-    valid_embeddings, valid_page_ids = [], []
-    for i, embed in enumerate(embeddings):
-        if embed is None:
-            logging.warning(f"Skipping embedding at index {i}: Embed is None")
-            continue
-
-        try:
-            # Deserialize the JSON string into a Python list
-            deserialized_embed = json.loads(embed)
-            valid_embeddings.append(deserialized_embed)
-            valid_page_ids.append(page_ids[i])
-        except (json.JSONDecodeError, TypeError) as e:
-            logging.error(f"Failed to deserialize embedding at index {i}: {e}")
+def extract_data(records):
+    # Filter out missing embeddings, the vector database expects lists of floats
+    valid_page_ids, valid_embeddings, valid_metadatas = [], [], []
+    for i, record in enumerate(records):
+        if record.embed is None or not record.embed.size:
+            logging.warning(f"Skipping embedding at index {i}: Embed is missing")
             continue
 
-        if i % 10 == 0:
-            logging.info(f"Processed {i + 1}/{len(embeddings)} embeddings.")
-
-    logging.info("Completed deserializing all embeddings.")
-    return valid_page_ids, valid_embeddings
+        valid_embeddings.append(record.embed.tolist())
+        valid_page_ids.append(record.page_id)
+        valid_metadatas.append(get_page_metadata(record))
 
+    logging.info(f"Extracted {len(valid_embeddings)}/{len(records)} embeddings.")
+    return valid_page_ids, valid_embeddings, valid_metadatas
 
-def insert_data(ids, embeddings):
-    collection_name = vector_collection_pages
-    logging.info(f"Ensuring collection '{collection_name}' exists...")
-    client = get_client()
-    collection = client.get_or_create_collection(collection_name)
 
+def insert_data(ids, embeddings, metadatas, collection_name=vector_collection_pages):
+    """
+    Upsert page embeddings into the page collection.
+    :param metadatas: The metadata of each page, see vector.metadata.get_page_metadata.
+    :return: Whether the embeddings were upserted.
+    """
     # Add embeddings to the collection
     logging.info(f"Adding {len(embeddings)} embeddings to the collection '{collection_name}'...")
     try:
-        collection.upsert(
+        get_store().upsert(
+            collection_name,
             ids=ids,
             embeddings=embeddings,
-            metadatas=[{"page_id": pid} for pid in ids]
+            metadatas=metadatas
         )
-        logging.info(f"Successfully added {len(embeddings)} embeddings to the collection '{collection_name}'.")
-        logging.info(f"Collection count {collection.count()} ")
-
     except Exception as e:
         logging.error(f"Error adding pages to the collection: {e}")
+        return False
 
-    logging.info(f"Embeddings added to {collection_name} collection.")
+    logging.info(f"Successfully added {len(embeddings)} embeddings to the collection '{collection_name}'.")
+    return True
 
 
-def import_from_database(space_key=None):
+def insert_chunk_data(records, collection_name=vector_collection_page_chunks, batch_size=vector_sync_batch_size):
+    """
+    Replaces the chunks of the given pages in the chunk collection, so that the chunks of pages that shrank are removed.
+    Args:
+        records (list): The rows of all the chunks of the pages, with the chunk_id, page_id, chunk_index,
+            space_key, author, lastUpdated and embed columns, grouped by page.
+        collection_name (str): The name of the chunk collection.
+        batch_size (int): The maximum number of chunks sent per request.
+    Returns:
+        bool: Whether all the chunks were replaced.
+    """
+    store = get_store()
+
+    logging.info(f"Adding {len(records)} chunks to the collection '{collection_name}'...")
+    inserted = True
+    start = 0
+    while start < len(records):
+        # Batches end on a page boundary, as the previous chunks of their pages are deleted first
+        end = min(start + batch_size, len(records))
+        while end < len(records) and records[end].page_id == records[end - 1].page_id:
+            end += 1
+        batch = records[start:end]
+        try:
+            store.delete(collection_name, where={"page_id": {"$in": list({record.page_id for record in batch})}})
+            store.upsert(
+                collection_name,
+                ids=[record.chunk_id for record in batch],
+                embeddings=[record.embed.tolist() for record in batch],
+                metadatas=[get_page_metadata(record, chunk_index=record.chunk_index) for record in batch]
+            )
+        except Exception as e:
+            logging.error(f"Error adding chunks to the collection: {e}")
+            inserted = False
+        start = end
+
+    logging.info(f"Chunks added to {collection_name} collection.")
+    return inserted
+
+
+def import_from_database(space_key=None, embedded_since=None, resync=False, batch_size=vector_sync_batch_size):
     """
-    Extracts embeddings from the database and inserts them into the vector database.
+    Extracts the page and chunk embeddings changed since they were last imported into the vector database,
+    and inserts them by batches. The embeddings of each version are inserted into the live collection and
+    the collection being built of that version, see vector.collections.
+    Each batch is recorded as synced once inserted, so that an interrupted import is resumed by the next one.
     Args:
         space_key (str): The space key for the Confluence space to import data from.
+        embedded_since (datetime): Only import the pages embedded on or after this date.
+        resync (bool): Import all the embeddings, including the ones already imported.
+        batch_size (int): The number of pages, and of chunks, read and sent to the vector database together.
     """
-    ids, embeddings = extract_data(space_key)
-    insert_data(ids, embeddings)
+    if get_store().searches_database:
+        logging.info("The embeddings are searched in the database they are stored in, there is nothing to import.")
+        return
+
+    batch_size = min(batch_size, get_store().max_batch_size)
+
+    page_count = sync_to_collections(
+        vector_collection_pages, PageData,
+        lambda after_id: PageManager().get_page_embeds(space_key, embedded_since, not resync, after_id or 0,
+                                                       batch_size),
+        lambda records, collection_name: insert_data(*extract_data(records), collection_name),
+        lambda record: record.id)
+
+    chunk_count = sync_to_collections(
+        vector_collection_page_chunks, PageChunk,
+        lambda after_page_id: PageChunkManager().get_chunk_embeds(space_key, embedded_since, not resync,
+                                                                  after_page_id, batch_size),
+        lambda records, collection_name: insert_chunk_data(records, collection_name, batch_size),
+        lambda record: record.page_id)
+    logging.info(f"{page_count} page embeddings and {chunk_count} chunk embeddings imported.")
@@ -1,44 +1,113 @@
 import logging
-from typing import List
+from typing import List, Tuple
 
-from configuration import embedding_model_id, vector_collection_pages
+from configuration import vector_collection_page_chunks, vector_collection_pages
+from database.database import get_db_session
+from database.page_chunk_manager import PageChunkManager
+from models.page_chunk import PageChunk
 from open_ai.embedding.embed_manager import embed_text
 
-from ..chroma import get_client
+from ..collections import get_live_collection
+from ..metadata import get_page_filter
+from ..stores import get_store
 
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-def retrieve_relevant_ids(question: str, count: int) -> List[int]:
+def retrieve_relevant_ids(question: str, count: int, space_keys=None, authors=None,
+                          updated_since=None) -> List[Tuple[str, float]]:
     """
     Retrieve the most relevant documents for a given question using the vector database.
 
     Args:
         question (str): The question to retrieve relevant documents for.
+        space_keys (list): Optional; only search the pages of these spaces.
+        authors (list): Optional; only search the pages of these authors.
+        updated_since (datetime): Optional; only search the pages last updated on or after this date.
 
     Returns:
-        List[str]: A list of document IDs of the most relevant documents.
+        List[Tuple[str, float]]: The (page ID, cosine distance) pairs of the most relevant documents,
+            the most relevant first.
     """
 
+    # The question is embedded like the embeddings of the live collection
+    live_collection = get_live_collection(vector_collection_pages)
     try:
-        query_embedding = embed_text(text=question, model=embedding_model_id)
+        query_embedding = embed_text(text=question, model=live_collection.embedding_model,
+                                     dimensions=live_collection.embedding_dimensions)
     except Exception as e:
         logging.error(f"Error generating query embedding: {e}")
         return []
 
-    client = get_client()
-    collection = client.get_collection(vector_collection_pages)
-    similar_items = collection.query(
-        query_embeddings=[query_embedding],  # Now passing the actual list of embeddings
-        n_results=count
-    )
-
-    # Extract and return the document IDs from the results
-    if 'ids' in similar_items:
-        page_ids = [id for sublist in similar_items['ids'] for id in sublist]
-    else:
-        logging.warning("No 'ids' key found in similar_items, no documents retrieved.")
-        page_ids = []
-
-    return page_ids
+    return get_store().query(live_collection.name, query_embedding, count,
+                             get_page_filter(space_keys, authors, updated_since))
+
+
+def retrieve_relevant_chunk_ids(question: str, count: int, space_keys=None, authors=None,
+                                updated_since=None) -> List[Tuple[str, float]]:
+    """
+    Retrieve the most relevant page chunks for a given question using the vector database.
+
+    Args:
+        question (str): The question to retrieve relevant chunks for.
+        count (int): The number of chunks to retrieve.
+        space_keys (list): Optional; only search the pages of these spaces.
+        authors (list): Optional; only search the pages of these authors.
+        updated_since (datetime): Optional; only search the pages last updated on or after this date.
+
+    Returns:
+        List[Tuple[str, float]]: The (chunk ID, cosine distance) pairs of the most relevant chunks,
+            the most relevant first.
+    """
+    live_collection = get_live_collection(vector_collection_page_chunks)
+    try:
+        query_embedding = embed_text(text=question, model=live_collection.embedding_model,
+                                     dimensions=live_collection.embedding_dimensions)
+    except Exception as e:
+        logging.error(f"Error generating query embedding: {e}")
+        return []
+
+    return get_store().query(live_collection.name, query_embedding, count,
+                             get_page_filter(space_keys, authors, updated_since))
+
+
+def retrieve_relevant_chunks(question: str, count: int, space_keys=None, authors=None, updated_since=None) -> list:
+    """
+    Retrieve the most relevant page chunks for a given question, with the title, space key and last updated date
+    of their page. With the pgvector store, the chunks are found by a single query of the database, instead of
+    a query of the vector database followed by a query of the chunks.
+
+    Args:
+        question (str): The question to retrieve relevant chunks for.
+        count (int): The number of chunks to retrieve.
+        space_keys (list): Optional; only search the pages of these spaces.
+        authors (list): Optional; only search the pages of these authors.
+        updated_since (datetime): Optional; only search the pages last updated on or after this date.
+
+    Returns:
+        list: The (PageChunk, title, space_key, lastUpdated, distance) rows of the most relevant chunks,
+            the most relevant first, detached from the session. The distance is the cosine distance
+            of the chunk to the question, to select the chunks of the context, see vector/selection.py.
+    """
+    live_collection = get_live_collection(vector_collection_page_chunks)
+    try:
+        query_embedding = embed_text(text=question, model=live_collection.embedding_model,
+                                     dimensions=live_collection.embedding_dimensions)
+    except Exception as e:
+        logging.error(f"Error generating query embedding: {e}")
+        return []
+
+    store = get_store()
+    where = get_page_filter(space_keys, authors, updated_since)
+    with get_db_session() as session:
+        if store.searches_database:
+            chunks = PageChunkManager().find_similar_chunks(query_embedding, live_collection.embedding_version,
+                                                            count, session, store.get_conditions(PageChunk, where))
+        else:
+            similar = store.query(live_collection.name, query_embedding, count, where)
+            chunks = PageChunkManager().find_chunks([id for id, _ in similar], session,
+                                                    [distance for _, distance in similar])
+        session.expunge_all()
+    return chunks
+
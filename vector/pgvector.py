@@ -0,0 +1,64 @@
+"""
+Prepare the database for the pgvector store, to search the embeddings where they are stored.
+
+With VECTOR_STORE=pgvector, the embeddings are written to the embed_vector column along with the embed column.
+This command copies the embeddings stored before to the embed_vector column, by batches, then creates the HNSW
+index of the live collections and of the collections being built. It can be run again to resume.
+
+Requires the pgvector extension, with the embed_vector columns added by the migrations.
+
+Usage:
+    VECTOR_STORE=pgvector poetry run python -m vector.pgvector
+"""
+import argparse
+import logging
+
+from database.embed_vector_manager import EmbedVectorManager
+from database.vector_collection_manager import VectorCollectionManager
+from models.vector_collection import VectorCollection
+from vector.collections import ALIASES, get_configured_collection
+from vector.stores import PgVectorStore, get_store
+
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def copy_embed_vectors(model, batch_size):
+    """
+    Copy the embeddings of a model to its embed_vector column, by batches.
+    :return: The number of copied embeddings.
+    """
+    manager = EmbedVectorManager()
+    copied_count = 0
+    after_id = 0
+    while rows := manager.get_embeds_without_vector(model, after_id, batch_size):
+        manager.update_embed_vectors(model, model.id, {row.id: row.embed for row in rows})
+        copied_count += len(rows)
+        after_id = rows[-1].id
+        logging.info(f"{copied_count} embeddings of {model.__tablename__} copied to embed_vector.")
+    return copied_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=1000, help='number of embeddings written per statement')
+    args = parser.parse_args()
+
+    store = get_store()
+    if not isinstance(store, PgVectorStore):
+        parser.error(f"The configured vector store is '{store.name}', set VECTOR_STORE=pgvector")
+
+    for model, _ in PgVectorStore.MODELS.values():
+        copy_embed_vectors(model, args.batch_size)
+
+    collections = VectorCollectionManager().get_collections(ALIASES,
+                                                            [VectorCollection.LIVE, VectorCollection.BUILDING])
+    live_aliases = {collection.alias for collection in collections if collection.status == VectorCollection.LIVE}
+    collections += [get_configured_collection(alias) for alias in ALIASES if alias not in live_aliases]
+    for collection in collections:
+        logging.info(f"Indexing the collection '{collection.name}'...")
+        store.create_collection(collection.name)
+
+
+if __name__ == '__main__':
+    main()
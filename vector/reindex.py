@@ -0,0 +1,214 @@
+"""
+Build the vector collections of the configured embedding model and dimensions, then switch questions over to them.
+
+Embeddings are stored and imported with their version, "<model>:<dimensions>", and questions are answered from the
+live collection of each alias (pages, page_chunks and interactions), embedded with the model and dimensions of that
+collection. After embedding_model_id or embedding_dimensions is changed, this command builds a collection of the
+new version next to the live one of each alias, such as pages__text-embedding-3-large-1024:
+- the stored embeddings of the same model with more dimensions are shortened, without embedding them again,
+- the other stored embeddings are queued as embedding jobs, run by the embedding workers and by this process
+  at the background priority of the rate limiter, so that questions keep their share of the rate limits,
+- the embeddings of the new version are imported into the new collections, as are the pages and interactions
+  embedded meanwhile.
+Once the new collections hold all the stored embeddings, the aliases are all switched to them in a single
+transaction, and the processes answering questions use them within vector_collection_alias_ttl_seconds.
+Until then questions are answered from the live collections, and when some embeddings could not be generated
+the command can be run again to resume the build.
+The replaced collections are kept to switch back to, and deleted with --drop-retired.
+
+With VECTOR_STORE=pgvector the collections are the rows of the stored embeddings of their version, which the build
+would replace in place, shrinking the live collections: the command refuses to run, the processes answering
+questions must use another vector store during the reindex.
+
+Usage:
+    poetry run python -m vector.reindex
+    poetry run python -m vector.reindex --drop-retired
+"""
+import argparse
+import logging
+
+from configuration import embedding_dimensions, embedding_model_id
+from database.embed_vector_manager import EmbedVectorManager
+from database.embedding_job_manager import EmbeddingJobManager
+from database.vector_collection_manager import VectorCollectionManager
+from models.embedding_job import EmbeddingJob
+from models.page_chunk import PageChunk
+from models.page_data import PageData
+from models.qa_interaction import QAInteraction
+from models.vector_collection import VectorCollection
+from open_ai.embedding.dimensions import truncate_embeddings
+from open_ai.embedding.embed_manager import get_embedding_version
+from open_ai.embedding.providers import get_provider
+import vector.interactions
+import vector.pages
+from vector.collections import ALIASES, clear_live_collections, get_live_collection, get_versioned_name
+from vector.embedding_jobs import wait_for_jobs
+from vector.embedding_worker import GENERATORS
+from vector.stores import get_store
+
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# The model storing the embeddings of the collections of each alias
+EMBEDDING_MODELS = dict(zip(ALIASES, (PageData, PageChunk, QAInteraction)))
+# The kind of job embedding the rows of each model, and the column of the target of the job
+EMBEDDING_TARGETS = ((PageData, EmbeddingJob.PAGE, PageData.page_id),
+                     (PageChunk, EmbeddingJob.PAGE, PageChunk.page_id),
+                     (QAInteraction, EmbeddingJob.INTERACTION, QAInteraction.id))
+
+
+def truncate_stored_embeddings(model, embedding_model, dimensions, embedding_version, batch_size=1000):
+    """
+    Shorten the embeddings of a model computed by an embedding model with more dimensions, by batches.
+    :param model: The SQLAlchemy model storing the embeddings.
+    :param embedding_model: The embedding model, as in the embedding versions.
+    :param dimensions: The number of dimensions to keep.
+    :param embedding_version: The version of the shortened embeddings.
+    :param batch_size: The number of embeddings read and written together.
+    :return: The number of shortened embeddings.
+    """
+    manager = EmbedVectorManager()
+    truncated_count = 0
+    after_id = 0
+    while rows := manager.get_embeds_to_truncate(model, embedding_model, dimensions, after_id, batch_size):
+        manager.update_embeds(model, {row.id: truncate_embeddings(row.embed, dimensions) for row in rows},
+                              embedding_version)
+        truncated_count += len(rows)
+        after_id = rows[-1].id
+        logging.info(f"{truncated_count} embeddings of {model.__tablename__} shortened to {dimensions} dimensions.")
+    return truncated_count
+
+
+def delete_collections(collections):
+    """Delete collections from the vector database and their records."""
+    store = get_store()
+    for collection in collections:
+        try:
+            store.delete_collection(collection.name)
+            logging.info(f"Collection '{collection.name}' deleted.")
+        except Exception as e:
+            # Raised when the collection does not exist
+            logging.info(f"Collection '{collection.name}' not deleted: {e}")
+    VectorCollectionManager().delete_collections([collection.id for collection in collections])
+
+
+def start_building(embedding_version, model, dimensions):
+    """
+    Register and create the collections of an embedding version for all the aliases,
+    unless they are already being built. The collections being built for another version are deleted.
+    :return: The names of the collections by alias.
+    """
+    manager = VectorCollectionManager()
+    names = {alias: get_versioned_name(alias, embedding_version) for alias in ALIASES}
+    # A collection retired with the same name holds outdated embeddings, it is built again from scratch
+    delete_collections([collection for collection in manager.get_collections(ALIASES, [VectorCollection.RETIRED])
+                        if collection.name in names.values()])
+
+    store = get_store()
+    for alias, name in names.items():
+        delete_collections(manager.add_building_collection(alias, name, embedding_version, model, dimensions))
+        store.create_collection(name, metadata={"embedding_version": embedding_version})
+        logging.info(f"Building collection '{name}' for {alias}.")
+    return names
+
+
+def embed_stored_embeddings(embedding_version):
+    """
+    Embed again the pages and interactions whose stored embeddings are of another version,
+    queued as embedding jobs and waited for.
+    :return: A dict of the number of jobs by status.
+    """
+    job_ids = []
+    for model, kind, id_column in EMBEDDING_TARGETS:
+        target_ids = list(dict.fromkeys(EmbedVectorManager().get_ids_not_of_version(model, id_column,
+                                                                                     embedding_version)))
+        if target_ids:
+            logging.info(f"Queuing {len(target_ids)} {kind} embedding jobs for the rows of {model.__tablename__}.")
+            job_ids.extend(EmbeddingJobManager().enqueue(kind, target_ids))
+    return wait_for_jobs(list(dict.fromkeys(job_ids)), GENERATORS) if job_ids else {}
+
+
+def get_coverage(names, embedding_version):
+    """
+    Measure how many of the stored embeddings are of an embedding version and are in its collections.
+    :param names: The names of the collections of the version by alias.
+    :return: The (embeddings of the version, vectors in the collection, stored embeddings) counts by alias.
+    """
+    store = get_store()
+    coverage = {}
+    for alias, name in names.items():
+        counts = EmbedVectorManager().count_embeds_by_version(EMBEDDING_MODELS[alias])
+        coverage[alias] = (counts.get(embedding_version, 0), store.count(name),
+                           sum(counts.values()))
+    return coverage
+
+
+def drop_retired_collections():
+    """Delete the retired collections, replaced by the live ones."""
+    collections = VectorCollectionManager().get_collections(statuses=[VectorCollection.RETIRED])
+    delete_collections(collections)
+    logging.info(f"{len(collections)} retired collections deleted.")
+
+
+def reindex(batch_size=1000):
+    """
+    Build the collections of the configured embedding model and dimensions, the ones the embedding jobs embed with,
+    and switch to them once complete.
+    :param batch_size: The number of embeddings read and written together when shortening them.
+    :return: Whether the collections of the configured embedding model and dimensions are live.
+    """
+    model, dimensions = embedding_model_id, embedding_dimensions
+    embedding_version = get_embedding_version(model, dimensions)
+    if all(get_live_collection(alias).embedding_version == embedding_version for alias in ALIASES):
+        logging.info(f"The live collections already have the embedding version {embedding_version}.")
+        return True
+    if get_store().searches_database:
+        logging.error("The stored embeddings are the live collections of the pgvector store, and can't be replaced "
+                      "while questions are answered from them. Reindex with another vector store.")
+        return False
+
+    names = start_building(embedding_version, model, dimensions)
+    if dimensions is not None:
+        for embedding_model in EMBEDDING_MODELS.values():
+            truncate_stored_embeddings(embedding_model, get_provider().get_cache_model(model), dimensions,
+                                       embedding_version, batch_size)
+    statuses = embed_stored_embeddings(embedding_version)
+    if dead_count := statuses.get(EmbeddingJob.DEAD, 0):
+        logging.warning(f"{dead_count} embedding jobs failed after all their attempts.")
+
+    vector.pages.import_from_database(resync=True)
+    vector.interactions.import_from_database(resync=True)
+
+    complete = True
+    for alias, (version_count, collection_count, stored_count) in get_coverage(names, embedding_version).items():
+        logging.info(f"{alias}: {version_count}/{stored_count} stored embeddings of version {embedding_version}, "
+                     f"{collection_count} in the collection '{names[alias]}'.")
+        # The collection may also hold the vectors of rows deleted during the build
+        complete &= version_count == stored_count and collection_count >= stored_count
+
+    if not complete:
+        logging.warning("The new collections are incomplete, questions are still answered from the live ones. "
+                        "Run the reindex again to resume.")
+        return False
+
+    retired = VectorCollectionManager().switch_live_collections(ALIASES)
+    clear_live_collections()
+    logging.info(f"Switched to the collections of version {embedding_version}, "
+                 f"replacing {[collection.name for collection in retired]}.")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=1000, help='number of embeddings written per statement')
+    parser.add_argument('--drop-retired', action='store_true',
+                        help='delete the collections replaced by the live ones, instead of reindexing')
+    args = parser.parse_args()
+    if args.drop_retired:
+        drop_retired_collections()
+    else:
+        reindex(batch_size=args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
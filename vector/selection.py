@@ -0,0 +1,60 @@
+# ./vector/selection.py
+"""
+Adaptive selection of the number of chunks in the context of a question, from their distances to the question.
+
+A question matching a few chunks closely, such as how to connect to the VPN, keeps these chunks only: past them,
+the distances jump to the ones of unrelated chunks. An ambiguous question matches many chunks at close distances,
+and keeps more of them, up to the ones too distant from the question to help answer it.
+"""
+import logging
+
+import metrics
+from configuration import (
+    question_context_chunks_min_count,
+    question_context_max_distance,
+    question_context_min_distance_gap,
+)
+
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def select_count(distances, min_count=question_context_chunks_min_count, max_distance=question_context_max_distance,
+                 min_gap=question_context_min_distance_gap):
+    """
+    Select how many of the results of a query to keep.
+    :param distances: The distances of the results to the query, the most similar first.
+    :param min_count: The number of results kept however distant, if there are as many.
+    :param max_distance: Optional; the results beyond min_count more distant than this are left out.
+    :param min_gap: Optional; the results beyond min_count are cut at the largest gap between the distances of
+        two consecutive results, if it is at least this large.
+    :return: The number of results to keep, the most similar ones.
+    """
+    count = len(distances)
+    if count <= min_count:
+        return count
+    if max_distance is not None:
+        count = min_count + sum(1 for distance in distances[min_count:] if distance <= max_distance)
+    if min_gap is not None and count > min_count:
+        # The gap before each result that may be left out
+        gaps = [distances[i] - distances[i - 1] for i in range(min_count, count)]
+        largest_gap = max(gaps)
+        if largest_gap >= min_gap:
+            count = min_count + gaps.index(largest_gap)
+    return count
+
+
+def select_context_chunks(chunks):
+    """
+    Select the chunks of the context of a question among the ones retrieved for it, logging their distances
+    to tune the selection.
+    :param chunks: The retrieved chunks, with their distance to the question, the most similar first.
+    :return: The selected chunks, the most similar first.
+    """
+    distances = [chunk.distance for chunk in chunks]
+    count = select_count(distances)
+    logging.info(f"Selected {count} of {len(chunks)} context chunks, at distances "
+                 f"{[round(distance, 3) for distance in distances]}")
+    metrics.increment('context_selection.questions')
+    metrics.increment('context_selection.chunks', count)
+    return chunks[:count]
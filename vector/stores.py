@@ -0,0 +1,338 @@
+# ./vector/stores.py
+from abc import ABC, abstractmethod
+import operator
+import os
+import threading
+
+from sqlalchemy import DateTime, select
+
+from configuration import (
+    vector_collection_interactions,
+    vector_collection_page_chunks,
+    vector_collection_pages,
+    vector_store,
+    vector_store_compaction_ratio,
+    vector_store_path,
+)
+from database.embed_vector_manager import EmbedVectorManager
+from database.vector_collection_manager import VectorCollectionManager
+from models.page_chunk import PageChunk
+from models.page_data import PageData
+from models.qa_interaction import QAInteraction
+from vector.chroma import forget_collection, get_client, get_cosine_distances, query_collection
+from vector.collections import ALIASES, get_configured_collection
+from vector.local_index import CollectionNotFound, LocalVectorIndex
+from vector.metadata import get_date
+
+
+class VectorStore(ABC):
+    """
+    Stores the embeddings of the vector collections and finds the ones most similar to a query.
+    Collections are named as in the vector_collections table, and embeddings are identified by strings,
+    with metadata such as the page ID of a chunk.
+    """
+    # The name of the store in the vector_store configuration
+    name = None
+    # The maximum number of embeddings upserted by a request
+    max_batch_size = None
+    # Whether the embeddings are searched where they are stored, in the database, so that they are not imported
+    # and the rows of the most similar embeddings are found by a single query
+    searches_database = False
+
+    @abstractmethod
+    def create_collection(self, name, metadata=None):
+        """
+        Create a collection, unless it exists.
+        :param name: The name of the collection.
+        :param metadata: Optional; the metadata of the collection.
+        """
+
+    @abstractmethod
+    def delete_collection(self, name):
+        """Delete a collection, raising an error when it does not exist."""
+
+    @abstractmethod
+    def count(self, name):
+        """Get the number of embeddings of a collection."""
+
+    @abstractmethod
+    def upsert(self, name, ids, embeddings, metadatas):
+        """
+        Add embeddings to a collection, replacing the ones with the same IDs.
+        :param name: The name of the collection, created if needed.
+        :param ids: The IDs of the embeddings.
+        :param embeddings: The embeddings as lists of floats.
+        :param metadatas: The metadata of each embedding.
+        """
+
+    @abstractmethod
+    def delete(self, name, ids=None, where=None):
+        """
+        Delete embeddings from a collection.
+        :param name: The name of the collection, created if needed.
+        :param ids: Optional; the IDs of the embeddings to delete.
+        :param where: Optional; the filter of the metadata of the embeddings to delete,
+            such as {"page_id": {"$in": page_ids}}.
+        """
+
+    @abstractmethod
+    def query(self, name, embedding, count, where=None):
+        """
+        Find the embeddings of a collection most similar to an embedding.
+        :param name: The name of the collection.
+        :param embedding: The embedding of the query, as a list of floats.
+        :param count: The number of embeddings to find.
+        :param where: Optional; the filter of the metadata of the embeddings to search, in the syntax of Chroma,
+            with the $eq, $in, $gte, $lte and $and operators, such as {"space_key": {"$in": space_keys}}.
+        :return: The (ID, cosine distance) pairs of the most similar embeddings, the most similar first.
+        """
+
+
+class ChromaVectorStore(VectorStore):
+    """The collections of the Chroma server, queried over HTTP, see vector/chroma.py."""
+    name = "chroma"
+
+    @property
+    def max_batch_size(self):
+        return get_client().max_batch_size
+
+    def create_collection(self, name, metadata=None):
+        get_client().get_or_create_collection(name, metadata=metadata)
+
+    def delete_collection(self, name):
+        try:
+            get_client().delete_collection(name)
+        finally:
+            forget_collection(name)
+
+    def count(self, name):
+        return get_client().get_collection(name).count()
+
+    def upsert(self, name, ids, embeddings, metadatas):
+        get_client().get_or_create_collection(name).upsert(ids=ids, embeddings=embeddings, metadatas=metadatas)
+
+    def delete(self, name, ids=None, where=None):
+        get_client().get_or_create_collection(name).delete(ids=ids, where=where)
+
+    def query(self, name, embedding, count, where=None):
+        result = query_collection(name, query_embeddings=[embedding], n_results=count, where=where,
+                                  include=['distances'])
+        if not result.get('ids'):
+            return []
+        return list(zip(result['ids'][0], get_cosine_distances(name, result['distances'][0])))
+
+
+class LocalVectorStore(VectorStore):
+    """
+    The collections of a directory, searched exactly within each process, see vector/local_index.py.
+    Avoids a request to a server per query, for corpora whose embeddings fit in memory.
+    """
+    name = "local"
+    max_batch_size = 100000
+
+    def __init__(self, path=vector_store_path, compaction_ratio=vector_store_compaction_ratio):
+        self.path = path
+        self.compaction_ratio = compaction_ratio
+        self.indexes = {}
+        self.lock = threading.Lock()
+
+    def get_index(self, name, create=False):
+        """
+        Get the index of a collection, loaded once per process.
+        :param name: The name of the collection.
+        :param create: Whether to create the collection if it does not exist.
+        :return: The LocalVectorIndex of the collection.
+        """
+        with self.lock:
+            index = self.indexes.get(name)
+        if index is None:
+            collection_path = os.path.join(self.path, name)
+            if not create and not os.path.exists(os.path.join(collection_path, 'CURRENT')):
+                raise CollectionNotFound(f"Collection '{name}' does not exist")
+            index = LocalVectorIndex.create(collection_path, compaction_ratio=self.compaction_ratio)
+            with self.lock:
+                index = self.indexes.setdefault(name, index)
+        return index
+
+    def create_collection(self, name, metadata=None):
+        with self.lock:
+            self.indexes.pop(name, None)
+        index = LocalVectorIndex.create(os.path.join(self.path, name), metadata,
+                                        compaction_ratio=self.compaction_ratio)
+        with self.lock:
+            self.indexes.setdefault(name, index)
+
+    def delete_collection(self, name):
+        index = self.get_index(name)
+        with self.lock:
+            self.indexes.pop(name, None)
+        index.delete()
+
+    def count(self, name):
+        return self.get_index(name).count()
+
+    def upsert(self, name, ids, embeddings, metadatas):
+        self.get_index(name, create=True).upsert(ids, embeddings, metadatas)
+
+    def delete(self, name, ids=None, where=None):
+        self.get_index(name, create=True).delete_rows(ids, where)
+
+    def query(self, name, embedding, count, where=None):
+        try:
+            ids, distances = self.get_index(name).query(embedding, count, where)
+        except CollectionNotFound:
+            # The collection may have been deleted and created again by another process
+            with self.lock:
+                self.indexes.pop(name, None)
+            ids, distances = self.get_index(name).query(embedding, count, where)
+        return list(zip(ids, distances))
+
+
+class PgVectorStore(VectorStore):
+    """
+    The embeddings stored in PostgreSQL, searched with the pgvector extension.
+    The embeddings are written to the embed_vector column along with the embed column, so that they are searchable
+    as soon as they are stored, without an import into another database that could drift apart.
+    The collection of an embedding version is the rows of its alias of that version, indexed by an HNSW index
+    of the embeddings of that version.
+    """
+    name = "pgvector"
+    max_batch_size = 100000
+    searches_database = True
+    # The model storing the embeddings of each alias, and the column of the IDs of the embeddings
+    MODELS = {
+        vector_collection_pages: (PageData, PageData.page_id),
+        vector_collection_page_chunks: (PageChunk, PageChunk.chunk_id),
+        vector_collection_interactions: (QAInteraction, QAInteraction.id),
+    }
+
+    # The columns of the metadata keys of the embeddings of each model, see vector/metadata.py
+    # The chunks are filtered by the metadata of their page, looked up by page ID
+    METADATA_COLUMNS = {
+        PageData: {"page_id": PageData.page_id, "space_key": PageData.space_key, "author": PageData.author,
+                   "last_updated": PageData.lastUpdated},
+        PageChunk: {"page_id": PageChunk.page_id, "chunk_index": PageChunk.chunk_index},
+        QAInteraction: {"interaction_id": QAInteraction.id},
+    }
+    OPERATORS = {'$eq': operator.eq, '$gte': operator.ge, '$lte': operator.le, '$gt': operator.gt,
+                 '$lt': operator.lt}
+
+    def __init__(self):
+        self.collections = {}
+        self.lock = threading.Lock()
+
+    def get_collection(self, name):
+        """
+        Get the record of a collection, by name, cached as the version of a collection never changes.
+        :return: The VectorCollection record, with the alias and the embedding version of the collection.
+        """
+        with self.lock:
+            collection = self.collections.get(name)
+        if collection is None:
+            collections = [collection for collection in VectorCollectionManager().get_collections()
+                           if collection.name == name]
+            if collections:
+                collection = collections[0]
+            elif name in ALIASES:
+                collection = get_configured_collection(name)
+            else:
+                raise CollectionNotFound(f"Collection '{name}' does not exist")
+            with self.lock:
+                self.collections[name] = collection
+        return collection
+
+    def get_model(self, name):
+        """Get the model storing the embeddings of a collection, its ID column and the embedding version."""
+        collection = self.get_collection(name)
+        model, id_column = self.MODELS[collection.alias]
+        return model, id_column, collection.embedding_version
+
+    def create_collection(self, name, metadata=None):
+        model, _, embedding_version = self.get_model(name)
+        EmbedVectorManager().create_vector_index(model, embedding_version)
+
+    def delete_collection(self, name):
+        # The embeddings are kept, as the rows of a version belong to the collection of that version
+        model, _, embedding_version = self.get_model(name)
+        EmbedVectorManager().drop_vector_index(model, embedding_version)
+        with self.lock:
+            self.collections.pop(name, None)
+
+    def count(self, name):
+        model, _, embedding_version = self.get_model(name)
+        return EmbedVectorManager().count_embed_vectors(model, embedding_version)
+
+    def upsert(self, name, ids, embeddings, metadatas):
+        model, id_column, _ = self.get_model(name)
+        ids = [id_column.type.python_type(id) for id in ids]
+        EmbedVectorManager().update_embed_vectors(model, id_column, dict(zip(ids, embeddings)))
+
+    def get_conditions(self, model, where):
+        """
+        Translate a filter of the metadata of the embeddings of a model to the conditions of a query of its rows.
+        :param model: The model storing the embeddings.
+        :param where: The filter, in the syntax of Chroma, see VectorStore.query.
+        :return: The list of SQLAlchemy conditions.
+        """
+        conditions = []
+        for key, condition in (where or {}).items():
+            if key == '$and':
+                for sub_filter in condition:
+                    conditions += self.get_conditions(model, sub_filter)
+                continue
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            columns = self.METADATA_COLUMNS[model]
+            if key not in columns and model is PageChunk and key in self.METADATA_COLUMNS[PageData]:
+                conditions.append(PageChunk.page_id.in_(
+                    select(PageData.page_id).where(*self.get_conditions(PageData, {key: condition}))))
+                continue
+            if key not in columns:
+                raise ValueError(f"Unsupported metadata key '{key}' of {model.__tablename__}")
+            column = columns[key]
+            for operator_name, value in condition.items():
+                if operator_name == '$in':
+                    conditions.append(column.in_([get_column_value(column, item) for item in value]))
+                elif operator_name in self.OPERATORS:
+                    conditions.append(self.OPERATORS[operator_name](column, get_column_value(column, value)))
+                else:
+                    raise ValueError(f"Unsupported filter operator '{operator_name}'")
+        return conditions
+
+    def delete(self, name, ids=None, where=None):
+        model, id_column, embedding_version = self.get_model(name)
+        conditions = [model.embedding_version == embedding_version, *self.get_conditions(model, where)]
+        if ids is not None:
+            conditions.append(id_column.in_([id_column.type.python_type(id) for id in ids]))
+        EmbedVectorManager().clear_embed_vectors(model, *conditions)
+
+    def query(self, name, embedding, count, where=None):
+        model, id_column, embedding_version = self.get_model(name)
+        return [(str(id), distance) for id, distance in EmbedVectorManager().find_similar_ids(
+            model, id_column, embedding, embedding_version, count, self.get_conditions(model, where))]
+
+
+def get_column_value(column, value):
+    """The value of a column of a metadata value, dates being timestamps in the metadata."""
+    if isinstance(column.type, DateTime):
+        return get_date(value)
+    return column.type.python_type(value)
+
+
+STORES = {store.name: store for store in (ChromaVectorStore, LocalVectorStore, PgVectorStore)}
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(name=vector_store) -> VectorStore:
+    """
+    Get the vector store of a name, created once per process.
+    :param name: The name of the store, the configured vector_store by default.
+    :return: The vector store.
+    """
+    with _stores_lock:
+        if name not in _stores:
+            if name not in STORES:
+                raise ValueError(f"Unknown vector store '{name}', expected one of {sorted(STORES)}")
+            _stores[name] = STORES[name]()
+        return _stores[name]
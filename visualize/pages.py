@@ -1,7 +1,6 @@
 # Import necessary libraries
 from database.page_manager import PageManager
 import numpy as np
-import json
 import plotly.graph_objects as go  # Import Plotly Graph Objects for 3D plotting
 from umap import UMAP  # Ensure umap-learn is installed
 from configuration import chart_folder_path
@@ -9,21 +8,21 @@ from configuration import chart_folder_path
 
 def import_data():
     # Step 1: Retrieve all page data, including embeddings, titles, and space keys
-    page_ids, all_documents, embeddings_json = PageManager().get_all_page_data_from_db()
-    print(f"Retrieved {len(embeddings_json)} embeddings from the database.")
+    page_ids, all_documents, embeddings = PageManager().get_all_page_data_from_db()
+    print(f"Retrieved {len(embeddings)} embeddings from the database.")
 
-    if not embeddings_json:
+    if not embeddings:
         print("No embeddings found. Exiting visualization process.")
         return
-    return page_ids, all_documents, embeddings_json
+    return page_ids, all_documents, embeddings
 
 
-def prepare_data(all_documents, embeddings_json, n_clusters=10):
-    embeddings = [json.loads(embed) for embed in embeddings_json if embed]
-    print(f"Successfully deserialized {len(embeddings)} embeddings.")
+def prepare_data(all_documents, embeddings, n_clusters=10):
+    embeddings = [embed for embed in embeddings if embed is not None and embed.size]
+    print(f"Found {len(embeddings)} valid embeddings.")
 
     if not embeddings:
-        print("No valid embeddings after deserialization. Exiting visualization process.")
+        print("No valid embeddings found. Exiting visualization process.")
         return
 
     # Extract titles and space keys from all_documents
@@ -36,7 +35,7 @@ def prepare_data(all_documents, embeddings_json, n_clusters=10):
     color_indices = [space_key_to_color[key] for key in space_keys]
 
     # Convert embeddings to a NumPy array for processing
-    embeddings_array = np.array(embeddings)
+    embeddings_array = np.vstack(embeddings)
     print(f"Converted embeddings to NumPy array with shape {embeddings_array.shape}.")
 
     # Step 2: Use UMAP for dimensionality reduction to 3 components for 3D visualization
@@ -78,6 +77,6 @@ def visualize_page_clusters_3d(reduced_embeddings, color_indices, hover_texts):
 def load_confluence_pages_spacial_distribution():
     print("Starting 3D visualization process...")
 
-    page_ids, all_documents, embeddings_json = import_data()
-    reduced_embeddings, cluster_labels, hover_texts = prepare_data(all_documents, embeddings_json, n_clusters=10)
+    page_ids, all_documents, embeddings = import_data()
+    reduced_embeddings, cluster_labels, hover_texts = prepare_data(all_documents, embeddings, n_clusters=10)
     visualize_page_clusters_3d(reduced_embeddings, cluster_labels, hover_texts)